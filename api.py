@@ -1,20 +1,54 @@
-import requests
 import asyncio
-from fastapi import FastAPI, HTTPException
-from datetime import date, datetime, time
-from typing import List
+import json
+import logging
+import zlib
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from datetime import date, datetime, time, timedelta
+from typing import List, Literal, Optional
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+from fastapi import Query
+from pydantic import BaseModel, Field
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 
 from crawler.bbc_parser import BBCParser
 from crawler.guardian_parser import GuardianParser
 from crawler.reuters_parser import ReutersParser
-from crawler.word_analyzer import WordAnalyzer
+from crawler.word_analyzer import AnalyzerLoader, WordAnalyzer
+from crawler.http_client import DEFAULT_HEADERS, AsyncFetcher
+from crawler.politeness import PolitenessPolicy, ThrottleConfig
+from crawler.validator_store import ValidatorStore
+from crawler.parse_pool import ParsePool, PullParseThreads
+from crawler.observability import (
+    ARTICLES_FAILED, ARTICLES_SKIPPED, ARTICLES_STORED, KEYWORDS_KEPT, NEAR_DUPLICATES,
+    batch_stage_timer, configure_logging, crawl_context
+)
 from fastapi.middleware.cors import CORSMiddleware
 
 from config import settings
-from database import news_collection
+from coordination import DONE, Coordinator, is_live
+from database import (
+    coordination_collection, fingerprint_collection, news_collection, term_stats_collection, word_cache_collection,
+    word_stats_collection, words_collection
+)
+from dedup import NearDuplicateIndex
+from enrichment import EnrichmentClient
+from backfill import BackfillManager
+from jobs import COMPLETED, CrawlJobManager
+from persistence import attach_words, ensure_indexes, find_existing_links, store_articles
+from pipeline import CrawlPipeline
+from response_cache import ResponseCache, make_entry
+from word_stats import WordStatistics
+
+configure_logging(settings.LOG_LEVEL)
+logger = logging.getLogger("api")
 
 app = FastAPI(
     title="News Crawler & Enrichment API",
@@ -29,99 +63,252 @@ app.add_middleware(
 )
 
 scheduler = AsyncIOScheduler()
+fetcher = AsyncFetcher(timeout=settings.FETCH_TIMEOUT, per_host_limit=settings.FETCH_PER_HOST_LIMIT,
+                       max_body_size=settings.FETCH_MAX_BODY_BYTES,
+                       politeness=PolitenessPolicy(
+                           ThrottleConfig(rate=settings.HOST_RATE, max_rate=settings.HOST_MAX_RATE,
+                                          max_concurrency=settings.FETCH_PER_HOST_LIMIT),
+                           max_retries=settings.FETCH_MAX_RETRIES, respect_robots=settings.RESPECT_ROBOTS,
+                           user_agent=DEFAULT_HEADERS['User-Agent']))
+validator_store = ValidatorStore()
+parse_pool = ParsePool(max_workers=settings.PARSE_WORKERS)
+# Parse tăng dần trong lúc tải; tắt STREAM_PARSE để tải hết trang rồi parse trong parse_pool
+pull_threads = PullParseThreads(settings.PARSE_WORKERS * 2) if settings.STREAM_PARSE else None
+enrichment_client = EnrichmentClient(
+    settings.ENRICH_API_URL,
+    cache_collection=word_cache_collection,
+    ttl_seconds=settings.ENRICH_CACHE_TTL_DAYS * 24 * 3600,
+    lru_size=settings.ENRICH_LRU_SIZE,
+    chunk_size=settings.ENRICH_CHUNK_SIZE,
+    max_concurrency=settings.ENRICH_MAX_CONCURRENCY,
+    max_retries=settings.ENRICH_MAX_RETRIES,
+    timeout=settings.ENRICH_TIMEOUT
+)
 
-try:
-    analyzer = WordAnalyzer(cefr_word_list_path='data/word_list_cefr_clean.csv')
-    PARSERS = {
-        "bbc": BBCParser(),
-        "guardian": GuardianParser(),
-        "reuters": ReutersParser()
-    }
-except FileNotFoundError:
-    analyzer = None
-    PARSERS = None
+dedup_index = NearDuplicateIndex(fingerprint_collection, threshold=settings.DEDUP_THRESHOLD)
+word_stats = WordStatistics(word_stats_collection)
+article_cache = ResponseCache(max_entries=settings.ARTICLES_CACHE_ENTRIES, ttl_seconds=settings.ARTICLES_CACHE_TTL)
+
+# Model được nạp trên thread nền khi server khởi động, không chặn import
+analyzer_loader = AnalyzerLoader(lambda: WordAnalyzer(cefr_word_list_path='data/word_list_cefr_clean.csv',
+                                                      keyword_mode=settings.KEYWORD_MODE,
+                                                      term_stats_collection=term_stats_collection))
+PARSERS = {
+    "bbc": BBCParser(fetcher=fetcher, validator_store=validator_store),
+    "guardian": GuardianParser(fetcher=fetcher, validator_store=validator_store),
+    "reuters": ReutersParser(fetcher=fetcher, validator_store=validator_store)
+}
+# Số bài mặc định mỗi nguồn cho crawl hằng ngày / khởi động
+DEFAULT_LIMITS = {"bbc": 1, "guardian": 2, "reuters": 2}
+_background_tasks = set()
 
-def _enrich_and_store_articles(articles: List[dict]) -> List[dict]:
-    if not articles or not analyzer:
-        return []
+def _analyze_batch(sources: List[str], articles: List[dict]) -> Optional[List[List[str]]]:
+    analyzer = analyzer_loader.get()
+    if not analyzer:
+        logger.error("Cannot analyze articles: WordAnalyzer failed to load.")
+        return None
 
+    links = [article['link'] for article in articles]
     corpus = [article.get('content_for_analysis', '') for article in articles]
-    all_keywords_lists = analyzer.extract_keywords_with_tfidf(corpus)
+    # So trùng cả lô một lượt: bản đăng lại thường nằm ở nguồn khác với bài gốc
+    with batch_stage_timer('dedup', sources):
+        duplicates = dedup_index.match(links, corpus)
+        stored_keywords = _stored_keywords({duplicate.link for duplicate in duplicates if duplicate})
+
+    # Bài gần trùng dùng lại keyword của bài gốc (đã lưu hoặc cùng batch) thay vì chạy model lại
+    batch_index = {link: i for i, link in enumerate(links)}
+    to_analyze = []
+    for i, (source, article, duplicate) in enumerate(zip(sources, articles, duplicates)):
+        if duplicate is not None:
+            article['duplicate_of'] = duplicate.link
+            NEAR_DUPLICATES.labels(source=source).inc()
+            logger.info("%s is a near-duplicate of %s (%.2f)", article['link'], duplicate.link,
+                        duplicate.similarity, extra={'source': source})
+        if duplicate is None or (duplicate.link not in stored_keywords and duplicate.link not in batch_index):
+            to_analyze.append(i)
+
+    all_keywords_lists: List[Optional[List[str]]] = [None] * len(articles)
+    if to_analyze:
+        # Một micro-batch có thể gồm bài của nhiều nguồn: model chạy một lần cho cả lô,
+        # thời gian được chia cho các nguồn theo số bài
+        with batch_stage_timer('keywords', [sources[i] for i in to_analyze]):
+            analyzed = analyzer.extract_keywords([corpus[i] for i in to_analyze],
+                                                 min_level=settings.KEYWORD_MIN_LEVEL)
+        for i, keywords in zip(to_analyze, analyzed):
+            all_keywords_lists[i] = keywords
+    for i, duplicate in enumerate(duplicates):
+        if all_keywords_lists[i] is None:
+            original = duplicate.link
+            reused = stored_keywords[original] if original in stored_keywords else all_keywords_lists[batch_index[original]]
+            all_keywords_lists[i] = list(reused)
+
+    for source, keywords in zip(sources, all_keywords_lists):
+        KEYWORDS_KEPT.labels(source=source).inc(len(keywords))
+    return all_keywords_lists
+
+def _stored_keywords(links) -> dict:
+    if not links:
+        return {}
+    cursor = news_collection.find({'link': {'$in': list(links)}},
+                                  {'_id': 0, 'link': 1, 'words': 1, 'list_words.word': 1})
+    keywords = {}
+    for doc in cursor:
+        if 'words' in doc:
+            keywords[doc['link']] = doc['words']
+        else:
+            # Bài lưu trước khi tách collection words
+            keywords[doc['link']] = [word['word'] for word in doc.get('list_words', []) if 'word' in word]
+    return keywords
+
+def _enrich_batch(sources: List[str], articles: List[dict], all_keywords_lists: List[List[str]]):
+    analyzer = analyzer_loader.get()
     unique_words_to_enrich = set(word for keywords in all_keywords_lists for word in keywords)
 
-    word_details_map = {}
-    if unique_words_to_enrich:
-        try:
-            response = requests.post(settings.ENRICH_API_URL, json={"words": list(unique_words_to_enrich)})
-            response.raise_for_status()
-            enrich_results = response.json().get("results", [])
-            word_details_map = {result['word']: result for result in enrich_results}
-        except requests.RequestException as e:
-            print(f"Could not call enrichment API: {e}")
+    # Chỉ các từ chưa có trong cache mới được gửi tới dịch vụ enrichment
+    with batch_stage_timer('enrich', sources):
+        word_details_map = enrichment_client.enrich(unique_words_to_enrich)
 
     crawled_on_date = date.today().isoformat()
-    final_articles = []
-    for i, article in enumerate(articles):
-        enriched_words = [word_details_map.get(word) for word in all_keywords_lists[i] if word in word_details_map]
+    for article, keywords in zip(articles, all_keywords_lists):
+        enriched_words = [
+            dict(word_details_map[word], cefr_level=analyzer.level_of(word))
+            for word in keywords if word in word_details_map
+        ]
         article['list_words'] = enriched_words
-        del article['content_for_analysis']
-        
+
         article['crawled_date'] = crawled_on_date
-        news_collection.replace_one({'link': article['link']}, article, upsert=True)
-        final_articles.append(article)
-    
-    return final_articles
+
+def _store_batch(sources: List[str], articles: List[dict]) -> List[dict]:
+    # Văn bản phân tích không được lưu; giữ lại để cộng DF cho các bài lưu thành công
+    texts = {article['link']: article.pop('content_for_analysis', '') for article in articles}
+    with batch_stage_timer('store', sources):
+        store_result = store_articles(news_collection, articles, words_collection=words_collection)
+    failed_links = store_result.failed_links
+    for failure in store_result.failed:
+        logger.error("Could not store article %s: %s", failure['link'], failure['error'])
+
+    stored, stored_sources = [], []
+    for source, article in zip(sources, articles):
+        if article['link'] in failed_links:
+            ARTICLES_FAILED.labels(source=source, stage='store').inc()
+        else:
+            ARTICLES_STORED.labels(source=source).inc()
+            stored.append(article)
+            stored_sources.append(source)
+    # Thống kê từ vựng được cập nhật cùng lúc ghi bài, không cần quét lại collection bài
+    with batch_stage_timer('word_stats', stored_sources):
+        word_stats.record(stored)
+    # Chỉ bài gốc đã lưu mới làm mốc so trùng; bài lỗi ghi sẽ được so lại khi crawl lại
+    originals = [article['link'] for article in stored if not article.get('duplicate_of')]
+    with batch_stage_timer('dedup_register', stored_sources):
+        dedup_index.register(originals, [texts[link] for link in originals])
+    # DF của TF-IDF chỉ tính bài mới thêm; bài ghi đè (crawl lại) và bản gần trùng không được tính lại
+    analyzer = analyzer_loader.get()
+    if analyzer:
+        with batch_stage_timer('term_stats', stored_sources):
+            analyzer.update_term_statistics([texts[link] for link in originals
+                                             if link in store_result.inserted_links])
+    # Response /articles đã cache của các ngày vừa có bài mới không còn đúng
+    for crawled_date in {article['crawled_date'] for article in stored}:
+        article_cache.invalidate(crawled_date)
+    return stored
+
+pipeline = CrawlPipeline(
+    fetcher, PARSERS,
+    analyze=_analyze_batch, enrich=_enrich_batch, store=_store_batch,
+    parse_pool=parse_pool,
+    fetch_concurrency=settings.PIPELINE_FETCH_CONCURRENCY,
+    parse_concurrency=settings.PARSE_WORKERS * 2,
+    queue_size=settings.PIPELINE_QUEUE_SIZE,
+    batch_size=settings.ANALYZE_BATCH_SIZE,
+    batch_wait=settings.ANALYZE_BATCH_WAIT,
+    pull_threads=pull_threads
+)
+
+def _crawl_links(source: str, links: List[str]) -> List[dict]:
+    # Bỏ các link đã lưu trước khi tải hay chạy model
+    known_links = find_existing_links(news_collection, links)
+    links = [link for link in links if link and link not in known_links]
+    if known_links:
+        ARTICLES_SKIPPED.labels(source=source, reason='already_stored').inc(len(known_links))
+        logger.info("Skipping %d already stored %s article(s).", len(known_links), source,
+                    extra={'source': source})
+
+    # Các nguồn chạy đồng thời cùng đổ vào một pipeline dùng chung, nên model nhận
+    # micro-batch gồm bài của mọi nguồn
+    return pipeline.crawl(source, links)
 
 def _perform_crawl(source: str, limit: int):
-    if not PARSERS:
-        print(f"Cannot perform crawl for {source}: Parsers not initialized.")
-        return
-    
-    print(f"Performing crawl for {source} with limit {limit}...")
-    parser = PARSERS[source]
-    latest_links = parser.get_latest_links(limit=limit)
-    
-    crawled_articles = [parser.parse_article(link) for link in latest_links if link]
-    crawled_articles = [article for article in crawled_articles if article]
-
-    result = _enrich_and_store_articles(crawled_articles)
-    print(f"Crawl for {source} completed. Stored {len(result)} articles.")
-    return result
+    with crawl_context():
+        logger.info("Performing crawl for %s with limit %d...", source, limit, extra={'source': source})
+        latest_links = PARSERS[source].get_latest_links(limit=limit)
+        result = _crawl_links(source, latest_links)
+        logger.info("Crawl for %s completed. Stored %d articles.", source, len(result),
+                    extra={'source': source, 'stored': len(result)})
+        return result
 
-def run_daily_tasks():
-    print("Executing scheduled daily crawl...")
+# Mọi worker/node dùng chung lease trong Mongo: chỉ leader khởi động crawl định kỳ,
+# mỗi crawl trong ngày có đúng một owner, shard backfill được chia cho các worker
+coordinator = Coordinator(coordination_collection, ttl_seconds=settings.LEASE_TTL_SECONDS)
+job_manager = CrawlJobManager(_perform_crawl, max_workers=settings.CRAWL_WORKERS)
+backfill_manager = BackfillManager(
+    PARSERS, _crawl_links,
+    chunk_size=settings.BACKFILL_CHUNK_SIZE,
+    max_pages_per_day=settings.BACKFILL_MAX_PAGES_PER_DAY,
+    coordinator=coordinator,
+    poll_seconds=settings.COORDINATION_POLL_SECONDS
+)
+
+def _claim_daily_crawl(trigger: str):
     today_str = date.today().isoformat()
-    
-    if news_collection.find_one({"crawled_date": today_str}):
-        print(f"Data for {today_str} already exists. Scheduler skipping.")
+    if not coordinator.is_leader:
+        logger.info("Not the leader; leaving the %s crawl for %s to the leader.", trigger, today_str)
+        return
+    run = f"daily_crawl:{today_str}"
+    if coordinator.acquire(run, trigger=trigger) is None:
+        logger.info("Daily crawl for %s already completed or owned by another worker.", today_str)
         return
 
-    try:
-        _perform_crawl("bbc", 1)
-        _perform_crawl("guardian", 2)
-        _perform_crawl("reuters", 2)
-        print("Scheduled daily crawl finished successfully.")
-    except Exception as e:
-        print(f"Error during scheduled crawl: {e}")
+    def finished(job):
+        # Job lỗi ở mọi nguồn: cho phép chạy lại sau CRAWL_RETRY_SECONDS
+        if job.status == COMPLETED:
+            coordinator.release(run, done=True, job_id=job.id)
+        else:
+            coordinator.release(run, retry_after=settings.CRAWL_RETRY_SECONDS, job_id=job.id)
+
+    job = job_manager.submit(DEFAULT_LIMITS, trigger=trigger, on_finish=finished)
+    coordinator.update(run, job_id=job.id)
+    logger.info("Daily crawl for %s (%s) submitted as job %s.", today_str, trigger, job.id)
+
+def run_daily_tasks():
+    logger.info("Executing scheduled daily crawl...")
+    _claim_daily_crawl("schedule")
+
+def run_startup_crawl():
+    _claim_daily_crawl("startup")
+
+def recover_daily_crawl():
+    """Leader chạy crawl trong ngày nếu chưa ai chạy, hoặc owner đã chết / lần trước lỗi (lease hết hạn)."""
+    run = coordinator.get(f"daily_crawl:{date.today().isoformat()}")
+    if run is None or (run.get('state') != DONE and not is_live(run)):
+        _claim_daily_crawl("recovery")
 
 @app.on_event("startup")
 async def startup_event():
-    print("Server starting up...")
-    
-    # 1. Kiểm tra crawl ngay khi bật server
-    today_str = date.today().isoformat()
-    already_crawled = news_collection.find_one({"crawled_date": today_str})
-    
-    if already_crawled:
-        print(f"Daily crawl for {today_str} already completed. Startup check done.")
-    else:
-        print(f"No crawl data for {today_str}. Starting immediate crawl...")
-        try:
-            _perform_crawl("bbc", 1)
-            _perform_crawl("guardian", 2)
-            _perform_crawl("reuters", 2)
-        except Exception as e:
-            print(f"Error during startup crawl: {e}")
+    logger.info("Server starting up...")
+    ensure_indexes(news_collection)
+    enrichment_client.ensure_indexes()
+    dedup_index.ensure_indexes()
+    word_stats.ensure_indexes()
+    coordinator.ensure_indexes()
+    coordinator.start()
+
+    # 1. Nạp model trên thread nền và đưa crawl khởi động vào hàng đợi job,
+    #    để server phục vụ /articles ngay lập tức
+    analyzer_loader.start()
+    task = asyncio.create_task(asyncio.to_thread(run_startup_crawl))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
 
     # 2. Khởi động Scheduler cho các ngày tiếp theo lúc 00:01
     scheduler.add_job(
@@ -130,33 +317,289 @@ async def startup_event():
         id="daily_crawl_job",
         replace_existing=True
     )
+    # 3. Leader tiếp quản crawl bị bỏ dở; mọi worker tham gia các backfill đang mở
+    scheduler.add_job(
+        recover_daily_crawl,
+        IntervalTrigger(seconds=settings.COORDINATION_POLL_SECONDS),
+        id="crawl_recovery_job",
+        replace_existing=True
+    )
+    scheduler.add_job(
+        backfill_manager.join_open_runs,
+        IntervalTrigger(seconds=settings.COORDINATION_POLL_SECONDS),
+        id="backfill_join_job",
+        replace_existing=True
+    )
     scheduler.start()
-    print("Scheduler started. Waiting for next 00:01 trigger.")
+    logger.info("Scheduler started. Waiting for next 00:01 trigger.")
 
 @app.on_event("shutdown")
 async def shutdown_event():
     scheduler.shutdown()
+    job_manager.shutdown()
+    backfill_manager.shutdown()
+    coordinator.stop()
+    pipeline.close()
+    fetcher.close()
+    parse_pool.shutdown()
+    if pull_threads is not None:
+        pull_threads.shutdown()
+    enrichment_client.close()
 
-@app.get("/crawl/bbc", summary="Crawl 1 tin tức mới nhất từ BBC News")
-def crawl_latest_bbc_news():
-    return _perform_crawl("bbc", 1)
+class CrawlJobRequest(BaseModel):
+    sources: List[str] = Field(default_factory=lambda: list(DEFAULT_LIMITS))
+    limit: Optional[int] = Field(default=None, ge=1, description="Số bài mỗi nguồn; mặc định theo từng nguồn")
 
-@app.get("/crawl/guardian", summary="Crawl 2 tin tức mới nhất từ The Guardian")
-def crawl_latest_guardian_news():
-    return _perform_crawl("guardian", 2)
+def _submit_crawl(sources: List[str], limit: Optional[int]):
+    unknown = [source for source in sources if source not in PARSERS]
+    if unknown or not sources:
+        raise HTTPException(status_code=400, detail=f"Unknown sources: {unknown}. Available: {list(PARSERS)}")
+    if limit is not None and limit > settings.CRAWL_MAX_LIMIT:
+        raise HTTPException(status_code=400, detail=f"limit must be at most {settings.CRAWL_MAX_LIMIT}")
+    limits = {source: limit or DEFAULT_LIMITS[source] for source in dict.fromkeys(sources)}
+    job = job_manager.submit(limits)
+    body = dict(job.to_dict(), status_url=f"/crawl/jobs/{job.id}")
+    return JSONResponse(body, status_code=202)
 
-@app.get("/crawl/reuters", summary="Crawl 2 tin tức mới nhất từ Reuters")
-def crawl_latest_reuters_news():
-    return _perform_crawl("reuters", 2)
+@app.post("/crawl/jobs", summary="Tạo job crawl chạy nền; trả về job ID ngay lập tức", status_code=202)
+def create_crawl_job(request: CrawlJobRequest):
+    return _submit_crawl(request.sources, request.limit)
 
-@app.get("/articles/{query_date}", summary="Lấy danh sách các báo đã crawl trong ngày từ DB")
-def get_articles_by_date(query_date: date):
-    query_date_str = query_date.isoformat()
+@app.get("/crawl/jobs", summary="Danh sách các job crawl gần đây")
+def list_crawl_jobs():
+    return [job.to_dict() for job in job_manager.list()]
+
+@app.get("/crawl/jobs/{job_id}", summary="Tiến độ và kết quả của một job crawl")
+def get_crawl_job(job_id: str):
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Crawl job {job_id} not found.")
+    return job.to_dict()
+
+@app.get("/crawl/bbc", summary="Tạo job crawl tin tức mới nhất từ BBC News", status_code=202)
+def crawl_latest_bbc_news(limit: Optional[int] = None):
+    return _submit_crawl(["bbc"], limit)
+
+@app.get("/crawl/guardian", summary="Tạo job crawl tin tức mới nhất từ The Guardian", status_code=202)
+def crawl_latest_guardian_news(limit: Optional[int] = None):
+    return _submit_crawl(["guardian"], limit)
+
+@app.get("/crawl/reuters", summary="Tạo job crawl tin tức mới nhất từ Reuters", status_code=202)
+def crawl_latest_reuters_news(limit: Optional[int] = None):
+    return _submit_crawl(["reuters"], limit)
+
+class BackfillRequest(BaseModel):
+    sources: List[str] = Field(default_factory=lambda: list(DEFAULT_LIMITS))
+    start_date: date
+    end_date: date
+    run_id: Optional[str] = Field(default=None, description="Đặt run_id đã có để tiếp tục từ checkpoint")
+
+def _backfill_or_404(run_id: str):
+    try:
+        state = backfill_manager.get(run_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not state:
+        # Lần backfill do worker/node khác bắt đầu: chỉ có trạng thái chung
+        shared = backfill_manager.shard_progress(run_id)
+        if shared is None:
+            raise HTTPException(status_code=404, detail=f"Backfill {run_id} not found.")
+        state = {"run_id": run_id, "status": shared["status"]}
+    return state
+
+@app.post("/backfill", summary="Backfill bài cũ từ trang lưu trữ theo khoảng ngày, có checkpoint", status_code=202)
+def create_backfill(request: BackfillRequest):
+    unknown = [source for source in request.sources if source not in PARSERS]
+    if unknown or not request.sources:
+        raise HTTPException(status_code=400, detail=f"Unknown sources: {unknown}. Available: {list(PARSERS)}")
+    if request.end_date < request.start_date or request.end_date > date.today():
+        raise HTTPException(status_code=400, detail="end_date must be between start_date and today")
+    if (request.end_date - request.start_date).days >= settings.BACKFILL_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range must be at most {settings.BACKFILL_MAX_DAYS} days")
+    try:
+        state = backfill_manager.submit(list(dict.fromkeys(request.sources)), request.start_date,
+                                        request.end_date, run_id=request.run_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    body = dict(state, status_url=f"/backfill/{state['run_id']}")
+    return JSONResponse(body, status_code=202)
+
+@app.get("/backfill/{run_id}", summary="Tiến độ của một lần backfill")
+def get_backfill(run_id: str):
+    return dict(_backfill_or_404(run_id), active=backfill_manager.is_active(run_id),
+                shards=backfill_manager.shard_progress(run_id))
+
+@app.post("/backfill/{run_id}/stop", summary="Dừng backfill sau chunk hiện tại; có thể tiếp tục sau")
+def stop_backfill(run_id: str):
+    _backfill_or_404(run_id)
+    return {"run_id": run_id, "stopping": backfill_manager.stop(run_id)}
+
+ARTICLE_FIELDS = ('source', 'link', 'title', 'desc', 'published_date', 'image', 'list_words', 'crawled_date',
+                  'duplicate_of')
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+def _parse_fields(fields: Optional[str]) -> Optional[tuple]:
+    if not fields:
+        return None
+    requested = tuple(dict.fromkeys(field.strip() for field in fields.split(',') if field.strip()))
+    unknown = [field for field in requested if field not in ARTICLE_FIELDS]
+    if unknown or not requested:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {unknown}. Available: {list(ARTICLE_FIELDS)}")
+    return requested
+
+def _articles_cursor(query_date_str: str, fields: Optional[tuple], after: Optional[str], limit: Optional[int]):
     query = {"crawled_date": query_date_str}
-    articles = list(news_collection.find(query, {'_id': 0}))
-    if not articles:
-        return {"message": f"No articles were crawled on {query_date_str}."}
-    return articles
+    if after:
+        try:
+            query["_id"] = {"$gt": ObjectId(after)}
+        except InvalidId:
+            raise HTTPException(status_code=400, detail="Invalid cursor.")
+    projection = None
+    if fields is not None:
+        projection = {field: 1 for field in fields}
+        if 'list_words' in fields:
+            projection['words'] = 1
+    # Index (crawled_date, _id): trang kế tiếp bắt đầu ngay sau _id cuối, không skip
+    cursor = news_collection.find(query, projection).sort('_id', 1).batch_size(settings.ARTICLES_STREAM_BATCH)
+    return cursor.limit(limit) if limit else cursor
+
+def _finish_articles(articles: List[dict]) -> List[dict]:
+    for article in articles:
+        article.pop('_id', None)
+    # Một truy vấn $in cho chi tiết của mọi từ trong các bài của trang
+    return attach_words(words_collection, articles)
+
+def _stream_articles(cursor, use_gzip: bool):
+    """NDJSON: ghi từng lô bài ngay khi cursor trả về, không giữ cả ngày trong bộ nhớ."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if use_gzip else None
+    batch = []
+
+    def flush():
+        chunk = b''.join(json.dumps(article, ensure_ascii=False, default=str).encode('utf-8') + b'\n'
+                         for article in _finish_articles(batch))
+        batch.clear()
+        return compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH) if compressor else chunk
+
+    try:
+        for article in cursor:
+            batch.append(article)
+            if len(batch) >= settings.ARTICLES_STREAM_BATCH:
+                yield flush()
+        if batch:
+            yield flush()
+        if compressor:
+            yield compressor.flush()
+    finally:
+        cursor.close()
+
+def _accepts_gzip(request: Request) -> bool:
+    return 'gzip' in request.headers.get('accept-encoding', '').lower()
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get('if-none-match')
+    if not if_none_match:
+        return False
+    return if_none_match.strip() == '*' or etag in [tag.strip() for tag in if_none_match.split(',')]
+
+@app.get("/articles/{query_date}", summary="Lấy danh sách các báo đã crawl trong ngày từ DB, theo trang hoặc NDJSON")
+def get_articles_by_date(
+    request: Request,
+    query_date: date,
+    cursor: Optional[str] = Query(default=None, description="Giá trị X-Next-Cursor của trang trước"),
+    limit: Optional[int] = Query(default=None, ge=1, le=1000, description="Số bài mỗi trang"),
+    fields: Optional[str] = Query(default=None, description="Các trường cần trả về, cách nhau bằng dấu phẩy"),
+    format: Literal["json", "ndjson"] = "json",
+):
+    query_date_str = query_date.isoformat()
+    selected = _parse_fields(fields)
+    use_gzip = _accepts_gzip(request)
+
+    if format == "ndjson" or NDJSON_MEDIA_TYPE in request.headers.get('accept', ''):
+        headers = {"Vary": "Accept-Encoding"}
+        if use_gzip:
+            headers["Content-Encoding"] = "gzip"
+        return StreamingResponse(_stream_articles(_articles_cursor(query_date_str, selected, cursor, limit), use_gzip),
+                                 media_type=NDJSON_MEDIA_TYPE, headers=headers)
+
+    page_size = limit or settings.ARTICLES_PAGE_SIZE
+    cache_key = (cursor, page_size, selected)
+    # Bài mới chỉ được ghi cho ngày hôm nay, có thể bởi tiến trình khác: chỉ cache trong thời gian ngắn
+    max_age = settings.ARTICLES_CACHE_TODAY_TTL if query_date >= date.today() else None
+    entry = article_cache.get(query_date_str, cache_key, max_age=max_age)
+    if entry is None:
+        generation = article_cache.generation(query_date_str)
+        # Đọc thêm một bài để biết còn trang sau hay không
+        articles = list(_articles_cursor(query_date_str, selected, cursor, page_size + 1))
+        headers = {}
+        if len(articles) > page_size:
+            articles = articles[:page_size]
+            headers["X-Next-Cursor"] = str(articles[-1]['_id'])
+        if not articles and not cursor:
+            payload = {"message": f"No articles were crawled on {query_date_str}."}
+        else:
+            payload = _finish_articles(articles)
+        entry = make_entry(json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8'), headers)
+        article_cache.put(query_date_str, cache_key, entry, generation)
+
+    headers = dict(entry.headers, ETag=entry.etag, Vary="Accept-Encoding")
+    # Ngày đã qua không còn bài mới; ngày hôm nay client phải kiểm tra lại bằng ETag
+    headers["Cache-Control"] = "no-cache" if query_date >= date.today() else "private, max-age=300"
+    if _etag_matches(request, entry.etag):
+        return Response(status_code=304, headers=headers)
+    if use_gzip and entry.gzipped is not None:
+        headers["Content-Encoding"] = "gzip"
+        return Response(entry.gzipped, media_type="application/json", headers=headers)
+    return Response(entry.body, media_type="application/json", headers=headers)
+
+def _date_range(start_date: Optional[date], end_date: Optional[date], days: int):
+    end_date = end_date or date.today()
+    start_date = start_date or end_date - timedelta(days=days - 1)
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+    return start_date, end_date
+
+@app.get("/words/top", summary="Các từ xuất hiện trong nhiều bài nhất trong một khoảng ngày")
+def get_top_words(level: Optional[str] = Query(default=None, pattern="^(A1|A2|B1|B2|C1|C2)$"),
+                  start_date: Optional[date] = None, end_date: Optional[date] = None,
+                  days: int = Query(default=7, ge=1, le=366), limit: int = Query(default=50, ge=1, le=500)):
+    start_date, end_date = _date_range(start_date, end_date, days)
+    return {
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "level": level,
+        "words": word_stats.top_words(start_date, end_date, level=level, limit=limit),
+    }
+
+@app.get("/words/{word}", summary="Số bài chứa một từ theo từng ngày")
+def get_word_counts(word: str, start_date: Optional[date] = None, end_date: Optional[date] = None):
+    word = word.lower()
+    counts = word_stats.daily_counts(word, start_date, end_date)
+    if not counts:
+        raise HTTPException(status_code=404, detail=f"No articles contain '{word}'.")
+    return {
+        "word": word,
+        "cefr_level": counts[0].get("cefr_level"),
+        "articles": sum(day["count"] for day in counts),
+        "days": [{"day": day["day"], "count": day["count"]} for day in counts],
+    }
+
+@app.get("/words/{word}/articles", summary="Các bài chứa một từ, theo ngày mới nhất trước")
+def get_word_articles(word: str, start_date: Optional[date] = None, end_date: Optional[date] = None,
+                      limit: int = Query(default=100, ge=1, le=1000)):
+    word = word.lower()
+    return {"word": word, "articles": word_stats.articles_with(word, start_date, end_date, limit=limit)}
+
+@app.get("/ready", summary="Trạng thái sẵn sàng của bộ phân tích từ vựng")
+def readiness():
+    status = analyzer_loader.status
+    body = {"analyzer": status, "ready": status == "ready"}
+    return JSONResponse(body, status_code=200 if status == "ready" else 503)
+
+@app.get("/metrics", summary="Metrics dạng Prometheus", include_in_schema=False)
+def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
 @app.get("/", summary="Trạng thái API", include_in_schema=False)
 def read_root():
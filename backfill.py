@@ -0,0 +1,373 @@
+"""
+Backfill lịch sử từ các trang lưu trữ của từng nguồn.
+
+Một lần backfill duyệt các ngày trong khoảng [start_date, end_date] cho mỗi
+nguồn, đọc từng trang lưu trữ của ngày đó và đẩy link qua pipeline
+fetch -> parse -> phân tích -> lưu theo từng chunk nhỏ, nên bộ nhớ và số
+request đồng thời không phụ thuộc độ dài khoảng ngày.
+
+Tiến độ (nguồn, ngày, trang) được ghi vào file checkpoint JSON sau mỗi chunk;
+chạy lại cùng run_id sẽ tiếp tục từ trang đang dở thay vì từ đầu. Link của
+trang dở được lọc lại qua find_existing_links nên không bị xử lý hai lần.
+
+Với một `Coordinator` (coordination.py), mỗi (nguồn, ngày) là một shard: worker
+lấy lease của shard trước khi xử lý và đánh dấu xong khi hết ngày, trang đang dở
+được ghi vào lease. Lần backfill được công bố trong collection điều phối và
+`join_open_runs` (chạy định kỳ trên mọi worker) đưa worker vào các lần đang mở,
+nên nhiều worker/node chia nhau các ngày thay vì làm trùng. Shard của worker chết
+được worker khác lấy lại khi lease hết hạn. Ngày có trang lưu trữ tải lỗi được ghi
+vào `failed_days` của checkpoint và shard được trả lại để thử lại sau `poll_seconds`,
+lần chạy vẫn mở.
+"""
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Dict, Iterator, List, Optional
+
+from coordination import DONE, Coordinator, is_live
+from crawler.base_parser import ArchiveFetchError
+from crawler.observability import crawl_context
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT_DIR = os.path.join('data', 'cache', 'backfill')
+RUNNING, COMPLETED, FAILED, STOPPED = 'running', 'completed', 'failed', 'stopped'
+
+_RUN_ID_RE = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def iter_days(start: date, end: date) -> Iterator[date]:
+    day = start
+    while day <= end:
+        yield day
+        day += timedelta(days=1)
+
+
+class BackfillCheckpoint:
+    """Trạng thái một lần backfill, lưu nguyên tử ra `<checkpoint_dir>/<run_id>.json`."""
+
+    def __init__(self, path: str, state: Dict):
+        self.path = path
+        self.state = state
+        self._lock = threading.Lock()
+
+    @classmethod
+    def create(cls, path: str, run_id: str, sources: List[str], start: date, end: date) -> "BackfillCheckpoint":
+        state = {
+            'run_id': run_id,
+            'status': RUNNING,
+            'start_date': start.isoformat(),
+            'end_date': end.isoformat(),
+            'created_at': _now(),
+            'updated_at': _now(),
+            # Ngày/trang kế tiếp cần xử lý của mỗi nguồn; day=None nghĩa là đã xong
+            'sources': {source: {'day': start.isoformat(), 'page': 0, 'discovered': 0, 'stored': 0}
+                        for source in sources},
+        }
+        return cls(path, state)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["BackfillCheckpoint"]:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return cls(path, json.load(f))
+        except FileNotFoundError:
+            return None
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return json.loads(json.dumps(self.state))
+
+    def update(self, source: Optional[str] = None, **fields):
+        with self._lock:
+            target = self.state['sources'][source] if source else self.state
+            for key, value in fields.items():
+                if key in ('discovered', 'stored'):
+                    target[key] = target.get(key, 0) + value
+                else:
+                    target[key] = value
+            self.state['updated_at'] = _now()
+            self._save()
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path) or '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self.state, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+class BackfillManager:
+    def __init__(self, parsers: Dict, process_links: Callable[[str, List[str]], Optional[List[dict]]],
+                 checkpoint_dir: str = DEFAULT_CHECKPOINT_DIR, chunk_size: int = 20,
+                 max_pages_per_day: int = 20, max_runs: int = 1, coordinator: Optional[Coordinator] = None,
+                 poll_seconds: float = 30):
+        """
+        `process_links(source, links)` chạy pipeline fetch/parse/phân tích/lưu cho
+        một chunk link và trả về các bài đã lưu.
+        """
+        self._parsers = parsers
+        self._process_links = process_links
+        self.checkpoint_dir = checkpoint_dir
+        self.chunk_size = chunk_size
+        self.max_pages_per_day = max_pages_per_day
+        self._coordinator = coordinator
+        self.poll_seconds = poll_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_runs, thread_name_prefix="backfill")
+        self._active: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, run_id: str) -> str:
+        if not _RUN_ID_RE.match(run_id):
+            raise ValueError(f"Invalid backfill run id: {run_id!r}")
+        return os.path.join(self.checkpoint_dir, f"{run_id}.json")
+
+    def get(self, run_id: str) -> Optional[Dict]:
+        checkpoint = BackfillCheckpoint.load(self._path(run_id))
+        return checkpoint.snapshot() if checkpoint else None
+
+    def is_active(self, run_id: str) -> bool:
+        with self._lock:
+            return run_id in self._active
+
+    def submit(self, sources: List[str], start: date, end: date, run_id: Optional[str] = None) -> Dict:
+        """
+        Bắt đầu một backfill mới, hoặc tiếp tục run_id đã có checkpoint.
+        Khi tiếp tục, khoảng ngày và danh sách nguồn lấy từ checkpoint.
+        """
+        run_id = run_id or uuid.uuid4().hex[:12]
+        path = self._path(run_id)
+        with self._lock:
+            if run_id in self._active:
+                raise RuntimeError(f"Backfill {run_id} is already running")
+            checkpoint = BackfillCheckpoint.load(path)
+            if checkpoint is None:
+                checkpoint = BackfillCheckpoint.create(path, run_id, sources, start, end)
+                logger.info("Starting backfill %s for %s from %s to %s", run_id, ', '.join(sources),
+                            start, end, extra={'job_id': run_id})
+            else:
+                logger.info("Resuming backfill %s from checkpoint", run_id, extra={'job_id': run_id})
+            checkpoint.update(status=RUNNING)
+            stop_event = threading.Event()
+            self._active[run_id] = stop_event
+        if self._coordinator is not None:
+            state = checkpoint.state
+            self._coordinator.publish(self._run_name(run_id), status=RUNNING, sources=list(state['sources']),
+                                      start_date=state['start_date'], end_date=state['end_date'])
+        self._executor.submit(self._run, checkpoint, stop_event)
+        return checkpoint.snapshot()
+
+    def stop(self, run_id: str) -> bool:
+        """Dừng sau chunk hiện tại (trên mọi worker); checkpoint giữ nguyên để tiếp tục sau."""
+        if self._coordinator is not None and self._coordinator.get(self._run_name(run_id)):
+            self._coordinator.publish(self._run_name(run_id), status=STOPPED)
+        with self._lock:
+            stop_event = self._active.get(run_id)
+        if stop_event is None:
+            return False
+        stop_event.set()
+        return True
+
+    @staticmethod
+    def _run_name(run_id: str) -> str:
+        return f"backfill_run:{run_id}"
+
+    @staticmethod
+    def _shard_name(run_id: str, source: str, day: date) -> str:
+        return f"backfill:{run_id}:{source}:{day.isoformat()}"
+
+    def join_open_runs(self):
+        """Tham gia các lần backfill đang mở trên worker khác; dừng các lần đã bị dừng ở nơi khác."""
+        if self._coordinator is None:
+            return
+        for run in self._coordinator.find('backfill_run:'):
+            run_id = run['_id'].split(':', 1)[1]
+            with self._lock:
+                stop_event = self._active.get(run_id)
+            if run.get('status') != RUNNING:
+                if stop_event is not None and run.get('status') == STOPPED:
+                    stop_event.set()
+                continue
+            if stop_event is not None:
+                continue
+            # Lần chạy lỗi trên worker này vẫn được tham gia lại khi còn mở: shard nó
+            # đã trả lại được thử lại từ trang đang dở ghi trong lease
+            local = self.get(run_id)
+            if local and local['status'] == COMPLETED:
+                continue
+            try:
+                self.submit(run['sources'], date.fromisoformat(run['start_date']),
+                            date.fromisoformat(run['end_date']), run_id=run_id)
+            except RuntimeError:
+                # Vừa được bắt đầu trên thread khác
+                continue
+
+    def shard_progress(self, run_id: str) -> Optional[Dict]:
+        """Tiến độ chung của mọi worker: số shard (nguồn, ngày) đã xong và đang chạy."""
+        if self._coordinator is None:
+            return None
+        run = self._coordinator.get(self._run_name(run_id))
+        if run is None:
+            return None
+        days = (date.fromisoformat(run['end_date']) - date.fromisoformat(run['start_date'])).days + 1
+        shards = self._coordinator.find(f"backfill:{run_id}:")
+        running = [shard for shard in shards if shard.get('state') != DONE and is_live(shard)]
+        return {
+            'status': run.get('status'),
+            'total': days * len(run['sources']),
+            'done': sum(shard.get('state') == DONE for shard in shards),
+            'running': len(running),
+            'workers': sorted({shard['owner'] for shard in running}),
+        }
+
+    def _run(self, checkpoint: BackfillCheckpoint, stop_event: threading.Event):
+        run_id = checkpoint.state['run_id']
+        try:
+            with crawl_context(run_id):
+                # Các nguồn khác host nên chạy song song, mỗi nguồn tuần tự theo ngày
+                sources = list(checkpoint.state['sources'])
+                run_source = self._run_source if self._coordinator is None else self._run_source_sharded
+                with ThreadPoolExecutor(max_workers=len(sources), thread_name_prefix="backfill-source") as pool:
+                    futures = [pool.submit(run_source, checkpoint, source, stop_event) for source in sources]
+                    errors = [future.exception() for future in futures if future.exception()]
+            if errors:
+                status = FAILED
+            else:
+                status = STOPPED if stop_event.is_set() else COMPLETED
+            checkpoint.update(status=status, finished_at=_now())
+            if status == COMPLETED and self._coordinator is not None:
+                # Worker sharded chỉ kết thúc khi mọi shard đã xong
+                self._coordinator.publish(self._run_name(run_id), status=COMPLETED)
+            logger.info("Backfill %s %s", run_id, status, extra={'job_id': run_id})
+        except Exception as e:
+            logger.exception("Backfill %s failed: %s", run_id, e, extra={'job_id': run_id})
+            checkpoint.update(status=FAILED, error=repr(e), finished_at=_now())
+        finally:
+            with self._lock:
+                self._active.pop(run_id, None)
+
+    def _run_source(self, checkpoint: BackfillCheckpoint, source: str, stop_event: threading.Event):
+        progress = checkpoint.snapshot()['sources'][source]
+        if progress['day'] is None:
+            return
+        end = date.fromisoformat(checkpoint.state['end_date'])
+        start_page = progress['page']
+
+        try:
+            for day in iter_days(date.fromisoformat(progress['day']), end):
+                if not self._run_day(checkpoint, source, day, start_page, stop_event):
+                    return
+                start_page = 0
+                next_day = day + timedelta(days=1)
+                checkpoint.update(source, day=next_day.isoformat() if next_day <= end else None, page=0)
+                logger.info("Backfill %s: finished %s", source, day, extra={'source': source})
+        except Exception as e:
+            logger.exception("Backfill for %s failed: %s", source, e, extra={'source': source})
+            checkpoint.update(source, error=repr(e))
+            raise
+
+    def _run_source_sharded(self, checkpoint: BackfillCheckpoint, source: str, stop_event: threading.Event):
+        run_id = checkpoint.state['run_id']
+        pending = list(iter_days(date.fromisoformat(checkpoint.state['start_date']),
+                                 date.fromisoformat(checkpoint.state['end_date'])))
+        try:
+            while pending:
+                claimed, waiting = False, []
+                for day in pending:
+                    if stop_event.is_set():
+                        return
+                    name = self._shard_name(run_id, source, day)
+                    shard = self._coordinator.acquire(name, run_id=run_id, source=source, day=day.isoformat())
+                    if shard is None:
+                        if (self._coordinator.get(name) or {}).get('state') != DONE:
+                            waiting.append(day)
+                        continue
+                    claimed = True
+                    try:
+                        finished = self._run_day(checkpoint, source, day, shard.get('page', 0), stop_event, name)
+                    except ArchiveFetchError as e:
+                        # Trang lưu trữ tạm lỗi: chỉ ngày này được thử lại (ở đây hoặc trên worker khác)
+                        logger.warning("Backfill %s: %s failed, retrying later: %s", source, day, e,
+                                       extra={'source': source})
+                        self._coordinator.release(name, retry_after=self.poll_seconds)
+                        self._set_failed_day(checkpoint, source, day, repr(e))
+                        waiting.append(day)
+                        continue
+                    except Exception:
+                        self._coordinator.release(name)
+                        raise
+                    if finished:
+                        self._coordinator.release(name, done=True)
+                        self._set_failed_day(checkpoint, source, day, None)
+                        checkpoint.update(source, day=day.isoformat(), page=0)
+                        logger.info("Backfill %s: finished %s", source, day, extra={'source': source})
+                    elif stop_event.is_set():
+                        self._coordinator.release(name)
+                        return
+                    else:
+                        # Mất lease (vd. heartbeat trễ quá TTL): worker đang giữ shard làm tiếp
+                        logger.warning("Lost backfill shard %s to another worker.", name)
+                pending = waiting
+                if pending and not claimed:
+                    # Các ngày còn lại đang do worker khác xử lý; chờ chúng xong hoặc lease hết hạn
+                    stop_event.wait(self.poll_seconds)
+            checkpoint.update(source, day=None, page=0)
+        except Exception as e:
+            logger.exception("Backfill for %s failed: %s", source, e, extra={'source': source})
+            checkpoint.update(source, error=repr(e))
+            raise
+
+    @staticmethod
+    def _set_failed_day(checkpoint: BackfillCheckpoint, source: str, day: date, error: Optional[str]):
+        """Ghi (hoặc xoá, với `error=None`) lỗi của một ngày trong `failed_days` của nguồn."""
+        failed_days = checkpoint.snapshot()['sources'][source].get('failed_days', {})
+        if error is None and day.isoformat() not in failed_days:
+            return
+        if error is None:
+            del failed_days[day.isoformat()]
+        else:
+            failed_days[day.isoformat()] = error
+        checkpoint.update(source, failed_days=failed_days)
+
+    def _run_day(self, checkpoint: BackfillCheckpoint, source: str, day: date, start_page: int,
+                 stop_event: threading.Event, shard: Optional[str] = None) -> bool:
+        """
+        Xử lý các trang lưu trữ của một ngày; False nếu bị dừng hoặc mất lease của `shard`.
+        Trang lưu trữ tải lỗi gây ra ArchiveFetchError: ngày không được đánh dấu xong,
+        checkpoint (và lease của `shard`) giữ ở trang lỗi để thử lại.
+        """
+        parser = self._parsers[source]
+        for page_index, links in parser.iter_archive_links(day, start_page=start_page,
+                                                           max_pages=self.max_pages_per_day):
+            checkpoint.update(source, discovered=len(links))
+            for i in range(0, len(links), self.chunk_size):
+                if stop_event.is_set():
+                    return False
+                stored = self._process_links(source, links[i:i + self.chunk_size]) or []
+                checkpoint.update(source, stored=len(stored))
+            # Trang đã xử lý xong: lần chạy lại bắt đầu từ trang kế tiếp
+            checkpoint.update(source, day=day.isoformat(), page=page_index + 1)
+            if shard is not None and not self._coordinator.update(shard, page=page_index + 1):
+                return False
+        return True
+
+    def shutdown(self):
+        with self._lock:
+            for stop_event in self._active.values():
+                stop_event.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,92 @@
+"""
+Đo hit rate và độ trễ của EnrichmentClient với dịch vụ enrichment giả lập.
+
+    python -m benchmarks.bench_enrichment --rounds 30 --words-per-round 300
+
+Mỗi round mô phỏng một lần crawl: các từ được rút từ danh sách CEFR theo phân
+phối Zipf (từ phổ biến xuất hiện lặp lại giữa các ngày). So sánh cách cũ (một
+POST cho toàn bộ từ, không cache) với client có cache. Thêm `--mongo-uri` để
+dùng cả tầng cache trên Mongo.
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+import requests
+
+from benchmarks.stub_enrich_server import StubEnrichServer
+from crawler.cefr_vocab import load_cefr_vocabulary
+from enrichment import EnrichmentClient
+
+
+def _rounds(vocabulary, rounds, words_per_round, seed):
+    rng = np.random.default_rng(seed)
+    weights = 1.0 / np.arange(1, len(vocabulary) + 1)
+    weights /= weights.sum()
+    for _ in range(rounds):
+        picks = rng.choice(len(vocabulary), size=words_per_round, p=weights)
+        yield list(dict.fromkeys(vocabulary[i] for i in picks))
+
+
+def _percentile(samples, pct):
+    return float(np.percentile(samples, pct)) if samples else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=30)
+    parser.add_argument('--words-per-round', type=int, default=300)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--chunk-size', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--mongo-uri')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    vocabulary = load_cefr_vocabulary('data/word_list_cefr_clean.csv').canonical_words
+    server = StubEnrichServer(latency=args.latency, failure_rate=args.failure_rate).start()
+
+    baseline = []
+    for words in _rounds(vocabulary, args.rounds, args.words_per_round, args.seed):
+        start = time.perf_counter()
+        try:
+            requests.post(server.url, json={'words': words}, timeout=60).raise_for_status()
+        except requests.RequestException:
+            pass
+        baseline.append((time.perf_counter() - start) * 1000)
+    baseline_requests = server.requests
+
+    cache_collection = None
+    if args.mongo_uri:
+        from pymongo import MongoClient
+        cache_collection = MongoClient(args.mongo_uri)['crawl_bench']['word_details_cache']
+        cache_collection.drop()
+
+    client = EnrichmentClient(server.url, cache_collection=cache_collection,
+                              chunk_size=args.chunk_size, max_concurrency=args.concurrency,
+                              backoff_seconds=0.05)
+    client.ensure_indexes()
+    cached = []
+    for words in _rounds(vocabulary, args.rounds, args.words_per_round, args.seed):
+        start = time.perf_counter()
+        client.enrich(words)
+        cached.append((time.perf_counter() - start) * 1000)
+    client.close()
+    server.stop()
+
+    print(f"Rounds: {args.rounds}, ~{args.words_per_round} draws per round, stub latency {args.latency}s")
+    print(f"{'':<22}{'p50 ms':>10}{'p95 ms':>10}{'total s':>10}{'requests':>10}")
+    print(f"{'single POST, no cache':<22}{_percentile(baseline, 50):>10.1f}{_percentile(baseline, 95):>10.1f}"
+          f"{sum(baseline) / 1000:>10.2f}{baseline_requests:>10}")
+    print(f"{'EnrichmentClient':<22}{_percentile(cached, 50):>10.1f}{_percentile(cached, 95):>10.1f}"
+          f"{sum(cached) / 1000:>10.2f}{client.stats.requests:>10}")
+    print(f"Hit rate: {client.stats.hit_rate:.1%} "
+          f"(LRU {client.stats.lru_hits}, store {client.stats.store_hits}, misses {client.stats.misses}, "
+          f"failed {client.stats.failed})")
+    print(f"Mean round latency: {statistics.mean(cached):.1f} ms vs {statistics.mean(baseline):.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
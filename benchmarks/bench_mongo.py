@@ -0,0 +1,118 @@
+"""
+Benchmark lớp persistence trên một mongod cục bộ.
+
+    python -m benchmarks.bench_mongo --uri mongodb://localhost:27017 --articles 100000
+
+Script tạo một database riêng (mặc định `crawl_bench`, bị xóa khi chạy lại),
+nạp N bài báo giả lập rồi đo thời gian tra cứu theo `crawled_date`/`link` và thời
+gian ghi một lô crawl, trước và sau khi tạo index, so sánh `replace_one` từng bài
+với `bulk_write` không thứ tự.
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import date, timedelta
+
+from pymongo import MongoClient
+
+from persistence import ensure_indexes, find_existing_links, store_articles
+
+
+def _make_article(i: int, crawled_date: str) -> dict:
+    return {
+        'source': random.choice(['BBC News', 'The Guardian', 'Reuters']),
+        'link': f'https://example.com/news/article-{i}',
+        'title': f'Synthetic article {i}',
+        'desc': 'Synthetic description ' * 5,
+        'published_date': crawled_date + 'T00:00:00Z',
+        'image': f'https://example.com/img/{i}.jpg',
+        'list_words': [{'word': f'word{j}', 'level': 'B1'} for j in range(20)],
+        'crawled_date': crawled_date,
+    }
+
+
+def _timed(fn, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def _report(label: str, ms: float):
+    print(f"  {label:<45} {ms:10.2f} ms")
+
+
+def run_lookups(collection, dates, n_articles, repeat):
+    sample_links = [f'https://example.com/news/article-{random.randrange(n_articles)}' for _ in range(50)]
+    _report("find_one({crawled_date})",
+            _timed(lambda: collection.find_one({'crawled_date': random.choice(dates)}), repeat))
+    _report("find({crawled_date}) -> list",
+            _timed(lambda: list(collection.find({'crawled_date': random.choice(dates)}, {'_id': 0})), repeat))
+    _report("find_existing_links (50 links, one $in)",
+            _timed(lambda: find_existing_links(collection, sample_links), repeat))
+
+
+def run_writes(collection, n_articles, batch_size, repeat):
+    today = date.today().isoformat()
+
+    def batch():
+        # Nửa lô là bài đã có, nửa lô là bài mới
+        ids = random.sample(range(n_articles), batch_size // 2) + \
+            [n_articles + random.randrange(10 ** 9) for _ in range(batch_size - batch_size // 2)]
+        return [_make_article(i, today) for i in ids]
+
+    def one_by_one():
+        for article in batch():
+            collection.replace_one({'link': article['link']}, article, upsert=True)
+
+    _report(f"replace_one x{batch_size}", _timed(one_by_one, repeat))
+    _report(f"bulk_write (unordered) x{batch_size}", _timed(lambda: store_articles(collection, batch()), repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--uri', default='mongodb://localhost:27017')
+    parser.add_argument('--db', default='crawl_bench')
+    parser.add_argument('--articles', type=int, default=100_000)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--batch-size', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    client = MongoClient(args.uri)
+    client.drop_database(args.db)
+    collection = client[args.db]['articles']
+
+    dates = [(date.today() - timedelta(days=d)).isoformat() for d in range(args.days)]
+    print(f"Loading {args.articles} synthetic articles over {args.days} days...")
+    start = time.perf_counter()
+    chunk = []
+    for i in range(args.articles):
+        chunk.append(_make_article(i, random.choice(dates)))
+        if len(chunk) == 10_000:
+            collection.insert_many(chunk, ordered=False)
+            chunk = []
+    if chunk:
+        collection.insert_many(chunk, ordered=False)
+    print(f"Loaded in {time.perf_counter() - start:.1f}s.\n")
+
+    print("Without indexes (median of runs):")
+    run_lookups(collection, dates, args.articles, args.repeat)
+    run_writes(collection, args.articles, args.batch_size, args.repeat)
+
+    start = time.perf_counter()
+    ensure_indexes(collection)
+    print(f"\nensure_indexes took {time.perf_counter() - start:.1f}s.\n")
+
+    print("With indexes (median of runs):")
+    run_lookups(collection, dates, args.articles, args.repeat)
+    run_writes(collection, args.articles, args.batch_size, args.repeat)
+
+    client.drop_database(args.db)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""
+Kiểm tra điều tiết theo host với một server giả lập giới hạn tốc độ.
+
+    python -m benchmarks.bench_politeness --pages 200 --server-rate 20
+
+Server (FixtureServer với fixture BBC) cho phép `--server-rate` request/s; vượt
+quá thì trả 429 kèm `Retry-After`. Độ trễ tăng theo số request đang xử lý, như
+một host bị quá tải. robots.txt chặn `/private/`.
+
+Cùng danh sách URL được tải hai lần bằng `AsyncFetcher`: không điều tiết (tất cả
+đồng thời, lỗi là mất trang) và với `PolitenessPolicy`. Báo cáo: số trang tải
+được, số 429 server đã trả, thời gian, tốc độ và trạng thái cuối của bộ điều
+tiết.
+
+Script thoát với mã 1 nếu lần chạy có điều tiết không tải đủ mọi trang công khai,
+nhận quá `--max-429` lần 429 (mặc định 5% số trang: chỉ vài lần dò tốc độ lúc
+tăng tốc) hoặc gửi bất kỳ request nào tới URL bị robots.txt chặn.
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+
+from benchmarks.fixture_server import FixtureServer, load_fixture
+from crawler.http_client import AsyncFetcher
+from crawler.politeness import PolitenessPolicy, ThrottleConfig
+
+ROBOTS = b"User-agent: *\nDisallow: /private/\n"
+
+
+class ThrottledServer(FixtureServer):
+    def __init__(self, routes, default, rate: float, latency: float, retry_after: int = 1):
+        super().__init__(routes, default=default)
+        self.rate = rate
+        self.base_latency = latency
+        self.retry_after = retry_after
+        self.rejected = 0
+        self.private_hits = 0
+        self.in_flight = 0
+        self._tokens = rate
+        self._refilled_at = time.monotonic()
+        self._bucket_lock = threading.Lock()
+
+    def _admit(self) -> bool:
+        with self._bucket_lock:
+            now = time.monotonic()
+            self._tokens = min(self.rate, self._tokens + (now - self._refilled_at) * self.rate)
+            self._refilled_at = now
+            if self._tokens < 1:
+                self.rejected += 1
+                return False
+            self._tokens -= 1
+            self.in_flight += 1
+            return True
+
+    def handle(self, handler):
+        if handler.path.startswith('/robots.txt'):
+            return super().handle(handler)
+        if handler.path.startswith('/private/'):
+            self.private_hits += 1
+        if not self._admit():
+            handler.send_response(429)
+            handler.send_header('Retry-After', str(self.retry_after))
+            handler.send_header('Content-Length', '0')
+            handler.end_headers()
+            return
+        try:
+            # Quá tải: mỗi request đang xử lý thêm một khoảng trễ nền
+            time.sleep(self.base_latency * self.in_flight)
+            super().handle(handler)
+        finally:
+            with self._bucket_lock:
+                self.in_flight -= 1
+
+
+def run(server, urls, politeness):
+    server.rejected = server.private_hits = 0
+    server._tokens, server._refilled_at = server.rate, time.monotonic()
+    fetcher = AsyncFetcher(per_host_limit=len(urls), politeness=politeness)
+    try:
+        start = time.perf_counter()
+        responses = fetcher.run(fetcher.afetch_many(urls))
+        seconds = time.perf_counter() - start
+    finally:
+        fetcher.close()
+    public = [response for url, response in zip(urls, responses) if '/private/' not in url]
+    fetched = sum(response is not None for response in public)
+    result = {
+        'pages': len(public),
+        'fetched': fetched,
+        'failed': len(public) - fetched,
+        'server_429': server.rejected,
+        'private_requests': server.private_hits,
+        'seconds': round(seconds, 2),
+        'pages_per_second': round(fetched / seconds, 1),
+    }
+    if politeness is not None:
+        result['throttle'] = politeness.snapshot()
+    return result
+
+
+def check(result, max_429: int) -> list:
+    """Các vi phạm của lần chạy có điều tiết; rỗng nếu đạt."""
+    failures = []
+    if result['fetched'] != result['pages']:
+        failures.append(f"fetched {result['fetched']} of {result['pages']} public pages")
+    if result['server_429'] > max_429:
+        failures.append(f"server returned {result['server_429']} 429s (limit {max_429})")
+    if result['private_requests']:
+        failures.append(f"{result['private_requests']} request(s) to robots.txt-disallowed URLs")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=200)
+    parser.add_argument('--server-rate', type=float, default=20.0, help='requests/s the stand-in accepts')
+    parser.add_argument('--latency', type=float, default=0.005, help='extra latency per in-flight request')
+    parser.add_argument('--max-429', type=int, default=None,
+                        help='429s allowed in the polite run (default: 5%% of pages)')
+    args = parser.parse_args()
+    max_429 = args.max_429 if args.max_429 is not None else args.pages // 20
+
+    server = ThrottledServer({'/robots.txt': ROBOTS}, default=load_fixture('bbc_article.html'),
+                             rate=args.server_rate, latency=args.latency).start()
+    urls = [f'{server.base_url}/news/{i}' for i in range(args.pages)]
+    urls += [f'{server.base_url}/private/{i}' for i in range(5)]
+    try:
+        results = {
+            'unthrottled': run(server, urls, None),
+            'polite': run(server, urls, PolitenessPolicy(
+                ThrottleConfig(rate=2.0, max_rate=4 * args.server_rate, max_concurrency=16),
+                backoff_seconds=0.2)),
+        }
+    finally:
+        server.stop()
+    print(json.dumps(results, indent=2))
+
+    failures = check(results['polite'], max_429)
+    for failure in failures:
+        print(f"FAIL (polite): {failure}")
+    if failures:
+        return 1
+    print("Politeness check OK.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
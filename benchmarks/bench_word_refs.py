@@ -0,0 +1,117 @@
+"""
+Đo dung lượng lưu trữ và lượng dữ liệu đọc khi bài báo nhúng chi tiết từ
+(`list_words`) so với khi chỉ giữ tham chiếu tới collection `words`.
+
+    python -m benchmarks.bench_word_refs --days 30 --articles-per-day 60
+
+Keyword của mỗi bài được rút từ danh sách CEFR theo phân phối Zipf, chi tiết từ
+lấy từ dịch vụ enrichment giả lập (nhỏ hơn payload thật, nên mức tiết kiệm đo
+được là cận dưới). Kích thước là số byte BSON, trước khi nén.
+"""
+import argparse
+import json
+import time
+
+import bson
+import numpy as np
+
+from benchmarks.stub_enrich_server import fake_details
+from crawler.cefr_vocab import load_cefr_vocabulary
+from persistence import attach_words, split_words
+
+CEFR_PATH = 'data/word_list_cefr_clean.csv'
+
+
+class _WordsStandIn:
+    """Đủ cho `attach_words`: một truy vấn `_id $in`, đếm số byte trả về."""
+
+    def __init__(self, documents):
+        self.documents = documents
+        self.bytes_read = 0
+        self.queries = 0
+
+    def find(self, query):
+        self.queries += 1
+        docs = [dict(self.documents[word]) for word in query['_id']['$in'] if word in self.documents]
+        self.bytes_read += sum(len(bson.encode(doc)) for doc in docs)
+        return docs
+
+
+def _articles(vocabulary, days, per_day, keywords, seed):
+    rng = np.random.default_rng(seed)
+    weights = 1.0 / np.arange(1, len(vocabulary) + 1)
+    weights /= weights.sum()
+    for day in range(days):
+        for i in range(per_day):
+            words = list(dict.fromkeys(vocabulary[j] for j in rng.choice(len(vocabulary), size=keywords, p=weights)))
+            yield {
+                'source': 'BBC News',
+                'link': f'https://example.com/news/{day}-{i}',
+                'title': f'Synthetic article {day}-{i}',
+                'desc': 'Synthetic description ' * 5,
+                'published_date': f'2024-01-{day % 28 + 1:02d}T00:00:00Z',
+                'image': f'https://example.com/img/{day}-{i}.jpg',
+                'list_words': [dict(fake_details(word), cefr_level='B1') for word in words],
+                'crawled_date': f'2024-01-{day % 28 + 1:02d}',
+            }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--articles-per-day', type=int, default=60)
+    parser.add_argument('--keywords', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    vocabulary = load_cefr_vocabulary(CEFR_PATH).canonical_words
+    embedded_bytes = ref_bytes = 0
+    words = {}
+    day_articles = []
+    for article in _articles(vocabulary, args.days, args.articles_per_day, args.keywords, args.seed):
+        embedded_bytes += len(bson.encode(article))
+        document, details = split_words(article)
+        ref_bytes += len(bson.encode(document))
+        for entry in details:
+            words[entry['word']] = dict(entry, _id=entry['word'])
+        if len(day_articles) < args.articles_per_day:
+            day_articles.append((article, document))
+    word_bytes = sum(len(bson.encode(doc)) for doc in words.values())
+
+    # Một response /articles/{date}: bài của một ngày, ghép lại bằng một truy vấn
+    day_embedded = sum(len(bson.encode(article)) for article, _ in day_articles)
+    stand_in = _WordsStandIn(words)
+    documents = [dict(document) for _, document in day_articles]
+    day_refs = sum(len(bson.encode(document)) for document in documents)
+    start = time.perf_counter()
+    joined = attach_words(stand_in, documents)
+    join_ms = (time.perf_counter() - start) * 1000
+    assert [article['list_words'] for article in joined] == [article['list_words'] for article, _ in day_articles]
+
+    total_after = ref_bytes + word_bytes
+    results = {
+        'articles': args.days * args.articles_per_day,
+        'unique_words': len(words),
+        'storage': {
+            'embedded_bytes': embedded_bytes,
+            'articles_with_refs_bytes': ref_bytes,
+            'words_collection_bytes': word_bytes,
+            'saved_pct': round(100.0 * (embedded_bytes - total_after) / embedded_bytes, 1),
+        },
+        'write_per_article_bytes': {
+            'embedded': round(embedded_bytes / (args.days * args.articles_per_day)),
+            'refs': round(ref_bytes / (args.days * args.articles_per_day)),
+        },
+        'articles_response_read': {
+            'embedded_bytes': day_embedded,
+            'refs_plus_words_bytes': day_refs + stand_in.bytes_read,
+            'word_queries': stand_in.queries,
+            'join_ms': round(join_ms, 3),
+            'saved_pct': round(100.0 * (day_embedded - day_refs - stand_in.bytes_read) / day_embedded, 1),
+        },
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
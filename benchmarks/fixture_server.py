@@ -0,0 +1,116 @@
+"""
+HTTP stand-in phục vụ các trang HTML đã lưu trong benchmarks/fixtures/.
+
+Mỗi nguồn chạy một server riêng: đường dẫn của trang danh sách trả về fixture
+danh sách, mọi đường dẫn khác trả về fixture bài báo. Có thể thêm độ trễ và một
+khối `<script>` giả lập cho giống trang thật (vốn chứa nhiều JS/JSON), trong
+`<head>` hoặc cuối `<body>` (như state JSON của các trang Next.js).
+"""
+import hashlib
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+# Đường dẫn trang danh sách của từng parser (xem news_url trong crawler/)
+LISTING_PATHS = {
+    'bbc': '/news',
+    'guardian': '/world',
+    'reuters': '/world',
+}
+
+
+def load_fixture(name: str) -> bytes:
+    with open(os.path.join(FIXTURES_DIR, name), 'rb') as f:
+        return f.read()
+
+
+def pad_html(html: bytes, padding_kb: int, position: str = 'head') -> bytes:
+    if padding_kb <= 0:
+        return html
+    blob = b'<script type="application/json">{"data":"' + b'x' * (padding_kb * 1024) + b'"}</script>'
+    marker = b'</head>' if position == 'head' else b'</body>'
+    return html.replace(marker, blob + marker, 1)
+
+
+class _Server(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        # Client ngừng đọc giữa chừng (tải tăng dần dừng sớm) là bình thường
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+
+class FixtureServer:
+    def __init__(self, routes: Dict[str, bytes], default: Optional[bytes] = None, latency: float = 0.0,
+                 host: str = '127.0.0.1', port: int = 0):
+        self.routes = routes
+        self.default = default
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), self._make_handler())
+        self._server.daemon_threads = True
+
+    @classmethod
+    def for_source(cls, source: str, latency: float = 0.0, padding_kb: int = 0,
+                   padding_position: str = 'head') -> 'FixtureServer':
+        listing = pad_html(load_fixture(f'{source}_listing.html'), padding_kb, padding_position)
+        article = pad_html(load_fixture(f'{source}_article.html'), padding_kb, padding_position)
+        return cls({LISTING_PATHS[source]: listing}, default=article, latency=latency)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def handle(self, handler: BaseHTTPRequestHandler):
+        """Trả về fixture; có ETag để thử request có điều kiện (304)."""
+        body = self.routes.get(handler.path.split('?')[0].rstrip('/') or '/', self.default)
+        if body is None:
+            handler.send_response(404)
+            handler.send_header('Content-Length', '0')
+            handler.end_headers()
+            return
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        if handler.headers.get('If-None-Match') == etag:
+            handler.send_response(304)
+            handler.send_header('ETag', etag)
+            handler.end_headers()
+            return
+        handler.send_response(200)
+        handler.send_header('Content-Type', 'text/html; charset=utf-8')
+        handler.send_header('Content-Length', str(len(body)))
+        handler.send_header('ETag', etag)
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                with server._lock:
+                    server.requests += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                server.handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> 'FixtureServer':
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,97 @@
+"""
+So sánh hai chế độ trích xuất keyword: KeyBERT và TF-IDF.
+
+    python -m benchmarks.keyword_modes --corpus path/to/articles.txt --out modes.json
+
+Mỗi dòng của file corpus là một bài báo (vd. `content_for_analysis` xuất từ
+Mongo); nếu không truyền, script dùng corpus giả lập của benchmarks/corpus.py,
+khi đó độ trùng keyword không có nhiều ý nghĩa và chỉ số tốc độ là chính.
+
+Thống kê DF của TF-IDF được nạp từ chính corpus trước khi đo (như một collection
+`term_stats` đã chạy một thời gian), rồi cả hai chế độ chấm cùng các lô bài.
+Báo cáo: thời gian mỗi bài của từng chế độ, Jaccard trung bình giữa hai tập
+keyword và tỷ lệ keyword KeyBERT cũng có trong kết quả TF-IDF.
+"""
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.corpus import synthetic_corpus
+from crawler.word_analyzer import WordAnalyzer
+
+CEFR_PATH = 'data/word_list_cefr_clean.csv'
+
+
+def run_mode(extract, corpus, batch_size):
+    extract(corpus[:1])  # warm-up
+    keywords, start = [], time.perf_counter()
+    for i in range(0, len(corpus), batch_size):
+        keywords.extend(extract(corpus[i:i + batch_size]))
+    seconds = time.perf_counter() - start
+    return keywords, {
+        'seconds': round(seconds, 4),
+        'ms_per_article': round(seconds * 1000 / len(corpus), 3),
+        'throughput_per_s': round(len(corpus) / seconds, 2) if seconds > 0 else None,
+    }
+
+
+def overlap(keybert_lists, tfidf_lists) -> dict:
+    jaccard, recall = [], []
+    for keybert, tfidf in zip(keybert_lists, tfidf_lists):
+        a, b = set(keybert), set(tfidf)
+        if not a and not b:
+            continue
+        jaccard.append(len(a & b) / len(a | b))
+        if a:
+            recall.append(len(a & b) / len(a))
+    return {
+        'articles_compared': len(jaccard),
+        'mean_jaccard': round(float(np.mean(jaccard)), 4) if jaccard else None,
+        'mean_keybert_recall': round(float(np.mean(recall)), 4) if recall else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', help='text file, one article per line')
+    parser.add_argument('--articles', type=int, default=100, help='synthetic corpus size when --corpus is not given')
+    parser.add_argument('--words-per-article', type=int, default=400)
+    parser.add_argument('--batch', type=int, default=16)
+    parser.add_argument('--limit', type=int, default=20, help='keywords per article')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', help='write results JSON here')
+    args = parser.parse_args(argv)
+
+    if args.corpus:
+        with open(args.corpus, encoding='utf-8') as f:
+            corpus = [line.strip() for line in f if line.strip()]
+    else:
+        corpus = synthetic_corpus(args.articles, args.words_per_article, seed=args.seed)
+
+    analyzer = WordAnalyzer(cefr_word_list_path=CEFR_PATH, keyword_mode='keybert')
+    analyzer.update_term_statistics(corpus)
+
+    keybert_lists, keybert_stats = run_mode(
+        lambda batch: analyzer.extract_keywords_with_keybert(batch, args.limit), corpus, args.batch)
+    tfidf_lists, tfidf_stats = run_mode(
+        lambda batch: analyzer.extract_keywords_tfidf(batch, args.limit), corpus, args.batch)
+
+    results = {
+        'articles': len(corpus),
+        'keybert': keybert_stats,
+        'tfidf': tfidf_stats,
+        'speedup': round(keybert_stats['seconds'] / tfidf_stats['seconds'], 1) if tfidf_stats['seconds'] else None,
+        'overlap': overlap(keybert_lists, tfidf_lists),
+    }
+    print(json.dumps(results, indent=2))
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,173 @@
+"""
+Đối chiếu extract_keywords_with_keybert (theo lô) với cách encode từng keyword cũ.
+
+    python -m benchmarks.keyword_parity                      # model giả lập, tất định
+    python -m benchmarks.keyword_parity --model [articles.txt]
+
+Bản theo lô so độ tương đồng với vector của lemma CEFR, còn cách cũ encode dạng
+gốc của từ ("cities" thay vì "city"), nên keyword sát ngưỡng có thể khác. Mỗi bài
+được so bằng hệ số Jaccard giữa hai tập keyword; script thoát với mã 1 nếu có bài
+dưới `--min-jaccard` (mặc định `MIN_JACCARD`).
+
+Mặc định script dùng model embedding và KeyBERT giả lập, không cần tải model.
+Như model thật, model giả lập encode dạng gốc của từ: vector là tổng vector băm
+của các trigram ký tự, nên các biến thể của một từ gần nhau nhưng không trùng.
+Lemma được lấy bằng bộ lemmatizer giả lập để không phụ thuộc dữ liệu WordNet.
+
+Với `--model`, script dùng model thật (mỗi dòng của file đầu vào là một bài báo,
+mặc định là các đoạn văn mẫu) và báo cáo thêm thời gian của hai cách.
+"""
+import argparse
+import sys
+import tempfile
+import time
+import zlib
+
+import numpy as np
+
+from crawler.cefr_embeddings import build_cefr_embeddings
+from crawler.word_analyzer import WordAnalyzer
+
+CEFR_PATH = 'data/word_list_cefr_clean.csv'
+SIMILARITY_THRESHOLD = 0.2
+# Trên các bài mẫu với model giả lập, các từ số nhiều sát ngưỡng làm Jaccard thấp nhất
+# còn 0.73 (3 keyword lệch trên 11); thấp hơn 0.7 là bản theo lô đã lệch hẳn khỏi cách cũ
+MIN_JACCARD = 0.7
+STUB_DIM = 64
+
+SAMPLE_CORPUS = [
+    "The government announced a new plan to reduce pollution in major cities, "
+    "promising cleaner air and better public transport for millions of residents.",
+    "Scientists have discovered a rare species of frog in the rainforest, "
+    "raising hopes that the protected area can support more wildlife research.",
+    "The central bank kept interest rates unchanged as inflation slowed, "
+    "but economists warned that the housing market remains under pressure.",
+    "Farmers in several regions reported that heavy storms damaged crops and roads, "
+    "while engineers checked bridges and schools for cracks after the floods receded.",
+    "Doctors say hospitals are struggling with longer waiting lists as nurses leave for jobs abroad "
+    "and patients wait months for routine operations and appointments.",
+    "Students and teachers protested outside universities against rising fees, carrying banners "
+    "and asking ministers to protect grants for families on lower incomes.",
+    "Engineers are testing electric buses on the city streets, hoping the vehicles will cut emissions "
+    "and noise while drivers learn new charging routines at depots.",
+    "too short",
+]
+
+_STOP_WORDS = frozenset('a an and are as at be but by for from has have in is it of on that the to was were '
+                        'with can more than new'.split())
+
+
+class _Lemmatizer:
+    """Bỏ đuôi số nhiều đơn giản; đủ để nhiều biến thể trỏ về cùng lemma CEFR."""
+
+    def lemmatize(self, word: str) -> str:
+        return word[:-1] if len(word) > 3 and word.endswith('s') and not word.endswith('ss') else word
+
+
+def _tokens(text: str):
+    words = (word.strip('.,;:!?"\'()').lower() for word in text.split())
+    return [word for word in words if word.isalpha() and word not in _STOP_WORDS]
+
+
+def _hashed(key: str) -> np.ndarray:
+    return np.random.default_rng(zlib.crc32(key.encode())).standard_normal(STUB_DIM).astype(np.float32)
+
+
+class _StubEmbeddingModel:
+    """Vector tất định của dạng gốc: từ là tổng vector các trigram ký tự, văn bản là tổng vector các từ."""
+
+    def _word_vector(self, word: str) -> np.ndarray:
+        padded = f'<{word}>'
+        return np.sum([_hashed(padded[i:i + 3]) for i in range(len(padded) - 2)], axis=0)
+
+    def _vector(self, text: str) -> np.ndarray:
+        words = _tokens(text)
+        if len(words) == 1 and ' ' not in text.strip():
+            return self._word_vector(words[0])
+        return np.sum([self._word_vector(word) for word in words] or [np.zeros(STUB_DIM, np.float32)], axis=0)
+
+    def encode(self, texts, **kwargs):
+        if isinstance(texts, str):
+            return self._vector(texts)
+        return np.stack([self._vector(text) for text in texts])
+
+
+class _StubKeyBERT:
+    """Xếp hạng các từ của bài theo điểm tất định, cùng dạng kết quả với KeyBERT."""
+
+    def _keywords(self, text: str, top_n: int):
+        words = list(dict.fromkeys(_tokens(text)))
+        scored = [(word, (zlib.crc32(word.encode()) % 1000) / 2000) for word in words]
+        return sorted(scored, key=lambda item: (-item[1], item[0]))[:top_n]
+
+    def extract_keywords(self, docs, top_n=5, **kwargs):
+        if isinstance(docs, str):
+            return self._keywords(docs, top_n)
+        results = [self._keywords(doc, top_n) for doc in docs]
+        # KeyBERT trả về list phẳng khi chỉ có một tài liệu
+        return results[0] if len(results) == 1 else results
+
+
+def _stub_analyzer(cache_dir: str) -> WordAnalyzer:
+    analyzer = WordAnalyzer(cefr_word_list_path=CEFR_PATH, embedding_cache_dir=cache_dir, keyword_mode='tfidf')
+    analyzer.lemmatizer = _Lemmatizer()
+    analyzer.embedding_model = _StubEmbeddingModel()
+    analyzer.kw_model = _StubKeyBERT()
+    analyzer.cefr_embeddings = build_cefr_embeddings(CEFR_PATH, analyzer.embedding_model, 'parity-stub', cache_dir)
+    return analyzer
+
+
+def jaccard(a, b) -> float:
+    a, b = set(a), set(b)
+    return len(a & b) / len(a | b) if a | b else 1.0
+
+
+def compare(analyzer: WordAnalyzer, corpus, min_jaccard: float) -> int:
+    """So hai cách trên `corpus`; trả về 1 nếu có bài có Jaccard dưới `min_jaccard`."""
+    start = time.perf_counter()
+    reference = analyzer.extract_keywords_per_keyword(corpus, similarity_threshold=SIMILARITY_THRESHOLD)
+    reference_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched = analyzer.extract_keywords_with_keybert(corpus, similarity_threshold=SIMILARITY_THRESHOLD)
+    batched_seconds = time.perf_counter() - start
+
+    scores = [jaccard(expected, actual) for expected, actual in zip(reference, batched)]
+    print(f"Articles: {len(corpus)}")
+    print(f"Per-keyword loop: {reference_seconds:.2f}s")
+    print(f"Batched:          {batched_seconds:.2f}s")
+    for i, score in enumerate(scores):
+        if score < 1.0:
+            print(f"Article {i} (Jaccard {score:.2f}):\n  per-keyword: {reference[i]}\n  batched:     {batched[i]}")
+    keywords = sum(len(words) for words in reference)
+    below = [score for score in scores if score < min_jaccard]
+    if below or not keywords:
+        print(f"Parity check FAILED: {len(below)} of {len(corpus)} article(s) below Jaccard {min_jaccard}, "
+              f"{keywords} keyword(s).")
+        return 1
+    print(f"Parity check OK: lowest Jaccard {min(scores):.2f}, mean {sum(scores) / len(scores):.2f} "
+          f"(minimum {min_jaccard}).")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('corpus', nargs='?', help='one article per line (default: built-in samples)')
+    parser.add_argument('--model', action='store_true', help='compare with the real embedding model instead')
+    parser.add_argument('--min-jaccard', type=float, default=MIN_JACCARD,
+                        help=f'lowest keyword-set overlap allowed per article (default: {MIN_JACCARD})')
+    args = parser.parse_args(argv)
+
+    if args.corpus:
+        with open(args.corpus, encoding="utf-8") as f:
+            corpus = [line.strip() for line in f if line.strip()]
+    else:
+        corpus = SAMPLE_CORPUS
+    if args.model:
+        return compare(WordAnalyzer(cefr_word_list_path=CEFR_PATH), corpus, args.min_jaccard)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        return compare(_stub_analyzer(cache_dir), corpus, args.min_jaccard)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
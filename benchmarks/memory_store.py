@@ -0,0 +1,56 @@
+"""
+Collection trong bộ nhớ, đủ cho các hàm của persistence.py, để benchmark chạy
+không cần mongod. Dùng `--mongo-uri` trong benchmark để đo trên Mongo thật.
+"""
+import copy
+from types import SimpleNamespace
+from typing import Dict, List
+
+
+class MemoryCollection:
+    def __init__(self):
+        self._docs: Dict[str, dict] = {}
+
+    def create_index(self, *args, **kwargs):
+        return kwargs.get('name', 'index')
+
+    def _matches(self, doc: dict, query: dict) -> bool:
+        for key, condition in query.items():
+            value = doc.get(key)
+            if isinstance(condition, dict) and '$in' in condition:
+                if value not in condition['$in']:
+                    return False
+            elif value != condition:
+                return False
+        return True
+
+    def find(self, query: dict = None, projection: dict = None) -> List[dict]:
+        query = query or {}
+        if set(query) == {'link'} and isinstance(query['link'], dict) and '$in' in query['link']:
+            docs = [self._docs[link] for link in query['link']['$in'] if link in self._docs]
+        else:
+            docs = [doc for doc in self._docs.values() if self._matches(doc, query)]
+        if projection:
+            keep = [key for key, flag in projection.items() if flag and key != '_id']
+            if keep:
+                return [{key: doc[key] for key in keep if key in doc} for doc in docs]
+        return [copy.deepcopy(doc) for doc in docs]
+
+    def find_one(self, query: dict = None, projection: dict = None):
+        docs = self.find(query, projection)
+        return docs[0] if docs else None
+
+    def bulk_write(self, operations, ordered: bool = True):
+        upserted = matched = 0
+        for operation in operations:
+            # pymongo.ReplaceOne giữ filter/document trong các thuộc tính _filter/_doc
+            link = operation._filter['link']
+            if link in self._docs:
+                matched += 1
+            else:
+                upserted += 1
+            self._docs[link] = copy.deepcopy(operation._doc)
+        return SimpleNamespace(bulk_api_result={'nUpserted': upserted, 'nMatched': matched, 'nModified': matched})
+
+    def count_documents(self, query: dict) -> int:
+        return len(self.find(query))
@@ -0,0 +1,399 @@
+"""
+Bộ benchmark offline cho các stage crawl -> parse -> analyze -> enrich -> store.
+
+    python -m benchmarks.run --pages 200 --articles 100 --out bench.json
+    python -m benchmarks.run --out new.json --compare bench.json
+
+Không cần mạng hay Mongo: HTML được phát lại từ benchmarks/fixtures/ qua một
+HTTP stand-in cục bộ, analyzer chạy trên corpus giả lập, enrichment dùng
+benchmarks/stub_enrich_server.py và store dùng collection trong bộ nhớ (hoặc
+mongod cục bộ với `--mongo-uri`). Stage analyze cần model all-MiniLM-L6-v2 đã
+có trong cache của sentence-transformers; nếu không nạp được, stage bị bỏ qua.
+
+Mỗi stage báo throughput và độ trễ p50/p95; kết quả được lưu dạng JSON và
+`--compare` báo các stage chậm đi quá `--threshold` so với một lần chạy trước.
+"""
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+
+from benchmarks.corpus import synthetic_corpus
+from benchmarks.fixture_server import FixtureServer
+from benchmarks.memory_store import MemoryCollection
+from benchmarks.stub_enrich_server import StubEnrichServer
+from crawler.bbc_parser import BBCParser
+from crawler.cefr_vocab import load_cefr_vocabulary
+from crawler.guardian_parser import GuardianParser
+from crawler.html_utils import parse_html
+from crawler.http_client import AsyncFetcher
+from crawler.parse_pool import PullParseThreads
+from crawler.reuters_parser import ReutersParser
+from enrichment import EnrichmentClient
+from persistence import find_existing_links, store_articles
+from pipeline import CrawlPipeline
+
+PARSER_CLASSES = {
+    'bbc': BBCParser,
+    'guardian': GuardianParser,
+    'reuters': ReutersParser,
+}
+ARTICLE_PATHS = {
+    'bbc': '/news/articles/c{:010d}o',
+    'guardian': '/world/2024/mar/14/bench-story-{}',
+    'reuters': '/world/europe/bench-story-{}-2024-03-14/',
+}
+CEFR_PATH = 'data/word_list_cefr_clean.csv'
+
+
+def summarize(samples_ms, items, seconds) -> dict:
+    samples = np.asarray(samples_ms, dtype=float)
+    return {
+        'items': int(items),
+        'seconds': round(seconds, 4),
+        'throughput_per_s': round(items / seconds, 2) if seconds > 0 else None,
+        'p50_ms': round(float(np.percentile(samples, 50)), 3) if samples.size else None,
+        'p95_ms': round(float(np.percentile(samples, 95)), 3) if samples.size else None,
+    }
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1000
+
+
+async def _timed_fetch_all(fetcher, urls):
+    async def one(url):
+        start = time.perf_counter()
+        response = await fetcher.afetch(url)
+        return response, (time.perf_counter() - start) * 1000
+    return await asyncio.gather(*(one(url) for url in urls))
+
+
+async def _timed_fetch_parse(fetcher, parser, urls, pull_threads=None):
+    """Tải và parse đồng thời: cả body rồi extract_article, hoặc theo chunk vào parser tăng dần."""
+    async def one(url):
+        start = time.perf_counter()
+        if pull_threads is not None:
+            response, article = await pull_threads.fetch_article(fetcher, parser, url)
+        else:
+            response = await fetcher.afetch(url)
+            article = await asyncio.to_thread(parser.extract_article, url, response.body) if response else None
+        return article, response.size if response else 0, (time.perf_counter() - start) * 1000
+    return await asyncio.gather(*(one(url) for url in urls))
+
+
+def bench_source(source, args, results):
+    server = FixtureServer.for_source(source, latency=args.latency, padding_kb=args.padding_kb,
+                                      padding_position=args.padding_position).start()
+    fetcher = AsyncFetcher(per_host_limit=args.per_host_limit)
+    parser = PARSER_CLASSES[source](base_url=server.base_url, fetcher=fetcher)
+    try:
+        # crawl: tải và trích xuất trang danh sách
+        samples = []
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            _, ms = timed(parser.get_latest_links, limit=args.listing_limit)
+            samples.append(ms)
+        results[f'crawl.{source}'] = summarize(samples, args.repeat, time.perf_counter() - start)
+
+        # fetch: tải đồng thời `pages` bài qua connection pool
+        urls = [server.base_url + ARTICLE_PATHS[source].format(i) for i in range(args.pages)]
+        start = time.perf_counter()
+        fetched = fetcher.run(_timed_fetch_all(fetcher, urls))
+        seconds = time.perf_counter() - start
+        pages = [(url, response.body) for url, (response, _) in zip(urls, fetched) if response]
+        results[f'fetch.{source}'] = summarize([ms for _, ms in fetched], len(pages), seconds)
+
+        # parse: trích xuất bài báo từ HTML, một core
+        samples = []
+        start = time.perf_counter()
+        for url, html in pages:
+            _, ms = timed(parser.extract_article, url, html)
+            samples.append(ms)
+        results[f'parse.{source}'] = summarize(samples, len(pages), time.perf_counter() - start)
+
+        # Riêng lượt duyệt luật trích xuất, không tính thời gian dựng cây
+        if pages:
+            root = parse_html(pages[0][1])
+            samples = [timed(parser.field_rules.extract, root)[1] for _ in range(args.pages)]
+            results[f'parse.{source}.field_rules'] = summarize(samples, len(samples), sum(samples) / 1000)
+
+        # fetch+parse: tải hết rồi parse, so với parse tăng dần và ngừng tải khi đủ trường
+        pull_threads = PullParseThreads(4)
+        for mode in ('buffered', 'streamed'):
+            start = time.perf_counter()
+            done = fetcher.run(_timed_fetch_parse(fetcher, parser, urls, pull_threads if mode == 'streamed' else None))
+            stage = summarize([ms for _, _, ms in done], len(done), time.perf_counter() - start)
+            stage['kb_per_page'] = round(sum(size for _, size, _ in done) / 1024 / max(len(done), 1), 1)
+            stage['articles'] = sum(1 for article, _, _ in done if article)
+            results[f'fetch_parse.{source}.{mode}'] = stage
+        pull_threads.shutdown()
+
+        return [parser.extract_article(url, html) for url, html in pages[:1]]
+    finally:
+        fetcher.close()
+        server.stop()
+
+
+def bench_analyze(args, results):
+    try:
+        from crawler.word_analyzer import WordAnalyzer
+        analyzer = WordAnalyzer(cefr_word_list_path=CEFR_PATH)
+    except Exception as e:
+        print(f"Skipping analyze stage: {e!r}")
+        results['analyze'] = {'skipped': repr(e)}
+        return None
+
+    corpus = synthetic_corpus(args.articles, args.words_per_article, seed=args.seed)
+    analyzer.extract_keywords_with_keybert(corpus[:1])  # warm-up
+    samples, keywords = [], []
+    start = time.perf_counter()
+    for i in range(0, len(corpus), args.analyze_batch):
+        batch = corpus[i:i + args.analyze_batch]
+        batch_keywords, ms = timed(analyzer.extract_keywords_with_keybert, batch)
+        keywords.extend(batch_keywords)
+        samples.append(ms / len(batch))
+    results['analyze'] = summarize(samples, len(corpus), time.perf_counter() - start)
+    return keywords
+
+
+def bench_enrich(args, results, keyword_lists):
+    if keyword_lists is None:
+        vocabulary = load_cefr_vocabulary(CEFR_PATH).canonical_words
+        rng = np.random.default_rng(args.seed)
+        keyword_lists = [list(rng.choice(vocabulary, size=20)) for _ in range(args.articles)]
+
+    server = StubEnrichServer(latency=args.enrich_latency).start()
+    client = EnrichmentClient(server.url, chunk_size=100, max_concurrency=4)
+    samples = []
+    start = time.perf_counter()
+    for i in range(0, len(keyword_lists), args.analyze_batch):
+        words = {word for keywords in keyword_lists[i:i + args.analyze_batch] for word in keywords}
+        _, ms = timed(client.enrich, words)
+        samples.append(ms)
+    results['enrich'] = summarize(samples, len(keyword_lists), time.perf_counter() - start)
+    results['enrich']['hit_rate'] = round(client.stats.hit_rate, 4)
+    client.close()
+    server.stop()
+
+
+def bench_store(args, results, template):
+    if args.mongo_uri:
+        from pymongo import MongoClient
+        from persistence import ensure_indexes
+        collection = MongoClient(args.mongo_uri)['crawl_bench']['articles_stage_bench']
+        collection.drop()
+        ensure_indexes(collection)
+    else:
+        collection = MemoryCollection()
+
+    template = dict(template or {'source': 'bench', 'title': 'Bench', 'desc': '', 'image': None})
+    template.pop('content_for_analysis', None)
+    template['list_words'] = [{'word': f'word{i}', 'cefr_level': 'B1'} for i in range(20)]
+    today = datetime.now(timezone.utc).date().isoformat()
+
+    samples = []
+    start = time.perf_counter()
+    for i in range(0, args.articles, args.analyze_batch):
+        batch = [dict(template, link=f'https://bench.local/{j}', crawled_date=today)
+                 for j in range(i, min(i + args.analyze_batch, args.articles))]
+        links = [article['link'] for article in batch]
+        _, lookup_ms = timed(find_existing_links, collection, links)
+        _, store_ms = timed(store_articles, collection, batch)
+        samples.append(lookup_ms + store_ms)
+    results['store'] = summarize(samples, args.articles, time.perf_counter() - start)
+
+
+class SimulatedModel:
+    """Chi phí model giả lập: mỗi lần gọi tốn một khoản cố định cộng thêm theo số bài, chạy tuần tự."""
+
+    def __init__(self, overhead_ms: float, per_article_ms: float):
+        self.overhead = overhead_ms / 1000
+        self.per_article = per_article_ms / 1000
+        self.lock = threading.Lock()
+        self.calls = 0
+
+    def analyze(self, sources, articles):
+        with self.lock:
+            self.calls += 1
+            time.sleep(self.overhead + self.per_article * len(articles))
+        return [['word'] for _ in articles]
+
+
+def _enrich_noop(sources, articles, keyword_lists):
+    for article, keywords in zip(articles, keyword_lists):
+        article['list_words'] = [{'word': word} for word in keywords]
+        article.pop('content_for_analysis', None)
+
+
+def bench_pipeline(args, results):
+    """
+    Crawl end-to-end nhiều lô nhỏ (`--chunk` link mỗi lô) của mọi nguồn cùng lúc: theo
+    lối cũ (mỗi nguồn fetch -> parse -> model -> lưu từng lô) và qua CrawlPipeline.
+    """
+    sources = [s.strip() for s in args.sources.split(',') if s.strip()]
+    servers = {source: FixtureServer.for_source(source, latency=args.latency, padding_kb=args.padding_kb,
+                                                padding_position=args.padding_position).start()
+               for source in sources}
+    chunks = {
+        source: [[servers[source].base_url + ARTICLE_PATHS[source].format(i)
+                  for i in range(start, min(start + args.chunk, args.pages))]
+                 for start in range(0, args.pages, args.chunk)]
+        for source in sources
+    }
+    total = args.pages * len(sources)
+    try:
+        for mode in ('sequential', 'streaming'):
+            fetcher = AsyncFetcher(per_host_limit=args.per_host_limit)
+            parsers = {source: PARSER_CLASSES[source](base_url=servers[source].base_url, fetcher=fetcher)
+                       for source in sources}
+            model = SimulatedModel(args.model_overhead_ms, args.model_per_article_ms)
+            collection = MemoryCollection()
+            pull_threads = PullParseThreads(4)
+
+            def store(batch_sources, articles):
+                return [a for a in articles if a['link'] not in store_articles(collection, articles).failed_links]
+
+            pipeline = CrawlPipeline(fetcher, parsers, model.analyze, _enrich_noop, store,
+                                     batch_size=args.pipeline_batch, batch_wait=0.05,
+                                     pull_threads=pull_threads)
+
+            def run_source(source):
+                samples = []
+                for links in chunks[source]:
+                    start = time.perf_counter()
+                    if mode == 'streaming':
+                        stored = pipeline.crawl(source, links)
+                    else:
+                        articles = parsers[source].parse_articles(links)
+                        if articles:
+                            keyword_lists = model.analyze([source] * len(articles), articles)
+                            _enrich_noop(None, articles, keyword_lists)
+                            store(None, articles)
+                        stored = articles
+                    samples.append((time.perf_counter() - start) * 1000 / max(len(stored), 1))
+                return samples
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=len(sources)) as pool:
+                samples = [ms for source_samples in pool.map(run_source, sources) for ms in source_samples]
+            seconds = time.perf_counter() - start
+            results[f'pipeline.{mode}'] = summarize(samples, total, seconds)
+            results[f'pipeline.{mode}']['model_calls'] = model.calls
+            pipeline.close()
+            pull_threads.shutdown()
+            fetcher.close()
+    finally:
+        for server in servers.values():
+            server.stop()
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    regressions = []
+    for stage, now in current['stages'].items():
+        before = baseline.get('stages', {}).get(stage)
+        if not before or 'skipped' in now or 'skipped' in before:
+            continue
+        if before.get('p50_ms') and now.get('p50_ms') and now['p50_ms'] > before['p50_ms'] * (1 + threshold):
+            regressions.append(f"{stage}: p50 {before['p50_ms']} -> {now['p50_ms']} ms")
+        if before.get('throughput_per_s') and now.get('throughput_per_s') and \
+                now['throughput_per_s'] < before['throughput_per_s'] * (1 - threshold):
+            regressions.append(f"{stage}: throughput {before['throughput_per_s']} -> {now['throughput_per_s']}/s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sources', default='bbc,guardian,reuters')
+    parser.add_argument('--pages', type=int, default=100, help='article pages fetched/parsed per source')
+    parser.add_argument('--listing-limit', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=10, help='listing crawls per source')
+    parser.add_argument('--latency', type=float, default=0.01, help='stand-in latency per request (s)')
+    parser.add_argument('--padding-kb', type=int, default=200, help='script blob injected into each page')
+    parser.add_argument('--padding-position', choices=('head', 'tail'), default='head',
+                        help='put the blob in <head> or at the end of <body>')
+    parser.add_argument('--per-host-limit', type=int, default=8)
+    parser.add_argument('--articles', type=int, default=50, help='synthetic corpus size')
+    parser.add_argument('--words-per-article', type=int, default=400)
+    parser.add_argument('--analyze-batch', type=int, default=10)
+    parser.add_argument('--skip-analyze', action='store_true')
+    parser.add_argument('--enrich-latency', type=float, default=0.02)
+    parser.add_argument('--chunk', type=int, default=2, help='links per crawl submission in the pipeline stage')
+    parser.add_argument('--pipeline-batch', type=int, default=16, help='analysis micro-batch size')
+    parser.add_argument('--model-overhead-ms', type=float, default=40, help='simulated cost per model call')
+    parser.add_argument('--model-per-article-ms', type=float, default=5, help='simulated cost per article')
+    parser.add_argument('--skip-pipeline', action='store_true')
+    parser.add_argument('--mongo-uri')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', help='write results JSON here')
+    parser.add_argument('--compare', help='baseline results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed relative slowdown')
+    args = parser.parse_args()
+
+    stages = {}
+    template = None
+    for source in [s.strip() for s in args.sources.split(',') if s.strip()]:
+        articles = bench_source(source, args, stages)
+        template = template or (articles[0] if articles else None)
+
+    keywords = None
+    if args.skip_analyze:
+        stages['analyze'] = {'skipped': 'disabled with --skip-analyze'}
+    else:
+        keywords = bench_analyze(args, stages)
+    bench_enrich(args, stages, keywords)
+    bench_store(args, stages, template)
+    if args.skip_pipeline:
+        stages['pipeline'] = {'skipped': 'disabled with --skip-pipeline'}
+    else:
+        bench_pipeline(args, stages)
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    report = {
+        'meta': {
+            'commit': commit,
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'args': vars(args),
+        },
+        'stages': stages,
+    }
+
+    print(f"{'stage':<34}{'items':>7}{'items/s':>11}{'p50 ms':>10}{'p95 ms':>10}")
+    for stage, result in stages.items():
+        if 'skipped' in result:
+            print(f"{stage:<34}  skipped: {result['skipped']}")
+            continue
+        print(f"{stage:<34}{result['items']:>7}{result['throughput_per_s'] or 0:>11.1f}"
+              f"{result['p50_ms'] or 0:>10.2f}{result['p95_ms'] or 0:>10.2f}")
+
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.out}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%} against {args.compare}.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""
+Dịch vụ enrichment giả lập để chạy offline.
+
+Nhận `POST {"words": [...]}` và trả `{"results": [{"word": ..., ...}]}` giống
+ENRICH_API_URL thật, với độ trễ và tỉ lệ lỗi cấu hình được. Chạy độc lập:
+
+    python -m benchmarks.stub_enrich_server --port 8765 --latency 0.05
+    ENRICH_API_URL=http://127.0.0.1:8765/enrich uvicorn api:app
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def fake_details(word: str) -> dict:
+    return {
+        'word': word,
+        'phonetic': f'/{word}/',
+        'definition': f'Synthetic definition of "{word}".',
+        'examples': [f'This sentence uses the word {word}.'],
+        'translation': f'[{word}]',
+    }
+
+
+class StubEnrichServer:
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.05,
+                 per_word_latency: float = 0.0005, failure_rate: float = 0.0):
+        self.latency = latency
+        self.per_word_latency = per_word_latency
+        self.failure_rate = failure_rate
+        self.requests = 0
+        self.words_served = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/enrich'
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                words = json.loads(self.rfile.read(length) or b'{}').get('words', [])
+                with stub._lock:
+                    stub.requests += 1
+                time.sleep(stub.latency + stub.per_word_latency * len(words))
+
+                if random.random() < stub.failure_rate:
+                    self.send_response(503)
+                    self.send_header('Retry-After', '0')
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+
+                with stub._lock:
+                    stub.words_served += len(words)
+                body = json.dumps({'results': [fake_details(word) for word in words]}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> 'StubEnrichServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    args = parser.parse_args()
+    server = StubEnrichServer(args.host, args.port, args.latency, failure_rate=args.failure_rate)
+    print(f"Stub enrichment service listening on {server.url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
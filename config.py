@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -5,6 +7,71 @@ class Settings(BaseSettings):
     MONGO_DB_NAME: str
     ENRICH_API_URL: str
 
+    LOG_LEVEL: str = "INFO"
+
+    # Lớp fetch dùng chung cho mọi parser
+    FETCH_TIMEOUT: float = 10
+    FETCH_PER_HOST_LIMIT: int = 4
+
+    # Số process parse HTML
+    PARSE_WORKERS: int = 2
+
+    # Hàng đợi job crawl: số nguồn chạy đồng thời và giới hạn bài mỗi nguồn
+    CRAWL_WORKERS: int = 3
+    CRAWL_MAX_LIMIT: int = 50
+
+    # Chỉ giữ keyword từ level CEFR này trở lên (vd. "B2"); để trống để giữ tất cả
+    KEYWORD_MIN_LEVEL: Optional[str] = None
+    # Cách trích xuất keyword: "keybert" (model embedding) hoặc "tfidf" (thống kê, không cần model)
+    KEYWORD_MODE: str = "keybert"
+
+    # Client enrichment: cache Mongo (TTL) + LRU, gửi theo chunk
+    ENRICH_CACHE_TTL_DAYS: int = 30
+    ENRICH_LRU_SIZE: int = 20000
+    ENRICH_CHUNK_SIZE: int = 100
+    ENRICH_MAX_CONCURRENCY: int = 4
+    ENRICH_MAX_RETRIES: int = 3
+    ENRICH_TIMEOUT: float = 30
+
+    # Bài có độ tương đồng MinHash từ ngưỡng này được coi là bản đăng lại của bài đã có
+    DEDUP_THRESHOLD: float = 0.8
+
+    # /articles: số bài mỗi trang mặc định, số bài mỗi lô khi stream NDJSON, cache response trong tiến trình
+    ARTICLES_PAGE_SIZE: int = 100
+    ARTICLES_STREAM_BATCH: int = 100
+    ARTICLES_CACHE_ENTRIES: int = 256
+    ARTICLES_CACHE_TTL: int = 3600
+    # Ngày hôm nay vẫn nhận bài từ các worker khác (lệnh xoá cache chỉ có trong tiến trình đã ghi)
+    ARTICLES_CACHE_TODAY_TTL: int = 30
+
+    # Giới hạn body mỗi trang; tải và parse tăng dần, ngừng đọc khi bài đã đủ trường
+    FETCH_MAX_BODY_BYTES: int = 5 * 1024 * 1024
+    STREAM_PARSE: bool = True
+
+    # Điều tiết theo host: tốc độ ban đầu/tối đa (request/s), tự giảm khi host quá tải;
+    # FETCH_PER_HOST_LIMIT là số request đồng thời tối đa mỗi host
+    HOST_RATE: float = 2.0
+    HOST_MAX_RATE: float = 20.0
+    FETCH_MAX_RETRIES: int = 3
+    RESPECT_ROBOTS: bool = True
+
+    # Điều phối nhiều worker/node: hạn lease (gia hạn mỗi 1/3), chu kỳ kiểm tra lần crawl
+    # bị bỏ dở / backfill đang mở, và thời gian chờ trước khi chạy lại crawl trong ngày bị lỗi
+    LEASE_TTL_SECONDS: int = 60
+    COORDINATION_POLL_SECONDS: int = 30
+    CRAWL_RETRY_SECONDS: int = 600
+
+    # Pipeline crawl: số fetch đồng thời, độ dài hàng đợi giữa các stage và micro-batch của model
+    PIPELINE_FETCH_CONCURRENCY: int = 16
+    PIPELINE_QUEUE_SIZE: int = 64
+    ANALYZE_BATCH_SIZE: int = 16
+    ANALYZE_BATCH_WAIT: float = 0.5
+
+    # Backfill lịch sử: số link mỗi chunk pipeline và số trang lưu trữ tối đa mỗi ngày
+    BACKFILL_CHUNK_SIZE: int = 20
+    BACKFILL_MAX_PAGES_PER_DAY: int = 20
+    BACKFILL_MAX_DAYS: int = 366
+
     class Config:
         env_file = ".env"
 
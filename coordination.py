@@ -0,0 +1,175 @@
+"""
+Điều phối giữa nhiều worker/node qua collection `coordination` trong Mongo.
+
+Một lease là một document {_id: tên, owner, expires_at}: chỉ một owner giữ nó
+tới khi hết hạn. Lấy lease là một lệnh upsert có điều kiện (chưa có hoặc đã hết
+hạn), nên hai tiến trình không thể cùng thắng: bên thua gặp DuplicateKeyError.
+Thread heartbeat gia hạn các lease đang giữ; tiến trình chết thì lease hết hạn
+sau `ttl_seconds` và tiến trình khác lấy lại được.
+
+Lease được dùng cho:
+- bầu leader (`leader`): chỉ leader khởi động các lần crawl định kỳ;
+- mỗi lần chạy (`daily_crawl:<ngày>`): đánh dấu `done` khi xong nên không chạy lại;
+- shard backfill (`backfill:<run_id>:<nguồn>:<ngày>`): worker nào lấy được thì xử lý,
+  trang đang dở lưu trong lease để worker khác tiếp tục nếu nó chết.
+
+Hạn lease tính theo đồng hồ của từng tiến trình, nên `ttl_seconds` phải lớn hơn
+nhiều so với độ lệch đồng hồ giữa các node.
+"""
+import logging
+import os
+import re
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from pymongo import ReturnDocument
+from pymongo.collection import Collection
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+DONE = 'done'
+LEADER = 'leader'
+
+
+def default_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+def _now() -> datetime:
+    # pymongo đọc datetime ra dạng naive UTC
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def is_live(lease: Optional[Dict]) -> bool:
+    """Lease đang có owner còn hạn."""
+    return bool(lease and lease.get('owner') and lease.get('expires_at') and lease['expires_at'] > _now())
+
+
+class Coordinator:
+    def __init__(self, collection: Collection, owner: Optional[str] = None, ttl_seconds: float = 60,
+                 retention_days: int = 30):
+        self.collection = collection
+        self.owner = owner or default_owner()
+        self.ttl_seconds = ttl_seconds
+        self.retention_days = retention_days
+        self._held: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._leader_until = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def ensure_indexes(self):
+        # Lần chạy/shard đã xong được giữ `retention_days` ngày để không bị chạy lại
+        self.collection.create_index('finished_at', expireAfterSeconds=self.retention_days * 86400,
+                                     name='finished_ttl')
+
+    def acquire(self, name: str, ttl_seconds: Optional[float] = None, **fields) -> Optional[Dict]:
+        """Lấy lease `name` nếu chưa ai giữ hoặc đã hết hạn; trả về document lease, None nếu không lấy được."""
+        ttl = ttl_seconds or self.ttl_seconds
+        now = _now()
+        try:
+            lease = self.collection.find_one_and_update(
+                {'_id': name, 'state': {'$ne': DONE}, 'expires_at': {'$lte': now}},
+                {'$set': dict(fields, owner=self.owner, expires_at=now + timedelta(seconds=ttl), acquired_at=now)},
+                upsert=True, return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # Lease tồn tại nhưng còn hạn, hoặc đã xong
+            return None
+        with self._lock:
+            self._held[name] = ttl
+        return lease
+
+    def update(self, name: str, **fields) -> bool:
+        """Gia hạn lease đang giữ và ghi thêm `fields` (vd. tiến độ); False nếu đã mất lease."""
+        with self._lock:
+            ttl = self._held.get(name, self.ttl_seconds)
+        result = self.collection.update_one(
+            {'_id': name, 'owner': self.owner, 'state': {'$ne': DONE}},
+            {'$set': dict(fields, expires_at=_now() + timedelta(seconds=ttl))}
+        )
+        if result.matched_count:
+            return True
+        with self._lock:
+            self._held.pop(name, None)
+        return False
+
+    def release(self, name: str, done: bool = False, retry_after: float = 0, **fields):
+        """
+        Trả lease. `done=True` đánh dấu lần chạy đã xong, không ai lấy lại được;
+        nếu không, lease lấy lại được sau `retry_after` giây, giữ nguyên tiến độ đã ghi.
+        """
+        with self._lock:
+            self._held.pop(name, None)
+        now = _now()
+        if done:
+            update = {'$set': dict(fields, state=DONE, finished_at=now), '$unset': {'expires_at': ''}}
+        else:
+            update = {'$set': dict(fields, expires_at=now + timedelta(seconds=retry_after)),
+                      '$unset': {'owner': ''}}
+        self.collection.update_one({'_id': name, 'owner': self.owner}, update)
+
+    def get(self, name: str) -> Optional[Dict]:
+        return self.collection.find_one({'_id': name})
+
+    def find(self, prefix: str) -> List[Dict]:
+        return list(self.collection.find({'_id': {'$regex': '^' + re.escape(prefix)}}))
+
+    def publish(self, name: str, **fields):
+        """Ghi một document dùng chung (không phải lease), vd. mô tả một lần backfill."""
+        self.collection.update_one({'_id': name}, {'$set': dict(fields, updated_at=_now())}, upsert=True)
+
+    @property
+    def is_leader(self) -> bool:
+        # Không gia hạn được (vd. mất kết nối Mongo) thì tự coi là hết làm leader khi lease hết hạn
+        return time.monotonic() < self._leader_until
+
+    def _elect(self):
+        was_leader = self.is_leader
+        started = time.monotonic()
+        try:
+            elected = (was_leader and self.update(LEADER)) or self.acquire(LEADER) is not None
+        except PyMongoError as e:
+            logger.warning("Leader election failed: %r", e)
+            return
+        self._leader_until = started + self.ttl_seconds if elected else 0.0
+        if elected != was_leader:
+            logger.info("Worker %s %s the leader.", self.owner, 'is now' if elected else 'is no longer')
+
+    def _heartbeat(self, interval: float):
+        while not self._stop.wait(interval):
+            with self._lock:
+                names = [name for name in self._held if name != LEADER]
+            for name in names:
+                try:
+                    if not self.update(name):
+                        logger.warning("Lost lease %s to another worker.", name)
+                except PyMongoError as e:
+                    logger.warning("Could not renew lease %s: %r", name, e)
+            self._elect()
+
+    def start(self):
+        """Bầu leader ngay, rồi gia hạn lease và bầu lại trên thread nền mỗi ttl/3."""
+        self._elect()
+        self._thread = threading.Thread(target=self._heartbeat, args=(self.ttl_seconds / 3,),
+                                        name="coordination-heartbeat", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Dừng heartbeat và trả mọi lease đang giữ để worker khác tiếp quản ngay."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        with self._lock:
+            names = list(self._held)
+        for name in names:
+            try:
+                self.release(name)
+            except PyMongoError as e:
+                logger.warning("Could not release lease %s: %r", name, e)
+        self._leader_until = 0.0
@@ -1,14 +1,199 @@
+import logging
 from abc import ABC, abstractmethod
-from typing import List, Dict, Optional
+from datetime import date, datetime, timezone
+from typing import Iterator, List, Dict, Optional
+
+from crawler.extraction import FieldRules, PullExtractor
+from crawler.html_utils import parse_html
+from crawler.http_client import AsyncFetcher, get_default_fetcher
+from crawler.observability import ARTICLES_FAILED, PAGES_FETCHED, stage_timer
+from crawler.validator_store import ValidatorStore
+
+logger = logging.getLogger(__name__)
+
+# Trang lưu trữ không tồn tại: ngày không có bài hoặc đã hết trang
+ARCHIVE_MISSING_STATUS = (404, 410)
+
+
+class ArchiveFetchError(Exception):
+    """Không tải được một trang lưu trữ (lỗi mạng, 5xx, ...); ngày đó cần được thử lại."""
+
+
+def normalize_date(value: Optional[str]) -> Optional[str]:
+    """Chuẩn hóa ngày ISO 8601 về UTC dạng `YYYY-MM-DDTHH:MM:SSZ`; None nếu không đọc được."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc)
+    return parsed.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def analysis_text(*parts: Optional[str]) -> str:
+    """Nối tiêu đề, mô tả và thân bài thành văn bản cho bước phân tích từ vựng."""
+    sentences = [part.strip().rstrip('.') for part in parts if part and part.strip()]
+    return '. '.join(sentences) + '.' if sentences else ''
+
 
 class BaseParser(ABC):
-    
+    # Khóa của nguồn trong PARSERS, dùng làm nhãn cho metrics
+    source: str
+    # Tên hiển thị, ghi vào trường `source` của bài báo
+    source_name: str
+    news_url: str
+    # Luật trích xuất bài báo (title, desc, published_date, image, body), biên dịch một lần cho mỗi lớp
+    field_rules: FieldRules
+
+    def __init__(self, fetcher: Optional[AsyncFetcher] = None, validator_store: Optional[ValidatorStore] = None):
+        self._fetcher = fetcher
+        self.validator_store = validator_store
+
+    @property
+    def fetcher(self) -> AsyncFetcher:
+        if self._fetcher is None:
+            self._fetcher = get_default_fetcher()
+        return self._fetcher
+
+    def __getstate__(self):
+        # Chỉ cấu hình parse được gửi sang process con; fetcher và kho validator ở lại
+        state = self.__dict__.copy()
+        state['_fetcher'] = None
+        state['validator_store'] = None
+        return state
+
     @abstractmethod
+    def extract_links(self, html: bytes, limit: int) -> List[str]:
+        """Lấy các link bài báo từ HTML của trang danh sách."""
+        pass
+
+    def extract_article(self, url: str, html: bytes) -> Optional[Dict]:
+        """Phân tích HTML của một bài báo bằng `field_rules` và trả về dữ liệu có cấu trúc."""
+        logger.debug("Parsing article: %s", url)
+        root = parse_html(html)
+        if root is None:
+            return None
+        try:
+            fields = self.field_rules.extract(root)
+            return self.build_article(url, fields, root) if fields is not None else None
+        except Exception as e:
+            logger.warning("Could not extract article %s: %r", url, e, extra={'source': self.source})
+            return None
+
+    def new_pull_extractor(self) -> PullExtractor:
+        """Bộ trích xuất tăng dần cho một trang: nhận chunk khi đang tải, báo khi có thể ngừng đọc."""
+        return PullExtractor(self.field_rules)
+
+    def finish_article(self, url: str, extractor: PullExtractor) -> Optional[Dict]:
+        """Kết quả của `new_pull_extractor` sau khi tải xong hoặc dừng sớm; cùng schema với extract_article."""
+        try:
+            fields, root = extractor.close()
+            return self.build_article(url, fields, root) if fields is not None else None
+        except Exception as e:
+            logger.warning("Could not extract article %s: %r", url, e, extra={'source': self.source})
+            return None
+
+    def build_article(self, url: str, fields: Dict, root=None) -> Dict:
+        """
+        Dựng bài báo theo schema chung của mọi nguồn; trường không tìm thấy là None.
+        Nguồn cần suy luận thêm (vd. ngày từ URL) ghi đè rồi gọi lại hàm này.
+        """
+        title = fields.get('title')
+        desc = fields.get('desc')
+        return {
+            "source": self.source_name,
+            "link": url,
+            "title": title,
+            "desc": desc,
+            "published_date": normalize_date(fields.get('published_date')),
+            "image": fields.get('image'),
+            "content_for_analysis": analysis_text(title, desc, ' '.join(fields.get('body') or []))
+        }
+
+    def archive_page_urls(self, day: date) -> Iterator[str]:
+        """Các trang lưu trữ/danh sách theo thứ tự cho một ngày; nguồn không có lưu trữ trả về rỗng."""
+        return iter(())
+
+    def extract_archive_links(self, html: bytes) -> List[str]:
+        """Mọi link bài báo trên một trang lưu trữ; mặc định dùng lại extract_links."""
+        return self.extract_links(html, limit=10 ** 9)
+
+    def iter_archive_links(self, day: date, start_page: int = 0, max_pages: int = 50) -> Iterator[tuple]:
+        """
+        Duyệt các trang lưu trữ của `day`, từ trang `start_page`, và yield
+        `(page_index, links)` cho từng trang. Dừng khi trang không tồn tại (404/410)
+        hoặc không còn link mới, nên chỉ một trang link nằm trong bộ nhớ tại mỗi thời
+        điểm. Trang tải lỗi gây ra `ArchiveFetchError` thay vì được coi là hết trang.
+        """
+        seen = set()
+        for page_index, page_url in enumerate(self.archive_page_urls(day)):
+            if page_index >= max_pages:
+                break
+            if page_index < start_page:
+                continue
+            with stage_timer('fetch', self.source):
+                response = self.fetcher.fetch_response(page_url, accept_status=ARCHIVE_MISSING_STATUS)
+            if response is None:
+                raise ArchiveFetchError(f"Could not fetch archive page {page_url}")
+            if response.status in ARCHIVE_MISSING_STATUS:
+                break
+            html = response.body
+            PAGES_FETCHED.labels(source=self.source, kind='archive').inc()
+            with stage_timer('parse', self.source):
+                links = [link for link in self.extract_archive_links(html) if link not in seen]
+            if not links:
+                break
+            seen.update(links)
+            yield page_index, links
+
     def get_latest_links(self, limit: int = 5) -> List[str]:
         """Lấy danh sách các link bài báo mới nhất."""
-        pass
+        logger.info("Fetching latest links from %s...", self.news_url, extra={'source': self.source})
+        cached = self.validator_store.get(self.news_url) if self.validator_store else None
+        # Chỉ gửi request có điều kiện khi danh sách đã lưu đủ cho `limit` hiện tại
+        use_cache = bool(cached) and cached.get('limit', 0) >= limit
+        headers = self.validator_store.conditional_headers(self.news_url) if use_cache else None
+
+        with stage_timer('fetch', self.source):
+            response = self.fetcher.fetch_response(self.news_url, headers)
+        if response is None:
+            return []
+        PAGES_FETCHED.labels(source=self.source, kind='listing').inc()
+        if response.status == 304 and use_cache:
+            logger.info("%s not modified; reusing cached links.", self.news_url, extra={'source': self.source})
+            return cached['links'][:limit]
+
+        with stage_timer('parse', self.source):
+            links = self.extract_links(response.body, limit)
+        if self.validator_store:
+            self.validator_store.update(self.news_url, response.headers, links, limit)
+        return links
 
-    @abstractmethod
     def parse_article(self, url: str) -> Optional[Dict]:
-        """Phân tích một link bài báo và trả về dữ liệu có cấu trúc."""
-        pass
\ No newline at end of file
+        """Tải và phân tích một link bài báo."""
+        articles = self.parse_articles([url])
+        return articles[0] if articles else None
+
+    def parse_articles(self, urls: List[str], parse_pool=None) -> List[Dict]:
+        """
+        Tải đồng thời tất cả `urls` rồi phân tích; bỏ qua các bài lỗi. Nếu có
+        `parse_pool`, phần parse chạy song song trong các process con.
+        """
+        urls = [url for url in urls if url]
+        if not urls:
+            return []
+        with stage_timer('fetch', self.source):
+            pages = [(url, html) for url, html in zip(urls, self.fetcher.fetch_many(urls)) if html is not None]
+        PAGES_FETCHED.labels(source=self.source, kind='article').inc(len(pages))
+        ARTICLES_FAILED.labels(source=self.source, stage='fetch').inc(len(urls) - len(pages))
+
+        with stage_timer('parse', self.source):
+            if parse_pool is not None:
+                articles = parse_pool.extract_articles(self, pages)
+            else:
+                articles = [self.extract_article(url, html) for url, html in pages]
+        articles = [article for article in articles if article]
+        ARTICLES_FAILED.labels(source=self.source, stage='parse').inc(len(pages) - len(articles))
+        return articles
@@ -1,30 +1,49 @@
-import requests
-from bs4 import BeautifulSoup
+from datetime import date
 from urllib.parse import urljoin
+import logging
 import re
 
-from crawler.base_parser import BaseParser 
+from crawler.base_parser import BaseParser
+from crawler.extraction import Field, FieldRules, Rule
+from crawler.html_utils import parse_html
+
+logger = logging.getLogger(__name__)
+
+
+def _in_container(selector: str, value: str = 'text', **options):
+    # Thân bài nằm trong <article> đầu tiên, trang kiểu mới dùng <main id="main-content">;
+    # chỉ xét container đầu tiên vì các <article> sau đó là tin liên quan
+    return [Rule(selector, value, within='article', first=True, **options),
+            Rule(selector, value, within='main#main-content', first=True, **options)]
+
+
 class BBCParser(BaseParser):
-    def __init__(self, base_url="https://www.bbc.com"):
+    source = "bbc"
+    source_name = "BBC News"
+    field_rules = FieldRules([
+        Field('container', [Rule('article', 'present'), Rule('main#main-content', 'present')], required=True),
+        Field('title', _in_container('h1')),
+        Field('desc', [Rule('meta[name="description"]', '@content')]),
+        Field('published_date', _in_container('time', '@datetime')),
+        Field('image', [
+            Rule('meta[property="og:image"]', '@content'),
+            *_in_container('img', '@src', when=lambda src: 'placeholder' not in src),
+        ]),
+        Field('body', _in_container('p'), many=True),
+    ])
+
+    def __init__(self, base_url="https://www.bbc.com", fetcher=None, validator_store=None):
+        super().__init__(fetcher, validator_store)
         self.base_url = base_url
         self.news_url = urljoin(base_url, "/news")
         self.archive_base_url = urljoin(base_url, "/news/archive")
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
 
-    def get_latest_links(self, limit=1):
-        print(f"Fetching latest links from {self.news_url}...")
-        try:
-            response = requests.get(self.news_url, headers=self.headers, timeout=10)
-            response.raise_for_status()
-        except requests.RequestException as e:
-            print(f"Error fetching page {self.news_url}: {e}")
+    def extract_links(self, html, limit=1):
+        root = parse_html(html)
+        if root is None:
             return []
-
-        soup = BeautifulSoup(response.content, 'lxml')
         links = set()
-        for a_tag in soup.select('a[href*="/news/"]'):
+        for a_tag in root.xpath('//a[contains(@href, "/news/")]'):
             href = a_tag.get('href')
             if href:
                 if '/live/' in href or '/av/' in href or '/topics/' in href:
@@ -36,46 +55,5 @@ class BBCParser(BaseParser):
                 break
         return list(links)[:limit]
 
-
-    def parse_article(self, article_url):
-        print(f"Parsing article: {article_url}")
-        try:
-            response = requests.get(article_url, headers=self.headers, timeout=10)
-            response.raise_for_status()
-        except requests.RequestException as e:
-            print(f"Error fetching article {article_url}: {e}")
-            return None
-
-        soup = BeautifulSoup(response.content, 'lxml')
-        
-        article_body = soup.find('article')
-        if not article_body:
-            article_body = soup.find('main', {'id': 'main-content'})
-            if not article_body:
-                return None
-
-        title = article_body.find('h1')
-        desc_tag = soup.find('meta', {'name': 'description'})
-        date_tag = article_body.find('time')
-        
-        main_image_url = "N/A"
-        og_image_tag = soup.find('meta', property='og:image')
-        if og_image_tag and og_image_tag.has_attr('content'):
-            main_image_url = og_image_tag['content']
-        elif article_body:
-            img_tag = article_body.find('img')
-            if img_tag and img_tag.has_attr('src') and 'placeholder' not in img_tag['src']:
-                main_image_url = img_tag['src']
-
-        paragraphs = article_body.select('p')
-        content_text = ' '.join([p.get_text(strip=True) for p in paragraphs])
-        
-        return {
-            "src": "BBC News", 
-            "link": article_url,
-            "title": title.get_text(strip=True) if title else "N/A",
-            "desc": desc_tag['content'] if desc_tag else "N/A",
-            "published_date": date_tag['datetime'] if date_tag else "N/A",
-            "image": main_image_url, 
-            "content_for_analysis": content_text
-        }
\ No newline at end of file
+    def archive_page_urls(self, day: date):
+        yield f"{self.archive_base_url}/{day:%Y%m%d}"
@@ -0,0 +1,141 @@
+"""
+Ma trận embedding dựng sẵn cho toàn bộ từ vựng CEFR.
+
+Mọi keyword được giữ lại đều phải là một lemma trong danh sách CEFR, nên tập
+vector cần dùng là nhỏ và cố định. Ma trận được encode một lần, lưu xuống đĩa
+(`.npy` + chỉ mục word -> row) và được memory-map khi khởi động. Tên file chứa
+tên model và hash của file CSV, nên cache tự dựng lại khi một trong hai thay đổi.
+
+Dựng trước cache:
+
+    python -m crawler.cefr_embeddings data/word_list_cefr_clean.csv
+"""
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from crawler.cefr_vocab import file_sha256, load_cefr_vocabulary
+
+DEFAULT_MODEL_NAME = 'all-MiniLM-L6-v2'
+DEFAULT_CACHE_DIR = os.path.join('data', 'cache')
+
+logger = logging.getLogger(__name__)
+
+
+class CefrEmbeddings:
+    def __init__(self, matrix: np.ndarray, words: List[str]):
+        self.matrix = matrix
+        self.words = words
+        self.index: Dict[str, int] = {word: row for row, word in enumerate(words)}
+
+    def __contains__(self, word: str) -> bool:
+        return word in self.index
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def rows(self, words: List[str]) -> np.ndarray:
+        """Trả về các vector (đã chuẩn hóa) của `words`; tất cả phải có trong chỉ mục."""
+        return np.asarray(self.matrix[[self.index[word] for word in words]])
+
+
+def _cache_prefix(model_name: str) -> str:
+    # Mỗi hàng là một từ chuẩn của chỉ mục CEFR (xem crawler/cefr_vocab.py)
+    return 'cefr_words_' + re.sub(r'[^A-Za-z0-9_.-]+', '_', model_name)
+
+
+def cache_paths(csv_path: str, model_name: str = DEFAULT_MODEL_NAME, cache_dir: str = DEFAULT_CACHE_DIR):
+    base = os.path.join(cache_dir, f"{_cache_prefix(model_name)}_{file_sha256(csv_path)[:16]}")
+    return base + '.npy', base + '.json'
+
+
+def build_cefr_embeddings(csv_path: str, model, model_name: str = DEFAULT_MODEL_NAME,
+                          cache_dir: str = DEFAULT_CACHE_DIR, batch_size: int = 256) -> CefrEmbeddings:
+    """Encode toàn bộ từ vựng CEFR bằng `model` và ghi ma trận đã chuẩn hóa xuống đĩa."""
+    os.makedirs(cache_dir, exist_ok=True)
+    matrix_path, index_path = cache_paths(csv_path, model_name, cache_dir)
+    words = load_cefr_vocabulary(csv_path, cache_dir).canonical_words
+
+    logger.info("Embedding %d CEFR words with %s...", len(words), model_name)
+    embeddings = model.encode(words, batch_size=batch_size, convert_to_numpy=True, show_progress_bar=False)
+    embeddings = embeddings.astype(np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    embeddings /= norms
+
+    # Nhiều worker có thể cùng dựng cache: mỗi tiến trình ghi file tạm riêng rồi rename,
+    # nên không ai đọc phải file dở dang (nội dung giống nhau, ai rename sau cũng đúng)
+    _write_atomic(matrix_path, 'wb', lambda f: np.save(f, embeddings))
+    _write_atomic(index_path, 'w', lambda f: json.dump({
+        'model_name': model_name,
+        'csv_sha256': file_sha256(csv_path),
+        'dim': int(embeddings.shape[1]),
+        'words': words,
+    }, f, ensure_ascii=False))
+
+    _remove_stale_caches(cache_dir, model_name, keep=(matrix_path, index_path))
+    logger.info("CEFR embedding matrix saved to %s.", matrix_path)
+    return load_cefr_embeddings(csv_path, model_name, cache_dir)
+
+
+def _write_atomic(path: str, mode: str, write):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, mode, **({} if 'b' in mode else {'encoding': 'utf-8'})) as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _remove_stale_caches(cache_dir: str, model_name: str, keep):
+    prefix = _cache_prefix(model_name) + '_'
+    keep = {os.path.abspath(path) for path in keep}
+    for name in os.listdir(cache_dir):
+        path = os.path.abspath(os.path.join(cache_dir, name))
+        if name.startswith(prefix) and name.endswith(('.npy', '.json')) and path not in keep:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # Tiến trình khác vừa xoá
+                pass
+
+
+def load_cefr_embeddings(csv_path: str, model_name: str = DEFAULT_MODEL_NAME,
+                         cache_dir: str = DEFAULT_CACHE_DIR) -> Optional[CefrEmbeddings]:
+    """Memory-map ma trận đã dựng; trả về None nếu chưa có cache hợp lệ."""
+    matrix_path, index_path = cache_paths(csv_path, model_name, cache_dir)
+    if not (os.path.exists(matrix_path) and os.path.exists(index_path)):
+        return None
+    with open(index_path, encoding='utf-8') as f:
+        meta = json.load(f)
+    if meta.get('model_name') != model_name:
+        return None
+    matrix = np.load(matrix_path, mmap_mode='r')
+    if matrix.shape[0] != len(meta['words']):
+        return None
+    return CefrEmbeddings(matrix, meta['words'])
+
+
+def load_or_build_cefr_embeddings(csv_path: str, model, model_name: str = DEFAULT_MODEL_NAME,
+                                  cache_dir: str = DEFAULT_CACHE_DIR) -> CefrEmbeddings:
+    embeddings = load_cefr_embeddings(csv_path, model_name, cache_dir)
+    if embeddings is None:
+        embeddings = build_cefr_embeddings(csv_path, model, model_name, cache_dir)
+    return embeddings
+
+
+if __name__ == '__main__':
+    from sentence_transformers import SentenceTransformer
+
+    path = sys.argv[1] if len(sys.argv) > 1 else os.path.join('data', 'word_list_cefr_clean.csv')
+    name = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_MODEL_NAME
+    build_cefr_embeddings(path, SentenceTransformer(name), name)
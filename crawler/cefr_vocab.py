@@ -0,0 +1,138 @@
+"""
+Chỉ mục từ vựng CEFR đã biên dịch.
+
+File CSV (`word,level`) được biên dịch một lần thành một dict
+`biến thể -> (từ chuẩn, level)` và lưu dạng pickle trong `data/cache/`, nên các
+lần khởi động sau chỉ cần nạp một file nhị phân nhỏ. Các dòng có nhiều cách
+viết như `a.m./A.M./am/AM` hay `behavior/behaviour` được tách thành từng biến
+thể trỏ về cùng một từ chuẩn (cách viết đầu tiên). Một từ xuất hiện ở nhiều
+level (khác từ loại) giữ level thấp nhất.
+
+Biên dịch trước:
+
+    python -m crawler.cefr_vocab data/word_list_cefr_clean.csv
+"""
+import csv
+import hashlib
+import logging
+import os
+import pickle
+import sys
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+CEFR_LEVELS = ('A1', 'A2', 'B1', 'B2', 'C1', 'C2')
+_LEVEL_RANK = {level: rank for rank, level in enumerate(CEFR_LEVELS)}
+_FORMAT_VERSION = 1
+
+DEFAULT_CACHE_DIR = os.path.join('data', 'cache')
+
+logger = logging.getLogger(__name__)
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def level_rank(level: str) -> int:
+    """Thứ hạng của level CEFR ('A1' -> 0 ... 'C2' -> 5)."""
+    try:
+        return _LEVEL_RANK[level.upper()]
+    except (KeyError, AttributeError):
+        raise ValueError(f"Unknown CEFR level: {level!r}") from None
+
+
+class CefrVocabulary:
+    def __init__(self, entries: Dict[str, Tuple[str, int]], canonical_words: List[str]):
+        self.entries = entries
+        self.canonical_words = canonical_words
+
+    def __contains__(self, word: str) -> bool:
+        return word in self.entries
+
+    def __len__(self) -> int:
+        return len(self.canonical_words)
+
+    def lookup(self, word: str) -> Optional[Tuple[str, str]]:
+        """(từ chuẩn, level) của một biến thể/lemma đã lowercase, hoặc None."""
+        entry = self.entries.get(word)
+        if entry is None:
+            return None
+        return entry[0], CEFR_LEVELS[entry[1]]
+
+    def canonical(self, word: str) -> Optional[str]:
+        entry = self.entries.get(word)
+        return entry[0] if entry else None
+
+    def level(self, word: str) -> Optional[str]:
+        entry = self.entries.get(word)
+        return CEFR_LEVELS[entry[1]] if entry else None
+
+    def rank(self, word: str) -> Optional[int]:
+        entry = self.entries.get(word)
+        return entry[1] if entry else None
+
+
+def compile_vocabulary(csv_path: str) -> CefrVocabulary:
+    rows = []
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            variants = [v.strip().lower() for v in (row.get('word') or '').split('/') if v.strip()]
+            level = (row.get('level') or '').strip().upper()
+            if variants and level in _LEVEL_RANK:
+                rows.append((variants, _LEVEL_RANK[level]))
+
+    canonical_rank: Dict[str, int] = {}
+    for variants, rank in rows:
+        canonical = variants[0]
+        canonical_rank[canonical] = min(rank, canonical_rank.get(canonical, rank))
+
+    entries: Dict[str, Tuple[str, int]] = {word: (word, rank) for word, rank in canonical_rank.items()}
+    # Biến thể chỉ được thêm khi nó không phải là từ chuẩn của một dòng khác
+    for variants, _ in rows:
+        canonical = variants[0]
+        for variant in variants[1:]:
+            if variant not in entries:
+                entries[variant] = (canonical, canonical_rank[canonical])
+
+    return CefrVocabulary(entries, list(canonical_rank))
+
+
+def _cache_path(csv_path: str, cache_dir: str) -> str:
+    return os.path.join(cache_dir, f"cefr_vocab_v{_FORMAT_VERSION}_{file_sha256(csv_path)[:16]}.pkl")
+
+
+def load_cefr_vocabulary(csv_path: str, cache_dir: str = DEFAULT_CACHE_DIR) -> CefrVocabulary:
+    """Nạp chỉ mục đã biên dịch, hoặc biên dịch lại nếu CSV đã thay đổi."""
+    path = _cache_path(csv_path, cache_dir)
+    if os.path.exists(path):
+        try:
+            with open(path, 'rb') as f:
+                entries, canonical_words = pickle.load(f)
+            return CefrVocabulary(entries, canonical_words)
+        except (OSError, pickle.UnpicklingError, ValueError, EOFError) as e:
+            logger.warning("Rebuilding unreadable CEFR vocabulary cache %s: %r", path, e)
+
+    vocabulary = compile_vocabulary(csv_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    # File tạm riêng cho mỗi tiến trình: nhiều worker khởi động cùng lúc không ghi đè lên nhau
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump((vocabulary.entries, vocabulary.canonical_words), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return vocabulary
+
+
+if __name__ == '__main__':
+    source = sys.argv[1] if len(sys.argv) > 1 else os.path.join('data', 'word_list_cefr_clean.csv')
+    vocab = load_cefr_vocabulary(source)
+    print(f"Compiled {len(vocab)} CEFR words ({len(vocab.entries)} spellings) from {source}.")
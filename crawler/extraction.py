@@ -0,0 +1,326 @@
+"""
+Engine trích xuất bài báo theo luật khai báo, một lượt duyệt cây.
+
+Mỗi nguồn mô tả các trường (title, desc, date, image, body, ...) bằng danh sách
+`Rule` theo thứ tự ưu tiên; selector là một tập con nhỏ của CSS
+(`tag#id.class[attr]`, `[attr="v"]`, `[attr^="v"]`, `[attr*="v"]`) và được biên
+dịch sẵn một lần cho mỗi lớp parser. Khi trích xuất, engine duyệt cây đúng một
+lần, chỉ qua các tag có trong luật (lọc ở tầng C), thay vì mỗi trường một lượt
+tìm `//h1`, `//time`, `//p`, ...; điều kiện "nằm trong" được kiểm tra bằng tổ
+tiên của element đã khớp.
+
+Engine cũng nhận chuỗi sự kiện ('start' / 'end', element) nên dùng được với
+parser tăng dần (HTMLPullParser) và cho biết khi nào mọi trường đã đủ (`done`);
+`PullExtractor` nhận bytes theo chunk khi đang tải và báo khi có thể ngừng đọc.
+"""
+import re
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from lxml import etree, html as lxml_html
+
+from crawler.html_utils import text_of
+
+_SELECTOR_RE = re.compile(
+    r'^(?P<tag>[a-zA-Z][\w-]*)?'
+    r'(?P<rest>(?:#[\w-]+|\.[\w-]+|\[[\w:-]+(?:[\^*]?="[^"]*")?\])*)$'
+)
+_PART_RE = re.compile(r'#(?P<id>[\w-]+)|\.(?P<cls>[\w-]+)|\[(?P<attr>[\w:-]+)(?:(?P<op>[\^*]?=)"(?P<val>[^"]*)")?\]')
+
+
+class Selector:
+    """Selector CSS tối giản đã biên dịch thành một hàm kiểm tra element."""
+
+    def __init__(self, text: str):
+        match = _SELECTOR_RE.match(text.strip())
+        if not match or not match.group('tag'):
+            raise ValueError(f"Unsupported selector (a tag name is required): {text!r}")
+        self.text = text
+        self.tag = match.group('tag').lower()
+        checks: List[Callable] = []
+        # Thuộc tính phải có mặt để selector có thể khớp
+        self.required_attrs = set()
+        for part in _PART_RE.finditer(match.group('rest')):
+            self.required_attrs.add('id' if part.group('id') else 'class' if part.group('cls') else part.group('attr'))
+            if part.group('id'):
+                checks.append(lambda el, v=part.group('id'): el.get('id') == v)
+            elif part.group('cls'):
+                checks.append(lambda el, v=part.group('cls'): v in (el.get('class') or '').split())
+            elif part.group('op') is None:
+                checks.append(lambda el, a=part.group('attr'): el.get(a) is not None)
+            elif part.group('op') == '=':
+                checks.append(lambda el, a=part.group('attr'), v=part.group('val'): el.get(a) == v)
+            elif part.group('op') == '^=':
+                checks.append(lambda el, a=part.group('attr'), v=part.group('val'): (el.get(a) or '').startswith(v))
+            else:
+                checks.append(lambda el, a=part.group('attr'), v=part.group('val'): v in (el.get(a) or ''))
+        self._checks = tuple(checks)
+
+    def matches(self, element) -> bool:
+        if element.tag != self.tag:
+            return False
+        for check in self._checks:
+            if not check(element):
+                return False
+        return True
+
+    def __repr__(self):
+        return f"Selector({self.text!r})"
+
+
+def _first_srcset_url(srcset: str) -> str:
+    return srcset.split(',')[0].strip().split(' ')[0]
+
+
+@dataclass
+class Rule:
+    """
+    Một cách lấy giá trị của trường.
+
+    `value`: 'text' (text của element, nối bằng `sep`), '@attr' (giá trị thuộc
+    tính), 'srcset' (URL đầu tiên trong srcset) hoặc 'present' (True).
+    `within`: selector (hoặc tuple selector) mà element phải nằm bên trong.
+    `first`: chỉ tính element đầu tiên của trang khớp `within` (vd. `<article>` chính,
+    không tính các `<article>` tin liên quan phía sau).
+    `when`: điều kiện thêm trên giá trị. Giá trị None/rỗng luôn bị bỏ qua.
+    """
+    selector: str
+    value: str = 'text'
+    within: Union[str, Sequence[str], None] = None
+    when: Optional[Callable[[str], bool]] = None
+    sep: str = ''
+    first: bool = False
+
+
+@dataclass
+class Field:
+    """
+    Trường đầu ra: `rules` theo thứ tự ưu tiên; `many` gom mọi giá trị của luật thắng.
+    `fallback_for`: tên trường mà trường này chỉ thay thế khi thiếu; khi trường đó
+    đã có giá trị, việc trích xuất tăng dần không chờ trường này nữa.
+    """
+    name: str
+    rules: Sequence[Rule]
+    many: bool = False
+    required: bool = False
+    fallback_for: Optional[str] = None
+
+
+class _CompiledRule:
+    def __init__(self, field_index: int, priority: int, rule: Rule, scopes: Tuple[Selector, ...]):
+        self.field_index = field_index
+        self.priority = priority
+        self.selector = Selector(rule.selector)
+        self.matches = self.selector.matches
+        self.scopes = scopes
+        # Chỉ duyệt tổ tiên có tag của scope (lọc ở tầng C)
+        self.scope_tags = tuple(sorted({scope.tag for scope in scopes}))
+        self.first = rule.first
+        self.when = rule.when
+        # Thuộc tính có đủ ngay khi element mở; text chỉ đủ khi element đóng
+        self.needs_text = rule.value == 'text'
+        if rule.value == 'text':
+            self.get = lambda el, sep=rule.sep: text_of(el, sep)
+        elif rule.value == 'present':
+            self.get = lambda el: True
+        elif rule.value == 'srcset':
+            self.get = lambda el: _first_srcset_url(el.get('srcset') or '')
+        elif rule.value.startswith('@'):
+            self.get = lambda el, name=rule.value[1:]: el.get(name)
+        else:
+            raise ValueError(f"Unknown rule value {rule.value!r}")
+
+    def in_scope(self, element, state: "ExtractionState") -> bool:
+        if not self.scopes:
+            return True
+        for ancestor in element.iterancestors(*self.scope_tags):
+            for scope in self.scopes:
+                if scope.matches(ancestor) and (not self.first or state.first_scope(scope, ancestor) is ancestor):
+                    return True
+        return False
+
+
+class FieldRules:
+    """Bộ luật của một nguồn, biên dịch một lần và dùng lại cho mọi trang."""
+
+    def __init__(self, fields: Sequence[Field]):
+        self.fields = list(fields)
+        scopes: Dict[str, Selector] = {}
+        self._rules: List[_CompiledRule] = []
+        for field_index, field in enumerate(self.fields):
+            for priority, rule in enumerate(field.rules):
+                within = (rule.within,) if isinstance(rule.within, str) else tuple(rule.within or ())
+                rule_scopes = tuple(scopes.setdefault(text, Selector(text)) for text in within)
+                self._rules.append(_CompiledRule(field_index, priority, rule, rule_scopes))
+
+        # Chỉ element có các tag này được xét; phần còn lại của cây bị bỏ qua ở tầng C
+        self.tags = tuple(sorted({rule.selector.tag for rule in self._rules}))
+        self._by_tag: Dict[str, List[_CompiledRule]] = {}
+        for rule in self._rules:
+            self._by_tag.setdefault(rule.selector.tag, []).append(rule)
+        # Nếu mọi luật của một tag đều cần thuộc tính, element không có thuộc tính nào
+        # trong số đó bị loại ngay (vd. hàng nghìn <div> không có data-testid)
+        self._gates: Dict[str, Optional[frozenset]] = {}
+        for tag, rules in self._by_tag.items():
+            if all(rule.selector.required_attrs for rule in rules):
+                self._gates[tag] = frozenset().union(*(rule.selector.required_attrs for rule in rules))
+            else:
+                self._gates[tag] = None
+        # Scope của luật ưu tiên cao nhất của trường many: đóng scope là trường đã đủ
+        self._many_scopes = [
+            rule for rule in self._rules
+            if rule.priority == 0 and self.fields[rule.field_index].many and rule.scopes
+        ]
+        self.scope_tags = frozenset(scope.tag for rule in self._many_scopes for scope in rule.scopes)
+        # Tag mà parser tăng dần cần báo sự kiện; script/style để bỏ nội dung của chúng
+        self.event_tags = tuple(sorted(set(self.tags) | self.scope_tags | {'script', 'style'}))
+        names = {field.name: i for i, field in enumerate(self.fields)}
+        self._fallback_for = [names[field.fallback_for] if field.fallback_for else None for field in self.fields]
+
+    def new_state(self) -> "ExtractionState":
+        return ExtractionState(self)
+
+    def extract(self, root) -> Optional[Dict]:
+        """Trích xuất mọi trường trong một lượt duyệt `root` đã parse xong; None nếu thiếu trường bắt buộc."""
+        state = self.new_state()
+        for element in root.iter(*self.tags):
+            state.match(element, text_ready=True, attrs_ready=True)
+        return state.result()
+
+
+class ExtractionState:
+    """
+    Trạng thái trích xuất của một tài liệu. Với cây đầy đủ dùng `FieldRules.extract`;
+    với parser tăng dần, gọi `feed('start'|'end', element)` theo từng sự kiện.
+    """
+
+    def __init__(self, rules: FieldRules):
+        self._rules = rules
+        fields = rules.fields
+        # Trường đơn: (priority, value) tốt nhất đến giờ; trường many: priority -> list giá trị
+        self._best: List[Optional[Tuple[int, object]]] = [None] * len(fields)
+        self._many: List[Dict[int, list]] = [{} for _ in fields]
+        self._closed_many = [False] * len(fields)
+        self._first_scopes: Dict[Selector, object] = {}
+
+    def first_scope(self, scope: Selector, element):
+        """
+        Element đầu tiên của tài liệu khớp `scope`. Với parser tăng dần cây chỉ có phần
+        đã đọc, nhưng `element` khớp `scope` đã mở nên element đầu tiên cũng đã có.
+        """
+        first = self._first_scopes.get(scope)
+        if first is None:
+            root = element.getroottree().getroot()
+            first = next((el for el in root.iter(scope.tag) if scope.matches(el)), element)
+            self._first_scopes[scope] = first
+        return first
+
+    def _resolved(self, field_index: int) -> bool:
+        primary = self._rules._fallback_for[field_index]
+        if primary is not None and self._resolved(primary):
+            return True
+        if self._rules.fields[field_index].many:
+            return self._closed_many[field_index]
+        best = self._best[field_index]
+        return best is not None and best[0] == 0
+
+    @property
+    def done(self) -> bool:
+        """Mọi trường đã có giá trị từ luật ưu tiên cao nhất; phần còn lại của trang không cần đọc."""
+        return all(self._resolved(i) for i in range(len(self._rules.fields)))
+
+    def match(self, element, text_ready: bool, attrs_ready: bool):
+        tag = element.tag
+        rules = self._rules._by_tag.get(tag)
+        if not rules:
+            return
+        gate = self._rules._gates[tag]
+        if gate is not None and gate.isdisjoint(element.keys()):
+            return
+        fields = self._rules.fields
+        for rule in rules:
+            if (rule.needs_text and not text_ready) or (not rule.needs_text and not attrs_ready):
+                continue
+            field_index = rule.field_index
+            many = fields[field_index].many
+            if many:
+                if self._closed_many[field_index]:
+                    continue
+            else:
+                best = self._best[field_index]
+                if best is not None and best[0] <= rule.priority:
+                    continue
+            if not rule.matches(element) or not rule.in_scope(element, self):
+                continue
+            value = rule.get(element)
+            if value is None or value == '' or (rule.when is not None and not rule.when(value)):
+                continue
+            if many:
+                self._many[field_index].setdefault(rule.priority, []).append(value)
+            else:
+                self._best[field_index] = (rule.priority, value)
+
+    def feed(self, event: str, element):
+        if not isinstance(element.tag, str):
+            return
+        if event == 'start':
+            self.match(element, text_ready=False, attrs_ready=True)
+            return
+        self.match(element, text_ready=True, attrs_ready=False)
+        if element.tag in self._rules.scope_tags:
+            for rule in self._rules._many_scopes:
+                if self._many[rule.field_index].get(0) and any(
+                        scope.matches(element) and (not rule.first or self.first_scope(scope, element) is element)
+                        for scope in rule.scopes):
+                    self._closed_many[rule.field_index] = True
+
+    def result(self) -> Optional[Dict]:
+        out = {}
+        for field_index, field in enumerate(self._rules.fields):
+            if field.many:
+                collected = self._many[field_index]
+                value = collected[min(collected)] if collected else []
+            else:
+                best = self._best[field_index]
+                value = best[1] if best is not None else None
+            if field.required and not value:
+                return None
+            out[field.name] = value
+        return out
+
+
+class PullExtractor:
+    """
+    Trích xuất một tài liệu từ các chunk bytes bằng HTMLPullParser. `feed` trả về
+    True khi mọi trường đã đủ, tức phần còn lại của trang không cần tải.
+    """
+
+    def __init__(self, rules: FieldRules):
+        self._parser = etree.HTMLPullParser(events=('start', 'end'), tag=rules.event_tags,
+                                            remove_comments=True, remove_pis=True)
+        # Element giống lxml.html (get_element_by_id, ...) như cây của parse_html
+        self._parser.set_element_class_lookup(lxml_html.HtmlElementClassLookup())
+        self._state = rules.new_state()
+        self.done = False
+
+    def feed(self, chunk: bytes) -> bool:
+        if self.done:
+            return True
+        self._parser.feed(chunk)
+        for event, element in self._parser.read_events():
+            self._state.feed(event, element)
+            # Nội dung script/style không dùng cho trường nào; bỏ để cây không giữ các blob lớn
+            if event == 'end' and element.tag in ('script', 'style'):
+                element.text = None
+            if self._state.done:
+                self.done = True
+                break
+        return self.done
+
+    def close(self) -> Tuple[Optional[Dict], object]:
+        """(trường đã trích xuất hoặc None nếu thiếu trường bắt buộc, cây đã parse đến lúc dừng)."""
+        try:
+            root = self._parser.close()
+        except etree.XMLSyntaxError:
+            root = None
+        return self._state.result(), root
@@ -1,34 +1,47 @@
 # crawler/guardian_parser.py
-import requests
+import logging
 import re
-from bs4 import BeautifulSoup
 from typing import List, Dict, Optional
 from urllib.parse import urljoin
-from datetime import datetime
+from datetime import date
 from crawler.base_parser import BaseParser
+from crawler.extraction import Field, FieldRules, Rule
+from crawler.html_utils import first, parse_html
 
-def _format_date(date_str: str) -> str:
-    if not date_str:
-        return "N/A"
-    try:
-        dt_object = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
-        return dt_object.strftime('%Y-%m-%dT%H:%M:%SZ')
-    except (ValueError, TypeError):
-        return date_str
+logger = logging.getLogger(__name__)
 
 class GuardianParser(BaseParser):
-    def __init__(self):
-        self.base_url = "https://www.theguardian.com"
+    source = "guardian"
+    source_name = "The Guardian"
+    field_rules = FieldRules([
+        Field('title', [Rule('h1')]),
+        Field('desc', [Rule('p', within=('div[data-gu-name="standfirst"]', 'div#maincontent'))]),
+        Field('published_date', [Rule('time', '@datetime')]),
+        Field('image', [Rule('source[srcset]', 'srcset', within='picture.dcr-1989456')]),
+        # Link lightbox nằm trong <figure id="img-N"> mà nó trỏ tới, nên khi trích xuất
+        # tăng dần dừng sớm, ảnh đích đã có trong cây
+        Field('lightbox', [Rule('a.open-lightbox[href^="#img-"]', '@href')], fallback_for='image'),
+        Field('image_fallback', [
+            Rule('img', '@src', within='figure'),
+            # Dự phòng cuối cùng: bất kỳ ảnh nào từ CDN của Guardian
+            Rule('img[src*="https://i.guim.co.uk/img/"]', '@src'),
+        ], fallback_for='image'),
+        Field('body', [Rule('p', within='div#maincontent', sep=' ')], many=True),
+    ])
+
+    def __init__(self, base_url: str = "https://www.theguardian.com", fetcher=None, validator_store=None):
+        super().__init__(fetcher, validator_store)
+        self.base_url = base_url
         self.news_url = f"{self.base_url}/world"
 
-    def get_latest_links(self, limit: int = 2) -> List[str]:
+    def extract_links(self, html: bytes, limit: int = 2) -> List[str]:
         try:
-            response = requests.get(self.news_url)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
+            root = parse_html(html)
+            if root is None:
+                return []
             links = []
-            for a in soup.select('a[data-link-name="article"]', href=True):
-                link = a['href']
+            for a in root.xpath('//a[@data-link-name="article"][@href]'):
+                link = a.get('href')
                 if not link.startswith('http'):
                     link = urljoin(self.base_url, link)
                 if link not in links:
@@ -39,6 +52,23 @@ class GuardianParser(BaseParser):
         except Exception:
             return []
 
+    def archive_page_urls(self, day: date):
+        # Trang "all" của mục World liệt kê mọi bài trong ngày
+        yield f"{self.news_url}/{day.year}/{day.strftime('%b').lower()}/{day:%d}/all"
+
+    def extract_archive_links(self, html: bytes) -> List[str]:
+        root = parse_html(html)
+        if root is None:
+            return []
+        links = []
+        for a in root.xpath('//a[@href]'):
+            link = urljoin(self.base_url, a.get('href'))
+            # URL bài báo của Guardian có dạng /<mục>/<yyyy>/<mmm>/<dd>/<slug>
+            if link.startswith(self.base_url) and re.search(r'/\d{4}/[a-z]{3}/\d{2}/[^/]+$', link) \
+                    and '/live/' not in link and link not in links:
+                links.append(link)
+        return links
+
     def _get_date_from_url(self, url: str) -> Optional[str]:
         match = re.search(r'/(\d{4})/(\w{3})/(\d{2})/', url)
         if match:
@@ -52,79 +82,18 @@ class GuardianParser(BaseParser):
                 return f"{year}-{month}-{day}T00:00:00Z"
         return None
 
-    def _find_main_image(self, soup: BeautifulSoup) -> str:
-        # Ưu tiên 1: Thẻ <picture> cho ảnh chất lượng cao
-        picture_tag = soup.find('picture', {'class': 'dcr-1989456'})
-        if picture_tag:
-            source_tag = picture_tag.find('source', {'srcset': True})
-            if source_tag:
-                return source_tag['srcset'].split(',')[0].split(' ')[0]
-
-        # Ưu tiên 2: Tìm theo cơ chế Lightbox mà bạn đã phát hiện
-        lightbox_link = soup.select_one('a.open-lightbox[href^="#img-"]')
-        if lightbox_link:
-            image_id = lightbox_link.get('href', '').lstrip('#')
-            if image_id:
-                image_container = soup.find(id=image_id)
-                if image_container and image_container.find('img'):
-                    img_tag = image_container.find('img')
-                    if img_tag and img_tag.has_attr('src'):
-                        return img_tag['src']
-
-        # Ưu tiên 3: Tìm trong thẻ <figure> tiêu chuẩn
-        figure_tag = soup.find('figure')
-        if figure_tag and figure_tag.find('img'):
-            img_tag = figure_tag.find('img')
-            if img_tag and img_tag.has_attr('src'):
-                return img_tag['src']
+    def build_article(self, url: str, fields: Dict, root=None) -> Dict:
+        fields = dict(fields)
+        # Không có <time>: lấy ngày từ URL /yyyy/mmm/dd/
+        fields['published_date'] = fields['published_date'] or self._get_date_from_url(url)
+        # Ảnh <picture> chất lượng cao, rồi ảnh mở bằng lightbox, rồi các ảnh dự phòng
+        fields['image'] = fields['image'] or self._lightbox_image(root, fields['lightbox']) or fields['image_fallback']
+        return super().build_article(url, fields, root)
 
-        # Ưu tiên 4 (Dự phòng cuối cùng): Tìm bất kỳ ảnh nào từ CDN của Guardian
-        cdn_img = soup.find('img', src=re.compile(r'https://i\.guim\.co\.uk/img/'))
-        if cdn_img:
-            return cdn_img['src']
-            
-        return ""
-
-    def parse_article(self, url: str) -> Optional[Dict]:
-        print(f"Parsing article: {url}")
-        try:
-            response = requests.get(url)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            title_tag = soup.find('h1')
-            title = title_tag.get_text(strip=True) if title_tag else "N/A"
-            
-            published_date_str = "N/A"
-            time_tag = soup.find('time')
-            if time_tag and time_tag.has_attr('datetime'):
-                published_date_str = time_tag['datetime']
-            else:
-                date_from_url = self._get_date_from_url(url)
-                if date_from_url:
-                    published_date_str = date_from_url
-            
-            published_date = _format_date(published_date_str)
-
-            summary_tag = soup.select_one('div[data-gu-name="standfirst"] p, div#maincontent p')
-            desc = summary_tag.get_text(strip=True) if summary_tag else ""
-            
-            image_src = self._find_main_image(soup)
-            
-            content_div = soup.find('div', id='maincontent')
-            content_for_analysis = ""
-            if content_div:
-                content_blocks = content_div.find_all('p')
-                content_for_analysis = " ".join([block.get_text(" ", strip=True) for block in content_blocks])
-
-            return {
-                "title": title,
-                "desc": desc,
-                "published_date": published_date,
-                "link": url,
-                "source": "The Guardian",
-                "image": image_src,
-                "content_for_analysis": f"{title}. {desc} {content_for_analysis}"
-            }
-        except Exception:
-            return None
\ No newline at end of file
+    def _lightbox_image(self, root, href: Optional[str]) -> Optional[str]:
+        # Chỉ tra cứu thêm khi không có <picture>, theo id mà link lightbox trỏ tới
+        image_id = (href or '').lstrip('#')
+        if root is None or not image_id:
+            return None
+        img_tag = first(root.get_element_by_id(image_id, None), './/img[@src]')
+        return img_tag.get('src') if img_tag is not None else None
@@ -0,0 +1,38 @@
+"""
+Tiện ích parse HTML trực tiếp bằng lxml.
+
+Parser chỉ truy vấn đúng các phần tử cần (XPath) trên cây C của lxml thay vì
+dựng cả cây BeautifulSoup bằng Python; script/style/comment bị bỏ ngay khi parse.
+"""
+from lxml import etree, html as lxml_html
+
+_HTML_PARSER = lxml_html.HTMLParser(remove_comments=True, remove_pis=True)
+_TEXT_XPATH = etree.XPath('.//text()[not(ancestor::script) and not(ancestor::style)]')
+
+
+def parse_html(content: bytes):
+    """Parse bytes HTML thành cây lxml; trả về None nếu tài liệu rỗng hoặc hỏng."""
+    if not content:
+        return None
+    try:
+        root = lxml_html.document_fromstring(content, parser=_HTML_PARSER)
+    except (etree.ParserError, ValueError):
+        return None
+    etree.strip_elements(root, 'script', 'style', with_tail=False)
+    return root
+
+
+def first(element, xpath: str):
+    """Phần tử đầu tiên (theo thứ tự tài liệu) khớp `xpath`, hoặc None."""
+    if element is None:
+        return None
+    matches = element.xpath(xpath)
+    return matches[0] if matches else None
+
+
+def text_of(element, separator: str = '') -> str:
+    """Tương đương `get_text(separator, strip=True)` của BeautifulSoup."""
+    if element is None:
+        return ''
+    return separator.join(piece.strip() for piece in _TEXT_XPATH(element) if piece.strip())
+
@@ -0,0 +1,224 @@
+"""
+Lớp fetch bất đồng bộ dùng chung cho mọi parser.
+
+Một `AsyncFetcher` giữ một event loop riêng chạy trên thread nền cùng một
+`aiohttp.ClientSession` sống suốt vòng đời tiến trình, nên kết nối TCP/TLS tới
+mỗi host được giữ keep-alive và tái sử dụng giữa các lần crawl. Số kết nối đồng
+thời tới một host bị giới hạn bởi `per_host_limit`. Header và timeout được cấu
+hình tại đây thay vì rải rác trong từng parser.
+
+Body được đọc theo chunk và không bao giờ vượt quá `max_body_size`; phần thừa bị
+bỏ và response được đánh dấu `truncated`. `astream` đưa từng chunk cho một hàm
+xử lý (vd. parser tăng dần) và ngừng đọc ngay khi hàm đó báo đã đủ.
+
+Với `politeness` (xem crawler/politeness.py), mọi request đi qua bộ điều tiết
+của host, được thử lại theo Retry-After / backoff khi gặp 429, 5xx hoặc lỗi mạng,
+và URL bị robots.txt chặn không được tải.
+"""
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Collection, Dict, List, Optional
+
+import aiohttp
+
+from crawler.observability import FETCH_RETRIES, ROBOTS_BLOCKED
+from crawler.politeness import RETRYABLE_STATUS, PolitenessPolicy, host_of, parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+DEFAULT_TIMEOUT = 10
+DEFAULT_PER_HOST_LIMIT = 4
+DEFAULT_MAX_BODY_SIZE = 5 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+MAX_ROBOTS_SIZE = 512 * 1024
+
+
+@dataclass
+class FetchResponse:
+    url: str
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+    # Số byte body đã đọc; truncated khi body dài hơn max_body_size
+    size: int = 0
+    truncated: bool = False
+    # astream: hàm xử lý đã đủ dữ liệu trước khi hết body
+    stopped_early: bool = False
+
+
+class AsyncFetcher:
+    def __init__(self, headers: Optional[Dict[str, str]] = None, timeout: float = DEFAULT_TIMEOUT,
+                 per_host_limit: int = DEFAULT_PER_HOST_LIMIT, total_limit: int = 100,
+                 keepalive_timeout: float = 30, max_body_size: int = DEFAULT_MAX_BODY_SIZE,
+                 politeness: Optional[PolitenessPolicy] = None):
+        self.headers = dict(DEFAULT_HEADERS if headers is None else headers)
+        self.timeout = timeout
+        self.per_host_limit = per_host_limit
+        self.total_limit = total_limit
+        self.keepalive_timeout = keepalive_timeout
+        self.max_body_size = max_body_size
+        self.politeness = politeness
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="async-fetcher", daemon=True)
+        self._thread.start()
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # Session phải được tạo bên trong event loop của fetcher
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.total_limit,
+                limit_per_host=self.per_host_limit,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    async def afetch(self, url: str, headers: Optional[Dict[str, str]] = None,
+                     accept_status: Collection[int] = ()) -> Optional[FetchResponse]:
+        """
+        Tải `url` (tối đa `max_body_size` byte); trả về None nếu lỗi mạng hoặc status
+        không thành công. Status lỗi trong `accept_status` (vd. 404) được trả về như
+        một response bình thường, để phân biệt "không có trang" với lỗi tạm thời.
+        """
+        chunks = []
+
+        async def collect(chunk: bytes) -> bool:
+            chunks.append(chunk)
+            return False
+
+        response = await self.astream(url, collect, headers, accept_status)
+        if response is not None:
+            response.body = b''.join(chunks)
+        return response
+
+    async def astream(self, url: str, consume: Callable[[bytes], Awaitable[bool]],
+                      headers: Optional[Dict[str, str]] = None,
+                      accept_status: Collection[int] = ()) -> Optional[FetchResponse]:
+        """
+        Tải `url` theo chunk và `await consume(chunk)` cho từng chunk; dừng đọc khi
+        `consume` trả về True hoặc đã đọc `max_body_size` byte. Response trả về
+        không giữ body (`body` rỗng); None nếu lỗi mạng, status không thành công
+        (sau khi đã thử lại) hoặc robots.txt không cho phép.
+        """
+        policy = self.politeness
+        if policy is not None and not await policy.allowed(url, self._fetch_robots):
+            logger.info("Skipping %s: disallowed by robots.txt", url)
+            ROBOTS_BLOCKED.labels(host=host_of(url)).inc()
+            return None
+
+        attempt = 0
+        while True:
+            result, status, retry_after, consumed = await self._attempt(url, consume, headers, accept_status)
+            # Không thử lại khi đã đưa một phần body cho `consume`
+            if result is not None or policy is None or consumed or \
+                    (status is not None and status not in RETRYABLE_STATUS):
+                return result
+            attempt += 1
+            delay = policy.retry_delay(attempt, retry_after) if attempt <= policy.max_retries else None
+            if delay is None:
+                logger.warning("Giving up on %s after %d attempt(s) (last status %s)", url, attempt, status)
+                return None
+            FETCH_RETRIES.labels(host=host_of(url), reason=str(status) if status else 'network').inc()
+            await asyncio.sleep(delay)
+
+    async def _attempt(self, url: str, consume, headers: Optional[Dict[str, str]], accept_status=()):
+        """Một lần request: (FetchResponse hoặc None, status, Retry-After (giây), đã gọi consume chưa)."""
+        throttle = self.politeness.throttle(url) if self.politeness is not None else None
+        if throttle is not None:
+            await throttle.acquire()
+        start = time.monotonic()
+        status = latency = retry_after = None
+        consumed = False
+        try:
+            async with self._get_session().get(url, headers=headers) as response:
+                # Độ trễ tới header, không tính thời gian đọc/parse body
+                status, latency = response.status, time.monotonic() - start
+                if response.status >= 400 and response.status not in accept_status:
+                    if response.status in RETRYABLE_STATUS:
+                        retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                    logger.warning("Error fetching %s: HTTP %d", url, response.status)
+                    return None, status, retry_after, False
+                result = FetchResponse(str(response.url), response.status, dict(response.headers), b'')
+                async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                    remaining = self.max_body_size - result.size
+                    if len(chunk) > remaining:
+                        chunk, result.truncated = chunk[:remaining], True
+                    result.size += len(chunk)
+                    consumed = consumed or bool(chunk)
+                    if chunk and await consume(chunk):
+                        result.stopped_early = True
+                        break
+                    if result.truncated:
+                        logger.warning("Body of %s exceeds %d bytes; truncated.", url, self.max_body_size)
+                        break
+                # Phần body chưa đọc không được tải tiếp: kết nối bị đóng thay vì trả về pool
+                if result.stopped_early or result.truncated:
+                    response.close()
+                return result, status, None, consumed
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning("Error fetching %s: %r", url, e)
+            return None, None, None, consumed
+        finally:
+            if throttle is not None:
+                await throttle.release(status, latency if latency is not None else time.monotonic() - start,
+                                       retry_after)
+
+    async def _fetch_robots(self, url: str):
+        """(status hoặc None nếu lỗi mạng, nội dung) của một robots.txt."""
+        try:
+            async with self._get_session().get(url) as response:
+                body = await response.content.read(MAX_ROBOTS_SIZE)
+                return response.status, body.decode('utf-8', errors='replace')
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning("Error fetching %s: %r", url, e)
+            return None, ''
+
+    async def afetch_many(self, urls: List[str]) -> List[Optional[FetchResponse]]:
+        return list(await asyncio.gather(*(self.afetch(url) for url in urls)))
+
+    def run(self, coro):
+        """Chạy một coroutine trên event loop của fetcher và chờ kết quả (gọi từ code đồng bộ)."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def fetch_response(self, url: str, headers: Optional[Dict[str, str]] = None,
+                       accept_status: Collection[int] = ()) -> Optional[FetchResponse]:
+        return self.run(self.afetch(url, headers, accept_status))
+
+    def fetch(self, url: str) -> Optional[bytes]:
+        response = self.run(self.afetch(url))
+        return response.body if response else None
+
+    def fetch_many(self, urls: List[str]) -> List[Optional[bytes]]:
+        """Tải đồng thời tất cả `urls`, giữ nguyên thứ tự; phần tử lỗi là None."""
+        return [response.body if response else None for response in self.run(self.afetch_many(urls))]
+
+    def close(self):
+        if self._session is not None:
+            self.run(self._session.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+
+_default_fetcher: Optional[AsyncFetcher] = None
+_default_lock = threading.Lock()
+
+
+def get_default_fetcher() -> AsyncFetcher:
+    global _default_fetcher
+    with _default_lock:
+        if _default_fetcher is None:
+            _default_fetcher = AsyncFetcher(politeness=PolitenessPolicy(user_agent=DEFAULT_HEADERS['User-Agent']))
+        return _default_fetcher
@@ -0,0 +1,113 @@
+"""
+Đo thời gian từng stage, bộ đếm Prometheus và logging có correlation ID.
+
+Mỗi lần crawl chạy trong `crawl_context()`, mọi log record phát ra trong đó
+(kể cả trên event loop của fetcher, vì contextvars được sao chép khi lên lịch
+coroutine) mang cùng một `crawl_id`.
+"""
+import collections
+import contextvars
+import json
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Iterable, Optional
+
+from prometheus_client import Counter, Histogram
+
+STAGES = ('fetch', 'parse', 'keywords', 'enrich', 'store')
+
+STAGE_SECONDS = Histogram(
+    'crawl_stage_seconds',
+    'Thời gian của một stage crawl, theo nguồn',
+    ['stage', 'source'],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+)
+PAGES_FETCHED = Counter('crawl_pages_fetched_total', 'Số trang tải thành công', ['source', 'kind'])
+ARTICLES_SKIPPED = Counter('crawl_articles_skipped_total', 'Số bài bị bỏ qua trước khi tải', ['source', 'reason'])
+ARTICLES_FAILED = Counter('crawl_articles_failed_total', 'Số bài lỗi, theo stage', ['source', 'stage'])
+ARTICLES_STORED = Counter('crawl_articles_stored_total', 'Số bài đã lưu', ['source'])
+NEAR_DUPLICATES = Counter('crawl_near_duplicates_total', 'Số bài gần trùng dùng lại keyword của bài gốc', ['source'])
+BYTES_FETCHED = Counter('crawl_bytes_fetched_total', 'Số byte body đã tải', ['source', 'kind'])
+FETCH_RETRIES = Counter('crawl_fetch_retries_total', 'Số lần thử lại request, theo host và lý do', ['host', 'reason'])
+ROBOTS_BLOCKED = Counter('crawl_robots_blocked_total', 'Số URL bị robots.txt chặn', ['host'])
+EARLY_STOPS = Counter('crawl_early_stops_total', 'Số trang ngừng tải sớm vì đã đủ trường', ['source'])
+KEYWORDS_KEPT = Counter('crawl_keywords_kept_total', 'Số keyword được giữ lại sau lọc CEFR', ['source'])
+
+crawl_id_var: contextvars.ContextVar[str] = contextvars.ContextVar('crawl_id', default='-')
+
+
+@contextmanager
+def stage_timer(stage: str, source: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.labels(stage=stage, source=source).observe(time.perf_counter() - start)
+
+
+@contextmanager
+def batch_stage_timer(stage: str, sources: Iterable[str]):
+    """
+    Đo một lần gọi trên cả lô gồm bài của nhiều nguồn; thời gian được chia cho
+    từng nguồn theo số bài của nguồn đó trong lô.
+    """
+    counts = collections.Counter(sources)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        total = sum(counts.values())
+        for source, count in counts.items():
+            STAGE_SECONDS.labels(stage=stage, source=source).observe(elapsed * count / total)
+
+
+def new_crawl_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+@contextmanager
+def crawl_context(crawl_id: Optional[str] = None):
+    # Một crawl lồng trong crawl khác (vd. từng nguồn trong lịch hằng ngày) giữ ID của crawl ngoài
+    current = crawl_id_var.get()
+    token = crawl_id_var.set(crawl_id or (current if current != '-' else new_crawl_id()))
+    try:
+        yield crawl_id_var.get()
+    finally:
+        crawl_id_var.reset(token)
+
+
+_STANDARD_ATTRS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'crawl_id'}
+
+
+class CrawlContextFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.crawl_id = crawl_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Một dòng JSON cho mỗi record; các trường truyền qua `extra=` được giữ nguyên."""
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            'ts': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'crawl_id': getattr(record, 'crawl_id', '-'),
+            'msg': record.getMessage(),
+        }
+        payload.update({key: value for key, value in vars(record).items() if key not in _STANDARD_ATTRS})
+        if record.exc_info:
+            payload['exc'] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+def configure_logging(level: str = 'INFO'):
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter())
+    handler.addFilter(CrawlContextFilter())
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(level)
@@ -0,0 +1,87 @@
+"""
+Process pool cho phần parse HTML (CPU-bound).
+
+Tiến trình API chỉ tải HTML rồi gửi bytes sang pool; mỗi worker trả về dict bài
+báo đã trích xuất. Nhờ vậy một lô trang được parse song song trên nhiều core và
+event loop / thread của server không bị chiếm.
+
+`PullParseThreads` là đường thay thế: parse tăng dần ngay trong lúc tải, trên các
+thread của tiến trình API, và ngừng tải khi bài đã đủ trường.
+"""
+import asyncio
+import itertools
+import logging
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _extract_article(parser, url: str, html: bytes) -> Optional[Dict]:
+    return parser.extract_article(url, html)
+
+
+class ParsePool:
+    def __init__(self, max_workers: Optional[int] = None):
+        # 'spawn' tránh fork một tiến trình đã có thread của fetcher và của model
+        self._executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context('spawn')
+        )
+
+    def submit(self, parser, url: str, html: bytes) -> Future:
+        """Parse một trang trong process con; trả về Future của dict bài báo (hoặc None)."""
+        return self._executor.submit(_extract_article, parser, url, html)
+
+    def extract_articles(self, parser, pages: List[Tuple[str, bytes]]) -> List[Optional[Dict]]:
+        """Parse song song các cặp (url, html) bằng `parser.extract_article`, giữ nguyên thứ tự."""
+        futures = [self.submit(parser, url, html) for url, html in pages]
+        results = []
+        for (url, _), future in zip(pages, futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                logger.error("Error parsing %s in worker process: %r", url, e)
+                results.append(None)
+        return results
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class PullParseThreads:
+    """
+    Các thread parse tăng dần. Một parser lxml chỉ được dùng trên thread đã tạo ra
+    nó (dùng từ thread khác làm hỏng bộ nhớ), nên mỗi trang được gắn với một thread
+    cố định cho mọi chunk của nó, thay vì `asyncio.to_thread`.
+    """
+
+    def __init__(self, num_threads: int = 4):
+        self._executors = [ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"pull-parse-{i}")
+                           for i in range(num_threads)]
+        self._next = itertools.count()
+
+    async def fetch_article(self, fetcher, parser, url: str):
+        """
+        Tải `url` bằng `fetcher.astream`, parse từng chunk bằng `parser.new_pull_extractor()`
+        và ngừng tải khi đủ trường. Trả về (FetchResponse hoặc None, dict bài báo hoặc None).
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._executors[next(self._next) % len(self._executors)]
+        extractor = await loop.run_in_executor(executor, parser.new_pull_extractor)
+
+        async def consume(chunk: bytes) -> bool:
+            return await loop.run_in_executor(executor, extractor.feed, chunk)
+
+        response = await fetcher.astream(url, consume)
+        if response is None:
+            # Giải phóng parser trên chính thread của nó
+            await loop.run_in_executor(executor, extractor.close)
+            return None, None
+        article = await loop.run_in_executor(executor, parser.finish_article, url, extractor)
+        return response, article
+
+    def shutdown(self):
+        for executor in self._executors:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,217 @@
+"""
+Điều tiết request theo từng host cho `AsyncFetcher`.
+
+Mỗi host có một `HostThrottle`: token bucket giới hạn số request mỗi giây và một
+giới hạn số request đồng thời, cả hai tự điều chỉnh theo kiểu AIMD: tăng dần khi
+response nhanh và thành công, giảm một nửa khi gặp 429/5xx hoặc khi độ trễ tăng
+vọt so với mức nền. `Retry-After` chặn cả host đến hết thời gian server yêu cầu.
+
+`RobotsCache` tải và cache robots.txt của mỗi host (kèm Crawl-delay, dùng làm
+trần tốc độ). Mọi state sống trên event loop của fetcher nên không cần khoá thread.
+"""
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+def parse_retry_after(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """Số giây cần chờ theo header Retry-After (dạng số giây hoặc ngày HTTP); None nếu không đọc được."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at - (time.time() if now is None else now))
+
+
+def host_of(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+@dataclass
+class ThrottleConfig:
+    rate: float = 2.0                 # request/s ban đầu
+    min_rate: float = 0.2
+    max_rate: float = 20.0
+    concurrency: int = 2              # request đồng thời ban đầu
+    max_concurrency: int = 8
+    latency_factor: float = 3.0       # độ trễ > nền x hệ số này là dấu hiệu quá tải
+    cooldown: float = 1.0             # giảm tối đa một lần mỗi khoảng này (giây)
+
+
+class HostThrottle:
+    def __init__(self, config: ThrottleConfig):
+        self.config = config
+        self.max_rate = config.max_rate
+        self.rate = config.rate
+        self.limit = float(config.concurrency)
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self._tokens = 1.0
+        self._refilled_at = time.monotonic()
+        self._latency: Optional[float] = None   # EWMA
+        self._baseline: Optional[float] = None  # EWMA thấp nhất từng thấy, trôi lên chậm
+        self._decreased_at = 0.0
+        self._cond: Optional[asyncio.Condition] = None
+
+    def cap_rate(self, max_rate: float):
+        """Hạ trần tốc độ (vd. theo Crawl-delay)."""
+        self.max_rate = min(self.max_rate, max_rate)
+        self.rate = min(self.rate, self.max_rate)
+
+    def _refill(self, now: float):
+        capacity = max(1.0, self.rate)
+        self._tokens = min(capacity, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    async def acquire(self):
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < max(1, int(self.limit)))
+            self.in_flight += 1
+        try:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self.blocked_until - now
+                if wait <= 0 and self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep(max(wait, (1 - self._tokens) / self.rate, 0.001))
+        except BaseException:
+            await self._leave()
+            raise
+
+    async def _leave(self):
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    async def release(self, status: Optional[int], latency: float, retry_after: Optional[float] = None):
+        now = time.monotonic()
+        if retry_after is not None:
+            self.blocked_until = max(self.blocked_until, now + retry_after)
+
+        if status is None or status in RETRYABLE_STATUS:
+            self._decrease(now)
+        else:
+            self._latency = latency if self._latency is None else 0.8 * self._latency + 0.2 * latency
+            if self._baseline is None or self._latency < self._baseline:
+                self._baseline = self._latency
+            else:
+                self._baseline *= 1.001
+            if self._latency > self._baseline * self.config.latency_factor:
+                self._decrease(now)
+            else:
+                # Tăng cộng: khoảng +1 request đồng thời và +1 request/s sau mỗi "cửa sổ" thành công
+                self.limit = min(self.config.max_concurrency, self.limit + 1 / self.limit)
+                self.rate = min(self.max_rate, self.rate + 1 / max(self.rate, 1.0))
+        await self._leave()
+
+    def _decrease(self, now: float):
+        if now - self._decreased_at < self.config.cooldown:
+            return
+        self._decreased_at = now
+        self.limit = max(1.0, self.limit / 2)
+        self.rate = max(min(self.config.min_rate, self.max_rate), self.rate / 2)
+        # Không giảm thêm vì các response chậm đã gửi trước lần giảm này
+        self._latency = self._baseline
+
+
+class RobotsCache:
+    def __init__(self, user_agent: str, ttl_seconds: float = 24 * 3600, error_ttl_seconds: float = 600):
+        self.user_agent = user_agent
+        self.ttl_seconds = ttl_seconds
+        self.error_ttl_seconds = error_ttl_seconds
+        self._rules: Dict[str, Tuple[Optional[RobotFileParser], float]] = {}
+        self._loading: Dict[str, asyncio.Future] = {}
+
+    async def rules(self, host: str, fetch: Callable[[str], Awaitable[Tuple[Optional[int], str]]]
+                    ) -> Optional[RobotFileParser]:
+        """Luật robots.txt của `host` (None là cho phép tất cả); mỗi host chỉ tải một lần mỗi TTL."""
+        cached = self._rules.get(host)
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+        if host in self._loading:
+            return await asyncio.shield(self._loading[host])
+        future = asyncio.get_running_loop().create_future()
+        self._loading[host] = future
+        try:
+            rules, ttl = await self._load(host, fetch)
+            self._rules[host] = (rules, time.monotonic() + ttl)
+            future.set_result(rules)
+            return rules
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            self._loading.pop(host, None)
+
+    async def _load(self, host: str, fetch) -> Tuple[Optional[RobotFileParser], float]:
+        status, text = await fetch(f"{host}/robots.txt")
+        if status is not None and 400 <= status < 500:
+            return None, self.ttl_seconds
+        if status is None or status >= 500:
+            # Không đọc được robots.txt: vẫn crawl nhưng thử lại sớm
+            logger.warning("Could not load %s/robots.txt (status %s); allowing for now.", host, status)
+            return None, self.error_ttl_seconds
+        parser = RobotFileParser()
+        parser.parse(text.splitlines())
+        return parser, self.ttl_seconds
+
+
+class PolitenessPolicy:
+    def __init__(self, throttle: Optional[ThrottleConfig] = None, max_retries: int = 3,
+                 backoff_seconds: float = 0.5, max_retry_after: float = 120, respect_robots: bool = True,
+                 user_agent: str = '*'):
+        self.throttle_config = throttle or ThrottleConfig()
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.max_retry_after = max_retry_after
+        self.robots = RobotsCache(user_agent) if respect_robots else None
+        self._throttles: Dict[str, HostThrottle] = {}
+
+    def throttle(self, url: str) -> HostThrottle:
+        host = host_of(url)
+        throttle = self._throttles.get(host)
+        if throttle is None:
+            throttle = self._throttles[host] = HostThrottle(self.throttle_config)
+        return throttle
+
+    async def allowed(self, url: str, fetch) -> bool:
+        if self.robots is None:
+            return True
+        rules = await self.robots.rules(host_of(url), fetch)
+        if rules is None:
+            return True
+        delay = rules.crawl_delay(self.robots.user_agent)
+        if delay:
+            self.throttle(url).cap_rate(1.0 / float(delay))
+        return rules.can_fetch(self.robots.user_agent, url)
+
+    def retry_delay(self, attempt: int, retry_after: Optional[float]) -> Optional[float]:
+        """Thời gian chờ trước lần thử thứ `attempt` (từ 1); None nếu Retry-After quá dài để chờ."""
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_retry_after else None
+        return self.backoff_seconds * (2 ** (attempt - 1)) * (0.5 + random.random())
+
+    def snapshot(self) -> Dict[str, Dict]:
+        return {host: {'rate': round(t.rate, 2), 'concurrency': round(t.limit, 2), 'in_flight': t.in_flight}
+                for host, t in self._throttles.items()}
@@ -1,29 +1,42 @@
-import requests
-from bs4 import BeautifulSoup
+import logging
+import re
 from urllib.parse import urljoin
-from datetime import date, datetime
 
-class ReutersParser:
-    def __init__(self, base_url="https://www.reuters.com"):
+from crawler.base_parser import BaseParser
+from crawler.extraction import Field, FieldRules, Rule
+from crawler.html_utils import parse_html
+
+logger = logging.getLogger(__name__)
+
+class ReutersParser(BaseParser):
+    source = "reuters"
+    source_name = "Reuters"
+    field_rules = FieldRules([
+        Field('title', [Rule('h1[data-testid="Heading"]')]),
+        Field('desc', [
+            Rule('div[data-testid="paragraph-0"]'),
+            Rule('meta[name="description"]', '@content'),
+        ]),
+        Field('published_date', [Rule('time', '@datetime')]),
+        Field('image', [
+            Rule('meta[property="og:image"]', '@content'),
+            Rule('img[data-testid="EagerImage"]', '@src'),
+        ]),
+        Field('body', [Rule('div[data-testid^="paragraph-"]', within='div[data-testid="ArticleBody"]')], many=True),
+    ])
+
+    def __init__(self, base_url="https://www.reuters.com", fetcher=None, validator_store=None):
+        super().__init__(fetcher, validator_store)
         self.base_url = base_url
         self.news_url = f"{self.base_url}/world"
 
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-
-    def get_latest_links(self,limit=2):
-        try:
-            response = requests.get(self.news_url)
-            response.raise_for_status()
-        except requests.RequestException as e:
-            print(f"Error fetching page {self.news_url}: {e}")
+    def extract_links(self, html, limit=2):
+        root = parse_html(html)
+        if root is None:
             return []
-
-        soup = BeautifulSoup(response.content, 'lxml')
         links = set()
         
-        for a_tag in soup.find_all('a', {'data-testid': 'TitleLink'}):
+        for a_tag in root.xpath('//a[@data-testid="TitleLink"]'):
             href = a_tag.get('href')
             if href:
                 full_url = urljoin(self.base_url, href)
@@ -33,70 +46,22 @@ class ReutersParser:
         
         return list(links)
 
-    def parse_article(self, article_url):
-        print(f"Parsing article: {article_url}")
-        try:
-            response = requests.get(article_url, headers=self.headers, timeout=10)
-            response.raise_for_status()
-        except requests.RequestException as e:
-            print(f"Error fetching article {article_url}: {e}")
-            return None
+    def archive_page_urls(self, day):
+        # Sitemap HTML theo ngày, phân trang /1/, /2/, ...
+        page = 1
+        while True:
+            yield f"{self.base_url}/sitemap/{day:%Y-%m}/{day:%d}/{page}/"
+            page += 1
 
-        soup = BeautifulSoup(response.content, 'lxml')
-        
-        title_tag = soup.find('h1', {'data-testid': 'Heading'})
-        
-        desc_text = "N/A"
-        first_paragraph = soup.find('div', {'data-testid': 'paragraph-0'})
-        if first_paragraph:
-            desc_text = first_paragraph.get_text(strip=True)
-        else:
-            meta_desc_tag = soup.find('meta', {'name': 'description'})
-            if meta_desc_tag:
-                desc_text = meta_desc_tag['content']
-
-        creation_date_iso = "N/A"
-        published_date = None
-    
-        time_tag = soup.find("time")
-        if time_tag:
-            # Reuters thường để ISO trong datetime
-            datetime_attr = time_tag.get("datetime")
-            if datetime_attr:
-                try:
-                    # validate ISO
-                    datetime.fromisoformat(datetime_attr.replace("Z", "+00:00"))
-                    published_date = datetime_attr
-                except ValueError:
-                    published_date = None
-
-        # time_tag = soup.find('time', {'data-testid': 'Body'})
-        # if time_tag and time_tag.has_attr('datetime'):
-        #     creation_date_iso = time_tag['datetime']
-        
-        main_image_url = "N/A"
-        og_image_tag = soup.find('meta', property='og:image')
-        if og_image_tag and og_image_tag.has_attr('content'):
-            main_image_url = og_image_tag['content']
-        else:
-            eager_image_tag = soup.find('img', {'data-testid': 'EagerImage'})
-            if eager_image_tag and eager_image_tag.has_attr('src'):
-                main_image_url = eager_image_tag['src']
-
-        article_container = soup.find('div', {'data-testid': 'ArticleBody'})
-        content_text = ""
-        if article_container:
-            paragraphs = article_container.select('div[data-testid^="paragraph-"]')
-            content_text = ' '.join([p.get_text(strip=True) for p in paragraphs])
-        
-        full_content_for_analysis = f"{title_tag.get_text(strip=True) if title_tag else ''}. {desc_text}. {content_text}"
-        print(f"Extracted content length: {full_content_for_analysis}")
-        return {
-            "src": "Reuters",
-            "link": article_url,
-            "title": title_tag.get_text(strip=True) if title_tag else "N/A",
-            "desc": desc_text,
-            "published_date": published_date,
-            "image": main_image_url,
-            "content_for_analysis": full_content_for_analysis 
-        }
\ No newline at end of file
+    def extract_archive_links(self, html):
+        root = parse_html(html)
+        if root is None:
+            return []
+        links = []
+        for a_tag in root.xpath('//a[@href]'):
+            full_url = urljoin(self.base_url, a_tag.get('href'))
+            # URL bài báo của Reuters kết thúc bằng ngày đăng: ...-2024-03-14/
+            if full_url.startswith(self.base_url) and re.search(r'-\d{4}-\d{2}-\d{2}/?$', full_url) \
+                    and full_url not in links:
+                links.append(full_url)
+        return links
@@ -0,0 +1,147 @@
+"""
+Trích xuất keyword bằng TF-IDF thật trên từ vựng CEFR.
+
+Mỗi token được đưa về từ chuẩn CEFR (lemma hoặc cách viết gốc) rồi đếm vào ma
+trận thưa bài x từ, nên từ vựng cố định (~8.6k từ) và không cần "fit" lại. Tần
+suất tài liệu (DF) của từng từ được cộng dồn mỗi khi có bài mới và lưu trong
+Mongo bằng `$inc`, thay vì tính lại trên toàn bộ bài đã lưu. Điểm của cả lô được
+tính bằng phép toán ma trận thưa: tf dạng log, idf làm trơn như scikit-learn,
+chuẩn hoá L2 theo từng bài.
+"""
+import logging
+import re
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+from pymongo import UpdateOne
+from scipy import sparse
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[a-z]+(?:'[a-z]+)?")
+# _id của document giữ tổng số bài trong collection thống kê
+TOTAL_DOCUMENTS_ID = '__documents__'
+
+
+class TermStatistics:
+    """
+    Số bài chứa mỗi từ (DF) và tổng số bài. Giữ trong bộ nhớ, cộng dồn vào Mongo
+    nếu có `collection`, và đọc lại định kỳ để thấy phần tiến trình khác đã ghi.
+    """
+
+    def __init__(self, terms: Sequence[str], collection=None, refresh_seconds: float = 300):
+        self.terms = list(terms)
+        self.index = {term: i for i, term in enumerate(self.terms)}
+        self.collection = collection
+        self.refresh_seconds = refresh_seconds
+        self.document_frequency = np.zeros(len(self.terms), dtype=np.int64)
+        self.total_documents = 0
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def refresh(self):
+        if self.collection is None:
+            return
+        df = np.zeros(len(self.terms), dtype=np.int64)
+        total = 0
+        try:
+            for doc in self.collection.find({}, {'df': 1}):
+                if doc['_id'] == TOTAL_DOCUMENTS_ID:
+                    total = doc['df']
+                elif doc['_id'] in self.index:
+                    df[self.index[doc['_id']]] = doc['df']
+        except Exception as e:
+            logger.warning("Could not load term statistics: %r", e)
+            return
+        with self._lock:
+            self.document_frequency, self.total_documents = df, total
+            self._loaded_at = time.monotonic()
+
+    def add_documents(self, counts: sparse.csr_matrix):
+        """Cộng DF của các bài mới (ma trận đếm bài x từ)."""
+        if counts.shape[0] == 0:
+            return
+        increments = np.asarray((counts > 0).sum(axis=0)).ravel().astype(np.int64)
+        with self._lock:
+            self.document_frequency += increments
+            self.total_documents += counts.shape[0]
+        if self.collection is None:
+            return
+        operations = [UpdateOne({'_id': self.terms[i]}, {'$inc': {'df': int(increments[i])}}, upsert=True)
+                      for i in np.flatnonzero(increments)]
+        operations.append(UpdateOne({'_id': TOTAL_DOCUMENTS_ID}, {'$inc': {'df': counts.shape[0]}}, upsert=True))
+        try:
+            self.collection.bulk_write(operations, ordered=False)
+        except Exception as e:
+            logger.warning("Could not save term statistics: %r", e)
+        if time.monotonic() - self._loaded_at > self.refresh_seconds:
+            self.refresh()
+
+    def idf(self) -> np.ndarray:
+        with self._lock:
+            df, total = self.document_frequency.copy(), self.total_documents
+        return np.log((1 + total) / (1 + df)) + 1.0
+
+
+class TfidfKeywordExtractor:
+    def __init__(self, terms: Sequence[str], canonical: Callable[[str], Optional[str]],
+                 ranks: Sequence[int], term_stats: TermStatistics, max_cached_tokens: int = 200000):
+        """`canonical(token)` trả về từ chuẩn CEFR của token (hoặc None); `ranks` là rank CEFR theo `terms`."""
+        self.terms = list(terms)
+        self.index = {term: i for i, term in enumerate(self.terms)}
+        self.ranks = np.asarray(ranks, dtype=np.int64)
+        self.term_stats = term_stats
+        self._canonical = canonical
+        self._token_cache: Dict[str, int] = {}
+        self._max_cached_tokens = max_cached_tokens
+
+    def _term_index(self, token: str) -> int:
+        column = self._token_cache.get(token)
+        if column is None:
+            term = None if token in ENGLISH_STOP_WORDS else self._canonical(token)
+            column = self.index.get(term, -1)
+            # Lemmatizer là phần chậm nhất; mỗi dạng từ chỉ tra một lần
+            if len(self._token_cache) < self._max_cached_tokens:
+                self._token_cache[token] = column
+        return column
+
+    def count_terms(self, texts: Sequence[str]) -> sparse.csr_matrix:
+        """Ma trận đếm bài x từ chuẩn CEFR."""
+        indptr, indices, data = [0], [], []
+        for text in texts:
+            row: Dict[int, int] = {}
+            for token in _TOKEN_RE.findall((text or '').lower()):
+                column = self._term_index(token)
+                if column >= 0:
+                    row[column] = row.get(column, 0) + 1
+            indices.extend(row.keys())
+            data.extend(row.values())
+            indptr.append(len(indices))
+        return sparse.csr_matrix((np.asarray(data, dtype=np.float64), np.asarray(indices, dtype=np.int64),
+                                  np.asarray(indptr, dtype=np.int64)), shape=(len(texts), len(self.terms)))
+
+    def score(self, counts: sparse.csr_matrix) -> sparse.csr_matrix:
+        """TF-IDF chuẩn hoá L2 theo từng bài."""
+        weights = counts.copy()
+        weights.data = 1.0 + np.log(weights.data)
+        weights = weights.multiply(self.term_stats.idf()).tocsr()
+        norms = np.sqrt(np.asarray(weights.multiply(weights).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        return sparse.diags(1.0 / norms) @ weights
+
+    def top_keywords(self, scores: sparse.csr_matrix, limit: int, min_rank: int = 0) -> List[List[str]]:
+        keywords = []
+        for row in range(scores.shape[0]):
+            start, end = scores.indptr[row], scores.indptr[row + 1]
+            columns, values = scores.indices[start:end], scores.data[start:end]
+            if min_rank:
+                keep = self.ranks[columns] >= min_rank
+                columns, values = columns[keep], values[keep]
+            # Điểm giảm dần; cùng điểm thì theo thứ tự từ vựng để kết quả ổn định
+            order = np.lexsort((columns, -values))[:limit]
+            keywords.append([self.terms[column] for column in columns[order]])
+        return keywords
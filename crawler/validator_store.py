@@ -0,0 +1,70 @@
+"""
+Kho nhỏ lưu ETag/Last-Modified của các trang danh sách.
+
+Khi trang danh sách chưa đổi, server trả 304 cho request có điều kiện và parser
+dùng lại danh sách link đã trích xuất lần trước thay vì tải và parse lại.
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Dict, List, Optional
+
+DEFAULT_VALIDATOR_PATH = os.path.join('data', 'cache', 'http_validators.json')
+
+logger = logging.getLogger(__name__)
+
+
+class ValidatorStore:
+    def __init__(self, path: str = DEFAULT_VALIDATOR_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning("Ignoring unreadable validator store %s: %s", path, e)
+
+    def get(self, url: str) -> Optional[Dict]:
+        with self._lock:
+            return self._entries.get(url)
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        entry = self.get(url) or {}
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def update(self, url: str, response_headers: Dict[str, str], links: List[str], limit: int):
+        etag = response_headers.get('ETag')
+        last_modified = response_headers.get('Last-Modified')
+        with self._lock:
+            if not etag and not last_modified:
+                # Server không hỗ trợ validator: không có gì để dùng lại
+                self._entries.pop(url, None)
+            else:
+                self._entries[url] = {
+                    'etag': etag,
+                    'last_modified': last_modified,
+                    'links': links,
+                    'limit': limit,
+                }
+            self._save()
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path) or '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
@@ -1,30 +1,241 @@
-import pandas as pd
-from keybert import KeyBERT
+import logging
+import threading
+import warnings
+from typing import Callable, Optional
+
+import numpy as np
 import nltk
 from sklearn.metrics.pairwise import cosine_similarity
-from sentence_transformers import SentenceTransformer
+
+from crawler.cefr_embeddings import DEFAULT_CACHE_DIR, load_or_build_cefr_embeddings
+from crawler.cefr_vocab import level_rank, load_cefr_vocabulary
+from crawler.tfidf import TermStatistics, TfidfKeywordExtractor
+
+MODEL_NAME = 'all-MiniLM-L6-v2'
+KEYWORD_MODES = ('keybert', 'tfidf')
+
+logger = logging.getLogger(__name__)
 
 class WordAnalyzer:
-    def __init__(self, cefr_word_list_path):
-        print("Loading CEFR word list...")
-        df = pd.read_csv(cefr_word_list_path)
-        self.cefr_words = set(df['word'].str.lower())
+    def __init__(self, cefr_word_list_path, encode_batch_size=64, embedding_cache_dir=DEFAULT_CACHE_DIR,
+                 embedding_model=None, keyword_mode='keybert', term_stats_collection=None):
+        """
+        `keyword_mode` là cách trích xuất mặc định: 'keybert' (model embedding) hoặc
+        'tfidf' (TF-IDF trên từ vựng CEFR, không nạp model). Thống kê DF cho TF-IDF
+        được cộng khi bài được lưu (`update_term_statistics`), ở cả hai chế độ, và lưu
+        vào `term_stats_collection` nếu có.
+        """
+        if keyword_mode not in KEYWORD_MODES:
+            raise ValueError(f"Unknown keyword mode {keyword_mode!r}; expected one of {KEYWORD_MODES}")
+        self.keyword_mode = keyword_mode
+        logger.info("Loading CEFR word list...")
+        # Chỉ mục biến thể/lemma -> (từ chuẩn, level), nạp từ file nhị phân đã biên dịch
+        self.vocabulary = load_cefr_vocabulary(cefr_word_list_path, embedding_cache_dir)
         self.lemmatizer = nltk.stem.WordNetLemmatizer()
-        print(f"Loaded {len(self.cefr_words)} words from CEFR list.")
-        
-        print("Loading KeyBERT model (all-MiniLM-L6-v2)...")
-        print("This may take a few minutes on the first run as the model is downloaded.")
-        self.kw_model = KeyBERT(model='all-MiniLM-L6-v2')
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
-        print("KeyBERT model loaded successfully.")
+        self.encode_batch_size = encode_batch_size
+        # Các job crawl chạy song song trên nhiều thread; model được gọi lần lượt
+        self._model_lock = threading.Lock()
+        logger.info("Loaded %d words from CEFR list.", len(self.vocabulary))
+
+        terms = self.vocabulary.canonical_words
+        self.term_stats = TermStatistics(terms, collection=term_stats_collection)
+        self.tfidf = TfidfKeywordExtractor(
+            terms, self.canonical_keyword, [self.vocabulary.rank(term) for term in terms], self.term_stats
+        )
+
+        self.embedding_model = embedding_model
+        self.kw_model = None
+        self.cefr_embeddings = None
+        if keyword_mode == 'keybert':
+            self._load_keybert(cefr_word_list_path, embedding_cache_dir)
+
+    def _load_keybert(self, cefr_word_list_path, embedding_cache_dir):
+        # Import muộn: chế độ TF-IDF không cần torch / sentence-transformers
+        from keybert import KeyBERT
+        from sentence_transformers import SentenceTransformer
+
+        logger.info("Loading KeyBERT model (%s)...", MODEL_NAME)
+        logger.info("This may take a few minutes on the first run as the model is downloaded.")
+        # Một instance model duy nhất, dùng chung cho KeyBERT và cho việc encode bài báo
+        self.embedding_model = self.embedding_model or SentenceTransformer(MODEL_NAME)
+        self.kw_model = KeyBERT(model=self.embedding_model)
+        logger.info("KeyBERT model loaded successfully.")
+
+        # Ma trận embedding của toàn bộ từ vựng CEFR, memory-map từ cache trên đĩa
+        self.cefr_embeddings = load_or_build_cefr_embeddings(
+            cefr_word_list_path, self.embedding_model, MODEL_NAME, embedding_cache_dir
+        )
+
+    def canonical_keyword(self, keyword: str):
+        """Từ chuẩn trong danh sách CEFR của một keyword (qua lemma hoặc cách viết gốc), hoặc None."""
+        word = keyword.lower()
+        return self.vocabulary.canonical(self.lemmatizer.lemmatize(word)) or self.vocabulary.canonical(word)
+
+    def level_of(self, word: str):
+        """Level CEFR ('A1'...'C2') của một từ chuẩn."""
+        return self.vocabulary.level(word)
+
+    @staticmethod
+    def _is_analyzable(text) -> bool:
+        return bool(text) and isinstance(text, str) and len(text.split()) >= 5
+
+    def _encode_normalized(self, texts: list) -> np.ndarray:
+        embeddings = self.embedding_model.encode(
+            texts,
+            batch_size=self.encode_batch_size,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        )
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return embeddings / norms
+
+    def _select_keywords(self, scored_candidates, limit_per_article, similarity_threshold):
+        """`scored_candidates`: (lemma, keybert_score, similarity) theo thứ tự xếp hạng của KeyBERT."""
+        final_keywords = []
+        added_lemmas = set()
+        for lemma, keybert_score, similarity in scored_candidates:
+            if len(final_keywords) >= limit_per_article:
+                break
+
+            # Use lower threshold or KeyBERT score as alternative
+            if (similarity >= similarity_threshold or keybert_score >= 0.3) and lemma not in added_lemmas:
+                final_keywords.append(lemma)
+                added_lemmas.add(lemma)
+        return final_keywords
+
+    def extract_keywords(self, corpus_texts: list, mode=None, limit_per_article=20, min_level=None,
+                         sort_by_level=False):
+        """Trích xuất keyword theo `mode` ('keybert' / 'tfidf'; mặc định theo `keyword_mode`)."""
+        mode = mode or self.keyword_mode
+        if mode == 'tfidf':
+            return self.extract_keywords_tfidf(corpus_texts, limit_per_article, min_level, sort_by_level)
+        if mode != 'keybert':
+            raise ValueError(f"Unknown keyword mode {mode!r}; expected one of {KEYWORD_MODES}")
+        return self.extract_keywords_with_keybert(corpus_texts, limit_per_article, min_level=min_level,
+                                                  sort_by_level=sort_by_level)
+
+    def update_term_statistics(self, corpus_texts: list):
+        """Cộng DF của các bài vừa được lưu; gọi cả ở chế độ KeyBERT để có thể chuyển sang TF-IDF."""
+        texts = [text for text in corpus_texts if self._is_analyzable(text)]
+        if texts:
+            self.term_stats.add_documents(self.tfidf.count_terms(texts))
+
+    def extract_keywords_tfidf(self, corpus_texts: list, limit_per_article=20, min_level=None,
+                               sort_by_level=False):
+        """
+        TF-IDF trên từ vựng CEFR cho cả lô bằng ma trận thưa, không gọi model.
+        Chỉ chấm điểm theo thống kê DF hiện có; DF của bài được cộng khi bài được
+        lưu, nên bài lỗi hoặc bị crawl lại không làm lệch IDF.
+        """
+        if not corpus_texts:
+            return []
+        all_final_keywords = [[] for _ in corpus_texts]
+        valid_indices = [i for i, text in enumerate(corpus_texts) if self._is_analyzable(text)]
+        if not valid_indices:
+            return all_final_keywords
+
+        counts = self.tfidf.count_terms([corpus_texts[i] for i in valid_indices])
+        min_rank = level_rank(min_level) if min_level else 0
+        keywords_per_doc = self.tfidf.top_keywords(self.tfidf.score(counts), limit_per_article, min_rank)
+        for corpus_index, keywords in zip(valid_indices, keywords_per_doc):
+            if sort_by_level:
+                keywords.sort(key=self.vocabulary.rank, reverse=True)
+            all_final_keywords[corpus_index] = keywords
+        return all_final_keywords
+
+    def extract_keywords_with_keybert(self, corpus_texts: list, limit_per_article=20, similarity_threshold=0.2,
+                                      min_level=None, sort_by_level=False):
+        """
+        Trích xuất keyword bằng KeyBERT cho cả corpus theo lô: mỗi bài chỉ được encode một lần,
+        vector của keyword được lấy từ ma trận CEFR dựng sẵn (không gọi model cho
+        từng từ), và độ tương đồng được tính bằng một phép nhân ma trận.
+
+        `min_level` (vd. 'B2') chỉ giữ các từ từ level đó trở lên; `sort_by_level`
+        xếp keyword của mỗi bài từ level cao xuống thấp.
+        """
+        min_rank = level_rank(min_level) if min_level else 0
+        if not corpus_texts:
+            return []
+        if self.kw_model is None:
+            raise RuntimeError("KeyBERT mode is not loaded; create WordAnalyzer with keyword_mode='keybert'")
+
+        all_final_keywords = [[] for _ in corpus_texts]
+        valid_indices = [i for i, text in enumerate(corpus_texts) if self._is_analyzable(text)]
+        if not valid_indices:
+            return all_final_keywords
+        valid_texts = [corpus_texts[i] for i in valid_indices]
+
+        try:
+            with self._model_lock:
+                # Embed all articles once and hand the embeddings to KeyBERT so it does not re-encode them
+                doc_embeddings = self._encode_normalized(valid_texts)
+                keywords_per_doc = self.kw_model.extract_keywords(
+                    valid_texts,
+                    keyphrase_ngram_range=(1, 1),
+                    stop_words='english',
+                    top_n=100,
+                    doc_embeddings=doc_embeddings
+                )
+            # KeyBERT returns a flat list when it is given a single document
+            if len(valid_texts) == 1:
+                keywords_per_doc = [keywords_per_doc]
+
+            # Only CEFR words at or above min_level can be kept, so only those need a vector
+            lemmas_per_doc = [
+                [(self.canonical_keyword(keyword), score) for keyword, score in keywords]
+                for keywords in keywords_per_doc
+            ]
+            lemmas_per_doc = [
+                [(lemma, score) for lemma, score in lemmas if lemma and self.vocabulary.rank(lemma) >= min_rank]
+                for lemmas in lemmas_per_doc
+            ]
+            candidates = sorted({
+                lemma for lemmas in lemmas_per_doc for lemma, _ in lemmas if lemma in self.cefr_embeddings
+            })
+            if not candidates:
+                return all_final_keywords
+
+            # Row lookups in the memory-mapped matrix, one matmul for every similarity
+            similarity_matrix = doc_embeddings @ self.cefr_embeddings.rows(candidates).T
+            candidate_index = {lemma: col for col, lemma in enumerate(candidates)}
+
+            for row, (corpus_index, lemmas) in enumerate(zip(valid_indices, lemmas_per_doc)):
+                scored_candidates = [
+                    (lemma, score, similarity_matrix[row, candidate_index[lemma]])
+                    for lemma, score in lemmas if lemma in candidate_index
+                ]
+                final_keywords = self._select_keywords(scored_candidates, limit_per_article, similarity_threshold)
+                if sort_by_level:
+                    final_keywords.sort(key=self.vocabulary.rank, reverse=True)
+                all_final_keywords[corpus_index] = final_keywords
+        except Exception as e:
+            logger.exception("Error processing corpus with KeyBERT: %s", e)
+
+        return all_final_keywords
 
     def extract_keywords_with_tfidf(self, corpus_texts: list, limit_per_article=20, similarity_threshold=0.2):
+        """
+        Tên cũ của extract_keywords_with_keybert (dù tên có "tfidf", đây là đường
+        KeyBERT), giữ chữ ký cũ. Đã lỗi thời: TF-IDF thật là `extract_keywords_tfidf`.
+        """
+        warnings.warn("extract_keywords_with_tfidf is deprecated; use extract_keywords_with_keybert "
+                      "(or extract_keywords_tfidf for TF-IDF)", DeprecationWarning, stacklevel=2)
+        return self.extract_keywords_with_keybert(corpus_texts, limit_per_article, similarity_threshold)
+
+    def extract_keywords_per_keyword(self, corpus_texts: list, limit_per_article=20, similarity_threshold=0.2):
+        """
+        Cách tính cũ: encode từng keyword một. Giữ lại để đối chiếu kết quả với
+        extract_keywords_with_keybert (xem benchmarks/keyword_parity.py). Bản theo lô
+        tính độ tương đồng trên vector của lemma CEFR thay vì dạng gốc của từ, nên
+        thứ hạng ở sát ngưỡng có thể lệch nhẹ.
+        """
         if not corpus_texts:
             return []
 
         all_final_keywords = []
         for text in corpus_texts:
-            if not text or not isinstance(text, str) or len(text.split()) < 5:
+            if not self._is_analyzable(text):
                 all_final_keywords.append([])
                 continue
             
@@ -61,17 +272,57 @@ class WordAnalyzer:
                     )[0][0]
                     
                     # Filter by similarity threshold and CEFR word list
-                    lemma = self.lemmatizer.lemmatize(keyword.lower())
+                    lemma = self.canonical_keyword(keyword)
                     
                     # Use lower threshold or KeyBERT score as alternative
-                    if (similarity >= similarity_threshold or keybert_score >= 0.3) and lemma in self.cefr_words and lemma not in added_lemmas:
+                    if (similarity >= similarity_threshold or keybert_score >= 0.3) and lemma and lemma not in added_lemmas:
                         final_keywords.append(lemma)
                         added_lemmas.add(lemma)
                 
                 all_final_keywords.append(final_keywords)
 
             except Exception as e:
-                print(f"Error processing text with KeyBERT: {e}")
+                logger.exception("Error processing text with KeyBERT: %s", e)
                 all_final_keywords.append([])
 
-        return all_final_keywords
\ No newline at end of file
+        return all_final_keywords
+
+
+class AnalyzerLoader:
+    """
+    Nạp WordAnalyzer trên thread nền để server nhận request ngay khi khởi động.
+    `get()` chờ đến khi nạp xong; trả về None nếu nạp thất bại.
+    """
+    def __init__(self, factory: Callable[[], WordAnalyzer]):
+        self._factory = factory
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.analyzer: Optional[WordAnalyzer] = None
+        self.error: Optional[BaseException] = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._load, name="analyzer-loader", daemon=True)
+                self._thread.start()
+
+    def _load(self):
+        try:
+            self.analyzer = self._factory()
+        except Exception as e:
+            logger.exception("Could not load WordAnalyzer: %r", e)
+            self.error = e
+        finally:
+            self._ready.set()
+
+    @property
+    def status(self) -> str:
+        if not self._ready.is_set():
+            return "loading" if self._thread else "not_started"
+        return "failed" if self.analyzer is None else "ready"
+
+    def get(self, timeout: Optional[float] = None) -> Optional[WordAnalyzer]:
+        self.start()
+        self._ready.wait(timeout)
+        return self.analyzer
@@ -3,4 +3,10 @@ from config import settings
 
 client = MongoClient(settings.MONGO_URI)
 db = client[settings.MONGO_DB_NAME]
-news_collection = db["articles"]
\ No newline at end of file
+news_collection = db["articles"]
+word_cache_collection = db["word_details_cache"]
+fingerprint_collection = db["article_fingerprints"]
+term_stats_collection = db["term_stats"]
+word_stats_collection = db["word_stats"]
+words_collection = db["words"]
+coordination_collection = db["coordination"]
@@ -0,0 +1,148 @@
+"""
+Phát hiện bài gần trùng (tin hãng thông tấn đăng lại dưới URL khác).
+
+Mỗi bài có một chữ ký MinHash trên các shingle 5 từ của `content_for_analysis`.
+Chữ ký được chia thành các band (LSH); hai bài chung ít nhất một band là ứng
+viên, rồi độ tương đồng Jaccard ước lượng từ chữ ký quyết định có trùng hay
+không. Chữ ký và band của bài đã lưu nằm trong một collection Mongo có index
+trên `bands`, nên việc tra cứu là một truy vấn `$in` và dùng được giữa các lần
+chạy.
+"""
+import hashlib
+import logging
+import re
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from pymongo import ASCENDING, UpdateOne
+from pymongo.collection import Collection
+
+logger = logging.getLogger(__name__)
+
+NUM_PERM = 64
+BANDS = 16
+SHINGLE_SIZE = 5
+
+_TOKEN_RE = re.compile(r'\w+')
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+# Hệ số hoán vị cố định để chữ ký so sánh được giữa các tiến trình và các lần chạy
+_RNG = np.random.RandomState(1)
+_PERM_A = _RNG.randint(1, (1 << 32) - 1, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _RNG.randint(0, (1 << 32) - 1, size=NUM_PERM, dtype=np.uint64)
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> set:
+    tokens = _TOKEN_RE.findall((text or '').lower())
+    if len(tokens) < size:
+        return {' '.join(tokens)} if tokens else set()
+    return {' '.join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+def minhash(text: str) -> Optional[np.ndarray]:
+    """Chữ ký MinHash (NUM_PERM giá trị uint32) của văn bản; None nếu văn bản rỗng."""
+    values = shingles(text)
+    if not values:
+        return None
+    hashes = np.fromiter((zlib.crc32(value.encode('utf-8')) for value in values), dtype=np.uint64, count=len(values))
+    # (a*x + b) mod p cho mọi hoán vị cùng lúc; phép nhân tràn uint64 là chủ ý, như datasketch
+    with np.errstate(over='ignore'):
+        permuted = (np.outer(hashes, _PERM_A) + _PERM_B) % _MERSENNE_PRIME & _MAX_HASH
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def band_keys(signature: np.ndarray) -> List[str]:
+    rows = NUM_PERM // BANDS
+    return [f"{band}:{hashlib.blake2b(signature[band * rows:(band + 1) * rows].tobytes(), digest_size=8).hexdigest()}"
+            for band in range(BANDS)]
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Độ tương đồng Jaccard ước lượng từ hai chữ ký."""
+    return float(np.mean(a == b))
+
+
+@dataclass
+class Duplicate:
+    link: str
+    similarity: float
+
+
+class NearDuplicateIndex:
+    def __init__(self, collection: Collection, threshold: float = 0.8):
+        self.collection = collection
+        self.threshold = threshold
+
+    def ensure_indexes(self):
+        self.collection.create_index([('link', ASCENDING)], unique=True, name='link_unique')
+        self.collection.create_index([('bands', ASCENDING)], name='bands')
+
+    def match(self, links: Sequence[str], texts: Sequence[str]) -> List[Optional[Duplicate]]:
+        """
+        Với mỗi bài, bài đã đăng ký hoặc bài đứng trước trong cùng lô giống nó nhất
+        (từ `threshold` trở lên); None nếu không có. Không ghi gì: chữ ký chỉ được
+        lưu qua `register` sau khi bài đã được lưu.
+        """
+        signatures = [minhash(text) for text in texts]
+        keys = [band_keys(signature) if signature is not None else [] for signature in signatures]
+        stored = self._load_candidates({key for article_keys in keys for key in article_keys}, exclude=links)
+
+        results: List[Optional[Duplicate]] = []
+        batch_bands: Dict[str, List[int]] = {}
+        for i, (signature, article_keys) in enumerate(zip(signatures, keys)):
+            best = None
+            if signature is not None:
+                candidates = {}
+                for key in article_keys:
+                    for link, candidate in stored.get(key, ()):
+                        candidates[link] = candidate
+                    for j in batch_bands.get(key, ()):
+                        candidates[links[j]] = signatures[j]
+                for link, candidate in candidates.items():
+                    score = similarity(signature, candidate)
+                    if score >= self.threshold and (best is None or score > best.similarity):
+                        best = Duplicate(link, score)
+            results.append(best)
+            # Chỉ bài gốc làm ứng viên; bài trùng luôn trỏ về bài gốc
+            if best is None:
+                for key in article_keys:
+                    batch_bands.setdefault(key, []).append(i)
+        return results
+
+    def register(self, links: Sequence[str], texts: Sequence[str]):
+        """Lưu chữ ký của các bài gốc đã lưu thành công để các lô và các lần chạy sau so khớp."""
+        self._register([(link, signature) for link, signature in zip(links, map(minhash, texts))
+                        if signature is not None])
+
+    def _load_candidates(self, keys: Iterable[str], exclude: Iterable[str] = ()) -> Dict[str, List[tuple]]:
+        keys = list(keys)
+        if not keys:
+            return {}
+        by_band: Dict[str, List[tuple]] = {}
+        try:
+            query = {'bands': {'$in': keys}, 'link': {'$nin': list(exclude)}}
+            for doc in self.collection.find(query, {'_id': 0, 'link': 1, 'signature': 1, 'bands': 1}):
+                signature = np.asarray(doc['signature'], dtype=np.uint32)
+                for key in doc['bands']:
+                    by_band.setdefault(key, []).append((doc['link'], signature))
+        except Exception as e:
+            logger.warning("Could not read article fingerprints: %r", e)
+        return by_band
+
+    def _register(self, fingerprints: List[tuple]):
+        if not fingerprints:
+            return
+        now = datetime.now(timezone.utc)
+        operations = [
+            UpdateOne({'link': link},
+                      {'$set': {'signature': signature.tolist(), 'bands': band_keys(signature), 'created_at': now}},
+                      upsert=True)
+            for link, signature in fingerprints
+        ]
+        try:
+            self.collection.bulk_write(operations, ordered=False)
+        except Exception as e:
+            logger.warning("Could not save article fingerprints: %r", e)
@@ -0,0 +1,204 @@
+"""
+Client cho dịch vụ enrichment (ENRICH_API_URL) có cache.
+
+Thứ tự tra cứu một từ: LRU trong tiến trình -> collection cache trên Mongo (có
+TTL) -> dịch vụ enrichment. Chỉ các từ chưa có trong cache mới được gửi đi, chia
+thành các chunk có kích thước giới hạn, chạy đồng thời trên một `requests.Session`
+dùng chung, có retry với backoff.
+"""
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+import requests
+from pymongo import ASCENDING, UpdateOne
+from pymongo.collection import Collection
+from pymongo.errors import OperationFailure
+from requests.adapters import HTTPAdapter
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+# Mã lỗi Mongo khi tạo lại index cùng tên nhưng khác tuỳ chọn (vd. expireAfterSeconds)
+INDEX_OPTIONS_CONFLICT = 85
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class EnrichmentStats:
+    lru_hits: int = 0
+    store_hits: int = 0
+    misses: int = 0
+    failed: int = 0
+    requests: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.lru_hits + self.store_hits + self.misses
+        return (self.lru_hits + self.store_hits) / total if total else 0.0
+
+
+class _LRUCache:
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._data: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: dict):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+
+class EnrichmentClient:
+    def __init__(self, api_url: str, cache_collection: Optional[Collection] = None,
+                 ttl_seconds: int = 30 * 24 * 3600, lru_size: int = 20000, chunk_size: int = 100,
+                 max_concurrency: int = 4, max_retries: int = 3, backoff_seconds: float = 0.5,
+                 timeout: float = 30):
+        self.api_url = api_url
+        self.cache_collection = cache_collection
+        self.ttl_seconds = ttl_seconds
+        self.chunk_size = chunk_size
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.timeout = timeout
+        self.stats = EnrichmentStats()
+        self._stats_lock = threading.Lock()
+        self._lru = _LRUCache(lru_size)
+
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="enrich")
+
+    def ensure_indexes(self):
+        if self.cache_collection is None:
+            return
+        self.cache_collection.create_index([('word', ASCENDING)], unique=True, name='word_unique')
+        try:
+            self.cache_collection.create_index(
+                [('cached_at', ASCENDING)], expireAfterSeconds=self.ttl_seconds, name='cached_at_ttl'
+            )
+        except OperationFailure as e:
+            if e.code != INDEX_OPTIONS_CONFLICT:
+                raise
+            # ENRICH_CACHE_TTL_DAYS đã đổi: cập nhật hạn của index hiện có thay vì tạo lại
+            self.cache_collection.database.command(
+                'collMod', self.cache_collection.name,
+                index={'name': 'cached_at_ttl', 'expireAfterSeconds': self.ttl_seconds}
+            )
+            logger.info("Updated enrichment cache TTL to %d seconds.", self.ttl_seconds)
+
+    def _count(self, **deltas):
+        with self._stats_lock:
+            for name, delta in deltas.items():
+                setattr(self.stats, name, getattr(self.stats, name) + delta)
+
+    def enrich(self, words: Iterable[str]) -> Dict[str, dict]:
+        """Trả về map word -> kết quả enrichment; từ enrich thất bại không có trong map."""
+        words = list(dict.fromkeys(words))
+        details: Dict[str, dict] = {}
+
+        missing = []
+        for word in words:
+            cached = self._lru.get(word)
+            if cached is not None:
+                details[word] = cached
+            else:
+                missing.append(word)
+        self._count(lru_hits=len(words) - len(missing))
+
+        if missing and self.cache_collection is not None:
+            stored = self._load_from_store(missing)
+            for word, result in stored.items():
+                self._lru.put(word, result)
+            details.update(stored)
+            missing = [word for word in missing if word not in stored]
+            self._count(store_hits=len(stored))
+
+        if missing:
+            self._count(misses=len(missing))
+            fetched = self._fetch(missing)
+            for word, result in fetched.items():
+                self._lru.put(word, result)
+            self._save_to_store(fetched)
+            details.update(fetched)
+            self._count(failed=len(missing) - len(fetched))
+
+        return details
+
+    def _load_from_store(self, words: List[str]) -> Dict[str, dict]:
+        try:
+            cursor = self.cache_collection.find({'word': {'$in': words}}, {'_id': 0, 'word': 1, 'details': 1})
+            return {doc['word']: doc['details'] for doc in cursor}
+        except Exception as e:
+            logger.warning("Could not read word cache: %r", e)
+            return {}
+
+    def _save_to_store(self, results: Dict[str, dict]):
+        if self.cache_collection is None or not results:
+            return
+        now = datetime.now(timezone.utc)
+        operations = [
+            UpdateOne({'word': word}, {'$set': {'details': result, 'cached_at': now}}, upsert=True)
+            for word, result in results.items()
+        ]
+        try:
+            self.cache_collection.bulk_write(operations, ordered=False)
+        except Exception as e:
+            logger.warning("Could not write word cache: %r", e)
+
+    def _fetch(self, words: List[str]) -> Dict[str, dict]:
+        chunks = [words[i:i + self.chunk_size] for i in range(0, len(words), self.chunk_size)]
+        results: Dict[str, dict] = {}
+        for chunk_results in self._executor.map(self._post_chunk, chunks):
+            results.update(chunk_results)
+        return results
+
+    def _post_chunk(self, words: List[str]) -> Dict[str, dict]:
+        for attempt in range(self.max_retries + 1):
+            self._count(requests=1)
+            try:
+                response = self._session.post(self.api_url, json={"words": words}, timeout=self.timeout)
+                if response.status_code not in RETRYABLE_STATUS:
+                    response.raise_for_status()
+                    return {result['word']: result for result in response.json().get("results", [])}
+                error = f"HTTP {response.status_code}"
+                retry_after = response.headers.get('Retry-After')
+            except requests.HTTPError as e:
+                # Lỗi 4xx khác không có ích gì khi thử lại
+                logger.error("Could not call enrichment API: %s", e)
+                return {}
+            except (requests.RequestException, ValueError) as e:
+                error = repr(e)
+                retry_after = None
+
+            if attempt == self.max_retries:
+                logger.error("Could not call enrichment API for %d words after %d attempts: %s",
+                             len(words), attempt + 1, error)
+                return {}
+            delay = self.backoff_seconds * (2 ** attempt) * (1 + random.random())
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, float(retry_after))
+            time.sleep(delay)
+        return {}
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self._session.close()
@@ -0,0 +1,128 @@
+"""
+Hàng đợi job crawl chạy trong tiến trình.
+
+Gửi một job trả về ngay job ID; mỗi nguồn trong job chạy như một task riêng
+trên một thread pool giới hạn, nên các nguồn được crawl đồng thời và request
+HTTP không bị giữ trong suốt quá trình fetch + model + enrichment.
+"""
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+from crawler.observability import crawl_context
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, COMPLETED, FAILED = 'queued', 'running', 'completed', 'failed'
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+@dataclass
+class CrawlJob:
+    id: str
+    limits: Dict[str, int]
+    trigger: str
+    status: str = QUEUED
+    created_at: str = field(default_factory=_now)
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    # Tiến độ theo nguồn: status, số bài đã lưu, link đã lưu, lỗi
+    sources: Dict[str, Dict] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict:
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'trigger': self.trigger,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            # Bản sao, vì thread của job có thể đang cập nhật tiến độ
+            'sources': {source: dict(progress) for source, progress in self.sources.items()},
+            'stored': sum(progress.get('stored', 0) for progress in list(self.sources.values())),
+        }
+
+
+class CrawlJobManager:
+    def __init__(self, run_source: Callable[[str, int], Optional[List[dict]]], max_workers: int = 3,
+                 max_history: int = 200):
+        """`run_source(source, limit)` crawl một nguồn và trả về các bài đã lưu."""
+        self._run_source = run_source
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="crawl-job")
+        self._jobs: "OrderedDict[str, CrawlJob]" = OrderedDict()
+        self._on_finish: Dict[str, Callable[[CrawlJob], None]] = {}
+        self._lock = threading.Lock()
+        self._max_history = max_history
+
+    def submit(self, limits: Dict[str, int], trigger: str = 'api',
+               on_finish: Optional[Callable[[CrawlJob], None]] = None) -> CrawlJob:
+        """`on_finish(job)` được gọi (trên thread của job) khi mọi nguồn đã kết thúc."""
+        job = CrawlJob(id=uuid.uuid4().hex[:12], limits=dict(limits), trigger=trigger)
+        job.sources = {source: {'status': QUEUED, 'limit': limit, 'stored': 0} for source, limit in limits.items()}
+        with self._lock:
+            self._jobs[job.id] = job
+            if on_finish is not None:
+                self._on_finish[job.id] = on_finish
+            self._trim_history()
+        for source, limit in limits.items():
+            self._executor.submit(self._run, job, source, limit)
+        logger.info("Submitted crawl job %s for %s", job.id, ', '.join(limits), extra={'job_id': job.id})
+        return job
+
+    def _trim_history(self):
+        # Chỉ bỏ các job đã kết thúc, cũ nhất trước
+        while len(self._jobs) > self._max_history:
+            finished = next((job_id for job_id, job in self._jobs.items() if job.status in (COMPLETED, FAILED)), None)
+            if finished is None:
+                break
+            del self._jobs[finished]
+
+    def _run(self, job: CrawlJob, source: str, limit: int):
+        with self._lock:
+            job.sources[source]['status'] = RUNNING
+            if job.status == QUEUED:
+                job.status = RUNNING
+                job.started_at = _now()
+
+        # Job ID cũng là correlation ID của mọi log trong job
+        with crawl_context(job.id):
+            try:
+                articles = self._run_source(source, limit) or []
+                update = {'status': COMPLETED, 'stored': len(articles),
+                          'links': [article['link'] for article in articles]}
+            except Exception as e:
+                logger.exception("Crawl job %s failed for %s: %s", job.id, source, e)
+                update = {'status': FAILED, 'error': repr(e)}
+
+        on_finish = None
+        with self._lock:
+            job.sources[source].update(update)
+            statuses = [progress['status'] for progress in job.sources.values()]
+            if all(status in (COMPLETED, FAILED) for status in statuses):
+                job.status = FAILED if all(status == FAILED for status in statuses) else COMPLETED
+                job.finished_at = _now()
+                on_finish = self._on_finish.pop(job.id, None)
+        if on_finish is not None:
+            try:
+                on_finish(job)
+            except Exception as e:
+                logger.exception("Completion callback of crawl job %s failed: %s", job.id, e)
+
+    def get(self, job_id: str) -> Optional[CrawlJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[CrawlJob]:
+        with self._lock:
+            return list(reversed(self._jobs.values()))
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,97 @@
+"""
+Chuyển các bài đã lưu sang dạng tham chiếu từ.
+
+    python -m migrate_words [--batch-size 500] [--dry-run]
+
+Các bài còn `list_words` nhúng chi tiết từ được chuyển theo lô: chi tiết của mỗi
+từ được ghi một lần vào collection `words`, bài chỉ giữ `words` (danh sách từ).
+Chỉ bài chưa chuyển được chọn, nên chạy lại sau khi bị ngắt sẽ tiếp tục phần còn
+lại. Từ đã có trong `words` (do crawl mới ghi) không bị dữ liệu cũ ghi đè.
+
+Script in số byte BSON của các bài trước và sau khi chuyển cùng số byte của các
+từ mới ghi, tức lượng dung lượng dữ liệu tiết kiệm được (trước nén).
+"""
+import argparse
+import logging
+from dataclasses import dataclass
+
+import bson
+from pymongo import UpdateOne
+from pymongo.collection import Collection
+
+from persistence import split_words
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class MigrationReport:
+    articles: int = 0
+    words_written: int = 0
+    bytes_before: int = 0
+    bytes_after: int = 0
+    word_bytes: int = 0
+
+    @property
+    def saved_bytes(self) -> int:
+        return self.bytes_before - self.bytes_after - self.word_bytes
+
+
+def migrate(news_collection: Collection, words_collection: Collection, batch_size: int = 500,
+            dry_run: bool = False) -> MigrationReport:
+    report = MigrationReport()
+    seen_words = set()
+    while True:
+        batch = list(news_collection.find({'list_words': {'$exists': True}}).limit(batch_size))
+        if not batch:
+            break
+        article_ops, word_ops = [], []
+        for article in batch:
+            document, details = split_words(article)
+            report.articles += 1
+            report.bytes_before += len(bson.encode(article))
+            report.bytes_after += len(bson.encode(document))
+            article_ops.append(UpdateOne({'_id': article['_id']},
+                                         {'$set': {'words': document['words']}, '$unset': {'list_words': ''}}))
+            for entry in details:
+                if entry['word'] in seen_words:
+                    continue
+                seen_words.add(entry['word'])
+                report.words_written += 1
+                report.word_bytes += len(bson.encode(dict(entry, _id=entry['word'])))
+                word_ops.append(UpdateOne({'_id': entry['word']}, {'$setOnInsert': entry}, upsert=True))
+        if dry_run:
+            # Không ghi gì nên truy vấn sẽ trả lại cùng lô; chỉ ước lượng trên lô đầu
+            break
+        if word_ops:
+            words_collection.bulk_write(word_ops, ordered=False)
+        news_collection.bulk_write(article_ops, ordered=False)
+        logger.info("Migrated %d articles (%d words so far).", report.articles, report.words_written)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--dry-run', action='store_true', help='measure the first batch without writing')
+    args = parser.parse_args()
+
+    from crawler.observability import configure_logging
+    from config import settings
+    from database import news_collection, words_collection
+
+    configure_logging(settings.LOG_LEVEL)
+    report = migrate(news_collection, words_collection, batch_size=args.batch_size, dry_run=args.dry_run)
+    if report.articles:
+        logger.info(
+            "Articles: %d, BSON before: %d bytes, after: %d bytes, new word documents: %d (%d bytes), "
+            "saved: %d bytes (%.1f%%).",
+            report.articles, report.bytes_before, report.bytes_after, report.words_written, report.word_bytes,
+            report.saved_bytes, 100.0 * report.saved_bytes / report.bytes_before
+        )
+    else:
+        logger.info("No articles to migrate.")
+
+
+if __name__ == '__main__':
+    main()
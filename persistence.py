@@ -0,0 +1,150 @@
+"""
+Lớp ghi/đọc bài báo trên MongoDB.
+
+Các hàm nhận collection làm tham số để có thể dùng cho collection thật
+(`database.news_collection`) lẫn collection benchmark.
+
+Khi có `words_collection`, chi tiết enrichment của mỗi từ được lưu một lần trong
+collection `words` (`_id` là từ) và bài báo chỉ giữ danh sách từ trong `words`;
+`attach_words` ghép lại `list_words` khi đọc bằng một truy vấn `$in` cho cả lô.
+Bài cũ còn `list_words` nhúng sẵn vẫn đọc được như trước.
+"""
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from pymongo import ASCENDING, ReplaceOne, UpdateOne
+from pymongo.collection import Collection
+from pymongo.errors import BulkWriteError, OperationFailure
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StoreResult:
+    upserted: int = 0
+    modified: int = 0
+    matched: int = 0
+    failed: List[Dict] = field(default_factory=list)
+    # Link của các bài mới được thêm (không tính bài đã có và chỉ được ghi đè)
+    inserted_links: Set[str] = field(default_factory=set)
+
+    @property
+    def failed_links(self) -> Set[str]:
+        return {failure['link'] for failure in self.failed}
+
+
+def ensure_indexes(collection: Collection):
+    """Tạo unique index trên `link` và index trên `crawled_date` (idempotent)."""
+    try:
+        collection.create_index([('link', ASCENDING)], unique=True, name='link_unique')
+    except OperationFailure as e:
+        # Thường do dữ liệu cũ có link trùng; vẫn tạo các index còn lại
+        logger.warning("Could not create unique index on 'link': %s", e)
+    collection.create_index([('crawled_date', ASCENDING)], name='crawled_date')
+    # Phân trang /articles theo (crawled_date, _id)
+    collection.create_index([('crawled_date', ASCENDING), ('_id', ASCENDING)], name='crawled_date_id')
+
+
+def find_existing_links(collection: Collection, links: Iterable[str]) -> Set[str]:
+    """Trả về tập các link đã có trong collection, bằng một truy vấn duy nhất."""
+    links = list(links)
+    if not links:
+        return set()
+    cursor = collection.find({'link': {'$in': links}}, {'link': 1, '_id': 0})
+    return {doc['link'] for doc in cursor}
+
+
+def split_words(article: Dict) -> Tuple[Dict, List[Dict]]:
+    """Bản sao của bài với `words` (danh sách từ) thay cho `list_words`, và các chi tiết từ đã tách ra."""
+    if 'list_words' not in article:
+        return article, []
+    document = {key: value for key, value in article.items() if key != 'list_words'}
+    details = [entry for entry in article['list_words'] or () if entry.get('word')]
+    document['words'] = [entry['word'] for entry in details]
+    return document, details
+
+
+def store_words(words_collection: Collection, details: Iterable[Dict]) -> Dict[str, Dict]:
+    """
+    Upsert chi tiết của các từ (mỗi từ một document) bằng một `bulk_write` không thứ tự.
+    Trả về map từ -> lỗi ({code, error}) của các từ không ghi được.
+    """
+    unique = {entry['word']: entry for entry in details}
+    if not unique:
+        return {}
+    words = list(unique)
+    operations = [UpdateOne({'_id': word}, {'$set': unique[word]}, upsert=True) for word in words]
+    try:
+        words_collection.bulk_write(operations, ordered=False)
+    except BulkWriteError as e:
+        return {words[error['index']]: {'code': error.get('code'), 'error': error.get('errmsg')}
+                for error in e.details.get('writeErrors', [])}
+    return {}
+
+
+def attach_words(words_collection: Collection, articles: List[Dict]) -> List[Dict]:
+    """Ghép `list_words` vào các bài chỉ giữ tham chiếu `words`, một truy vấn cho cả lô."""
+    wanted = {word for article in articles for word in article.get('words') or ()}
+    details = {}
+    if wanted:
+        details = {doc.pop('_id'): doc for doc in words_collection.find({'_id': {'$in': list(wanted)}})}
+    # Mọi bài có `words` (kể cả rỗng) đều được trả về với `list_words`, để response có cùng dạng
+    for article in articles:
+        words = article.pop('words', None)
+        if words is not None:
+            article['list_words'] = [details[word] for word in words if word in details]
+    return articles
+
+
+def store_articles(collection: Collection, articles: List[Dict],
+                   words_collection: Optional[Collection] = None) -> StoreResult:
+    """
+    Upsert cả lô bài báo bằng một `bulk_write` không thứ tự. Lỗi của từng document
+    được ghi vào `StoreResult.failed` mà không làm dừng các document còn lại.
+    Với `words_collection`, chi tiết từ được ghi vào đó trước và bài chỉ lưu tham
+    chiếu; bài có từ không ghi được cũng bị tính là lỗi và không được ghi. Các dict
+    trong `articles` không bị sửa.
+    """
+    result = StoreResult()
+    if not articles:
+        return result
+
+    documents = articles
+    if words_collection is not None:
+        split = [split_words(article) for article in articles]
+        # Từ được ghi trước bài, để bài đã lưu không bao giờ trỏ tới từ chưa có
+        failed_words = store_words(words_collection, [entry for _, article_details in split for entry in article_details])
+        documents = []
+        for document, _ in split:
+            missing = [word for word in document.get('words', ()) if word in failed_words]
+            if missing:
+                failure = failed_words[missing[0]]
+                result.failed.append({
+                    'link': document['link'],
+                    'code': failure['code'],
+                    'error': f"could not store word {missing[0]!r}: {failure['error']}",
+                })
+            else:
+                documents.append(document)
+        if not documents:
+            return result
+
+    operations = [ReplaceOne({'link': document['link']}, document, upsert=True) for document in documents]
+    try:
+        write_result = collection.bulk_write(operations, ordered=False)
+        details = write_result.bulk_api_result
+    except BulkWriteError as e:
+        details = e.details
+        for error in details.get('writeErrors', []):
+            result.failed.append({
+                'link': documents[error['index']]['link'],
+                'code': error.get('code'),
+                'error': error.get('errmsg'),
+            })
+
+    result.inserted_links = {documents[upsert['index']]['link'] for upsert in details.get('upserted', [])}
+    result.upserted = details.get('nUpserted', 0)
+    result.modified = details.get('nModified', 0)
+    result.matched = details.get('nMatched', 0)
+    return result
@@ -0,0 +1,306 @@
+"""
+Pipeline crawl dạng luồng: fetch -> parse -> phân tích keyword -> enrichment -> lưu.
+
+Các stage chạy đồng thời trên event loop của `AsyncFetcher` và nối với nhau bằng
+`asyncio.Queue` có giới hạn, nên mạng, parse và model chồng lên nhau thay vì chờ
+lẫn nhau, và stage chậm tự động làm chậm stage trước (backpressure) thay vì để
+bài báo dồn trong bộ nhớ. Phần CPU chạy ngoài event loop: parse trong
+`ParsePool`, model / enrichment / Mongo trên thread.
+
+Với `pull_threads`, fetch và parse là một bước: body được đưa theo chunk vào
+parser tăng dần của nguồn (trên `PullParseThreads`) và ngừng tải ngay khi mọi
+trường đã đủ, nên phần cuối trang (JSON/script lớn) không được tải hay parse.
+
+Stage phân tích gom bài của mọi nguồn thành micro-batch theo số lượng
+(`batch_size`) hoặc thời gian chờ (`batch_wait`), để model nhận batch lớn thay vì
+1-2 bài mỗi lần gọi. Stage lưu ghi ngay các bài vừa xong, không chờ hết crawl.
+
+Các thread gọi `crawl(source, links)`; hàm trả về khi mọi link của lần gọi đó đã
+được lưu hoặc bị loại. Nếu một worker chết vì lỗi không lường trước, pipeline
+được dựng lại ở lần gửi sau và các lần gọi đang chờ nhận lỗi thay vì chờ mãi.
+"""
+import asyncio
+import concurrent.futures
+import logging
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from crawler.http_client import AsyncFetcher
+from crawler.observability import (
+    ARTICLES_FAILED, BYTES_FETCHED, EARLY_STOPS, PAGES_FETCHED, crawl_context, crawl_id_var, stage_timer
+)
+
+logger = logging.getLogger(__name__)
+
+
+class _Submission:
+    """Các link của một lần gọi `crawl`; chỉ được cập nhật trên event loop."""
+
+    def __init__(self, count: int):
+        self.remaining = count
+        self.stored: List[dict] = []
+        self.future: concurrent.futures.Future = concurrent.futures.Future()
+        if count == 0:
+            self.future.set_result([])
+
+    def finish(self, article: Optional[dict] = None):
+        if article is not None:
+            self.stored.append(article)
+        self.remaining -= 1
+        if self.remaining == 0 and not self.future.done():
+            self.future.set_result(self.stored)
+
+
+@dataclass
+class _Item:
+    submission: _Submission
+    source: str
+    url: str
+    crawl_id: str
+    html: Optional[bytes] = None
+    article: Optional[dict] = None
+    keywords: Optional[List[str]] = None
+
+
+class CrawlPipeline:
+    def __init__(self, fetcher: AsyncFetcher, parsers: Dict, analyze: Callable, enrich: Callable,
+                 store: Callable, parse_pool=None, fetch_concurrency: int = 16, parse_concurrency: int = 4,
+                 queue_size: int = 64, batch_size: int = 16, batch_wait: float = 0.5, pull_threads=None):
+        """
+        `analyze(sources, articles)` trả về danh sách keyword cho từng bài (None nếu
+        không phân tích được), `enrich(sources, articles, keyword_lists)` gắn
+        `list_words` vào bài và `store(sources, articles)` trả về các bài đã lưu.
+        Cả ba là hàm đồng bộ, chạy trên thread.
+        """
+        self.fetcher = fetcher
+        self.parsers = parsers
+        self.parse_pool = parse_pool
+        self._analyze = analyze
+        self._enrich = enrich
+        self._store = store
+        self.fetch_concurrency = fetch_concurrency
+        self.parse_concurrency = parse_concurrency
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.pull_threads = pull_threads
+        self._queues: Optional[Dict[str, asyncio.Queue]] = None
+        self._tasks: List[asyncio.Task] = []
+        # Số bài đang ở stage fetch/parse; bằng 0 thì micro-batch không cần chờ thêm
+        self._upstream = 0
+        self._submissions = set()
+
+    # --- API cho thread gọi ---
+
+    def crawl(self, source: str, links: List[str]) -> List[dict]:
+        """
+        Đưa `links` của `source` vào pipeline và chờ xong; trả về các bài đã lưu.
+        RuntimeError nếu pipeline hỏng giữa chừng (worker chết).
+        """
+        links = [link for link in dict.fromkeys(links) if link]
+        if not links:
+            return []
+        submission = self.fetcher.run(self._submit(source, links, crawl_id_var.get()))
+        return submission.future.result()
+
+    def close(self):
+        if self._tasks:
+            self.fetcher.run(self._stop())
+
+    # --- Event loop ---
+
+    async def _submit(self, source: str, links: List[str], crawl_id: str) -> _Submission:
+        self._ensure_started()
+        submission = _Submission(len(links))
+        self._submissions.add(submission)
+        submission.future.add_done_callback(lambda _: self._submissions.discard(submission))
+        for link in links:
+            # Chờ khi hàng đợi đầy: người gửi bị chặn thay vì dồn link vào bộ nhớ
+            self._upstream += 1
+            await self._queues['fetch'].put(_Item(submission, source, link, crawl_id))
+        return submission
+
+    def _ensure_started(self):
+        if self._queues is not None:
+            return
+        self._queues = {name: asyncio.Queue(maxsize=self.queue_size)
+                        for name in ('fetch', 'parse', 'analyze', 'enrich', 'store')}
+        self._tasks = (
+            [asyncio.create_task(self._fetch_worker()) for _ in range(self.fetch_concurrency)]
+            + [asyncio.create_task(self._parse_worker()) for _ in range(self.parse_concurrency)]
+            + [asyncio.create_task(self._analyze_worker()),
+               asyncio.create_task(self._enrich_worker()),
+               asyncio.create_task(self._store_worker())]
+        )
+        for task in self._tasks:
+            task.add_done_callback(self._on_worker_done)
+
+    def _on_worker_done(self, task: asyncio.Task):
+        """Worker chỉ kết thúc khi bị huỷ; kết thúc vì lỗi thì huỷ pipeline và báo lỗi cho người chờ."""
+        if task.cancelled() or task.exception() is None or task not in self._tasks:
+            return
+        logger.error("Crawl pipeline worker died: %r", task.exception(), exc_info=task.exception())
+        tasks, self._tasks = self._tasks, []
+        for other in tasks:
+            other.cancel()
+        error = RuntimeError(f"Crawl pipeline worker died: {task.exception()!r}")
+        for submission in list(self._submissions):
+            if not submission.future.done():
+                submission.future.set_exception(error)
+        self._submissions.clear()
+        self._queues = None
+        self._upstream = 0
+
+    async def _stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        # Bài còn dở được tính là thất bại để không thread nào chờ mãi
+        for submission in list(self._submissions):
+            if not submission.future.done():
+                submission.future.set_result(submission.stored)
+        self._submissions.clear()
+        self._tasks = []
+        self._queues = None
+        self._upstream = 0
+
+    def _drop(self, items: List[_Item], stage: str):
+        if stage in ('fetch', 'parse'):
+            self._upstream -= len(items)
+        for item in items:
+            ARTICLES_FAILED.labels(source=item.source, stage=stage).inc()
+            item.submission.finish()
+
+    async def _fetch_worker(self):
+        while True:
+            item = await self._queues['fetch'].get()
+            if self.pull_threads is not None:
+                await self._fetch_and_parse(item)
+                continue
+            try:
+                with crawl_context(item.crawl_id), stage_timer('fetch', item.source):
+                    response = await self.fetcher.afetch(item.url)
+            except Exception as e:
+                with crawl_context(item.crawl_id):
+                    logger.error("Error fetching %s: %r", item.url, e, extra={'source': item.source})
+                response = None
+            if response is None:
+                self._drop([item], 'fetch')
+                continue
+            PAGES_FETCHED.labels(source=item.source, kind='article').inc()
+            BYTES_FETCHED.labels(source=item.source, kind='article').inc(response.size)
+            item.html = response.body
+            await self._queues['parse'].put(item)
+
+    async def _fetch_and_parse(self, item: _Item):
+        """Tải và parse tăng dần; cả hai được tính vào stage fetch vì chạy đan xen."""
+        try:
+            with crawl_context(item.crawl_id), stage_timer('fetch', item.source):
+                response, article = await self.pull_threads.fetch_article(
+                    self.fetcher, self.parsers[item.source], item.url)
+        except Exception as e:
+            with crawl_context(item.crawl_id):
+                logger.error("Error parsing %s: %r", item.url, e, extra={'source': item.source})
+            self._drop([item], 'parse')
+            return
+        if response is None:
+            self._drop([item], 'fetch')
+            return
+        PAGES_FETCHED.labels(source=item.source, kind='article').inc()
+        BYTES_FETCHED.labels(source=item.source, kind='article').inc(response.size)
+        if response.stopped_early:
+            EARLY_STOPS.labels(source=item.source).inc()
+        if not article:
+            self._drop([item], 'parse')
+            return
+        item.article = article
+        self._upstream -= 1
+        await self._queues['analyze'].put(item)
+
+    async def _parse_worker(self):
+        while True:
+            item = await self._queues['parse'].get()
+            parser = self.parsers[item.source]
+            try:
+                with stage_timer('parse', item.source):
+                    if self.parse_pool is not None:
+                        article = await asyncio.wrap_future(self.parse_pool.submit(parser, item.url, item.html))
+                    else:
+                        article = await asyncio.to_thread(parser.extract_article, item.url, item.html)
+            except Exception as e:
+                with crawl_context(item.crawl_id):
+                    logger.error("Error parsing %s: %r", item.url, e, extra={'source': item.source})
+                article = None
+            item.html = None
+            if not article:
+                self._drop([item], 'parse')
+                continue
+            item.article = article
+            self._upstream -= 1
+            await self._queues['analyze'].put(item)
+
+    async def _next_batch(self, queue: asyncio.Queue, limit: int, wait: float) -> List[_Item]:
+        """
+        Chờ bài đầu tiên, rồi gom thêm đến `limit` bài hoặc hết `wait` giây; dừng sớm
+        khi không còn bài nào đang fetch/parse.
+        """
+        batch = [await queue.get()]
+        deadline = asyncio.get_running_loop().time() + wait
+        while len(batch) < limit:
+            if not queue.empty():
+                batch.append(queue.get_nowait())
+                continue
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0 or self._upstream <= 0:
+                break
+            # Không huỷ queue.get() dở dang (có thể làm mất bài): chỉ ngủ rồi kiểm tra lại
+            await asyncio.sleep(min(remaining, 0.01))
+        return batch
+
+    async def _analyze_worker(self):
+        while True:
+            batch = await self._next_batch(self._queues['analyze'], self.batch_size, self.batch_wait)
+            sources = [item.source for item in batch]
+            try:
+                keyword_lists = await asyncio.to_thread(self._analyze, sources, [item.article for item in batch])
+            except Exception as e:
+                logger.exception("Keyword analysis failed for a batch of %d articles: %s", len(batch), e)
+                keyword_lists = None
+            if keyword_lists is None:
+                self._drop(batch, 'keywords')
+                continue
+            for item, keywords in zip(batch, keyword_lists):
+                item.keywords = keywords
+            # Chuyển cả batch để enrichment gộp từ của nhiều bài trong một lượt tra cứu
+            await self._queues['enrich'].put(batch)
+
+    async def _enrich_worker(self):
+        while True:
+            batch = await self._queues['enrich'].get()
+            sources = [item.source for item in batch]
+            try:
+                await asyncio.to_thread(self._enrich, sources, [item.article for item in batch],
+                                        [item.keywords for item in batch])
+            except Exception as e:
+                logger.exception("Enrichment failed for a batch of %d articles: %s", len(batch), e)
+                self._drop(batch, 'enrich')
+                continue
+            for item in batch:
+                await self._queues['store'].put(item)
+
+    async def _store_worker(self):
+        while True:
+            # Ghi ngay những bài đã sẵn sàng, gộp các bài đang chờ thành một bulk_write
+            batch = [await self._queues['store'].get()]
+            while not self._queues['store'].empty() and len(batch) < self.queue_size:
+                batch.append(self._queues['store'].get_nowait())
+            sources = [item.source for item in batch]
+            try:
+                stored = await asyncio.to_thread(self._store, sources, [item.article for item in batch])
+            except Exception as e:
+                logger.exception("Storing %d articles failed: %s", len(batch), e)
+                self._drop(batch, 'store')
+                continue
+            stored_ids = {id(article) for article in stored}
+            for item in batch:
+                item.submission.finish(item.article if id(item.article) in stored_ids else None)
@@ -0,0 +1,76 @@
+"""
+Cache response trong tiến trình cho `/articles`.
+
+Mỗi mục giữ body JSON đã serialize, bản gzip của nó (nén một lần, khi tạo mục) và
+ETag. Mục được nhóm theo ngày: khi crawl ghi bài cho một ngày, `invalidate(day)`
+xoá mọi trang của ngày đó. Mỗi ngày có một số thế hệ, tăng khi bị xoá; response
+đọc từ Mongo trước một lần xoá sẽ không được đưa vào cache (`put` với thế hệ cũ
+bị bỏ qua). Lệnh xoá chỉ có hiệu lực trong tiến trình đã ghi, nên khi có nhiều
+tiến trình độ cũ bị giới hạn bởi `ttl_seconds`, hoặc `max_age` của `get` cho những
+ngày vẫn đang nhận bài.
+"""
+import gzip
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Hashable, Optional, Tuple
+
+GZIP_MIN_BYTES = 1024
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    gzipped: Optional[bytes]
+    etag: str
+    headers: Dict[str, str]
+    created_at: float
+
+
+def make_entry(body: bytes, headers: Optional[Dict[str, str]] = None) -> CachedResponse:
+    etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+    gzipped = gzip.compress(body, compresslevel=6) if len(body) >= GZIP_MIN_BYTES else None
+    return CachedResponse(body, gzipped, etag, dict(headers or {}), time.monotonic())
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, Hashable], CachedResponse]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def generation(self, day: str) -> int:
+        with self._lock:
+            return self._generations.get(day, 0)
+
+    def get(self, day: str, key: Hashable, max_age: Optional[float] = None) -> Optional[CachedResponse]:
+        """Mục còn hạn; `max_age` (giây) siết thêm hạn `ttl_seconds` cho lần đọc này."""
+        ttl = self.ttl_seconds if max_age is None else min(self.ttl_seconds, max_age)
+        with self._lock:
+            entry = self._entries.get((day, key))
+            if entry is None:
+                return None
+            if time.monotonic() - entry.created_at > ttl:
+                del self._entries[(day, key)]
+                return None
+            self._entries.move_to_end((day, key))
+            return entry
+
+    def put(self, day: str, key: Hashable, entry: CachedResponse, generation: int):
+        with self._lock:
+            if self._generations.get(day, 0) != generation:
+                return
+            self._entries[(day, key)] = entry
+            self._entries.move_to_end((day, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, day: str):
+        with self._lock:
+            self._generations[day] = self._generations.get(day, 0) + 1
+            for cache_key in [cache_key for cache_key in self._entries if cache_key[0] == day]:
+                del self._entries[cache_key]
@@ -0,0 +1,152 @@
+"""
+Thống kê từ vựng dựng sẵn, cập nhật ngay khi lưu bài.
+
+Mỗi cặp (từ, ngày) là một document trong collection `word_stats`:
+
+    {_id: "<ngày>|<từ>", word, day, cefr_level, articles: [link, ...], count}
+
+`day` là ngày đăng của bài (YYYY-MM-DD), hoặc ngày crawl nếu bài không có ngày
+đăng, nên bài backfill rơi đúng vào ngày của nó. `count` là số bài khác nhau chứa
+từ trong ngày đó; nó được tính lại từ `articles` trong cùng lệnh update, nên ghi
+lại một bài nhiều lần không làm sai số liệu. Các câu hỏi kiểu "từ B2 nhiều nhất
+tuần này" hay "bài nào chứa từ X" chỉ đọc collection này, không quét bài báo.
+
+Chạy `python -m word_stats` để dựng lại thống kê từ các bài đã lưu.
+"""
+import logging
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.collection import Collection
+
+from persistence import attach_words
+
+logger = logging.getLogger(__name__)
+
+
+def article_day(article: Dict) -> Optional[str]:
+    """Ngày (YYYY-MM-DD) dùng để thống kê một bài."""
+    published = article.get('published_date')
+    if published and len(published) >= 10:
+        return published[:10]
+    return article.get('crawled_date')
+
+
+class WordStatistics:
+    def __init__(self, collection: Collection):
+        self.collection = collection
+
+    def ensure_indexes(self):
+        self.collection.create_index([('day', ASCENDING), ('cefr_level', ASCENDING)], name='day_level')
+        self.collection.create_index([('word', ASCENDING), ('day', DESCENDING)], name='word_day')
+
+    def record(self, articles: Iterable[Dict]):
+        """Cộng các bài đã lưu vào thống kê, một `bulk_write` cho cả lô."""
+        links_by_key: Dict[tuple, List[str]] = {}
+        levels: Dict[str, Optional[str]] = {}
+        for article in articles:
+            day = article_day(article)
+            if not day:
+                continue
+            for details in article.get('list_words') or ():
+                word = details.get('word')
+                if not word:
+                    continue
+                links_by_key.setdefault((word, day), []).append(article['link'])
+                levels[word] = details.get('cefr_level') or levels.get(word)
+        if not links_by_key:
+            return
+
+        operations = [
+            UpdateOne({'_id': f"{day}|{word}"}, [
+                {'$set': {
+                    'word': word,
+                    'day': day,
+                    'cefr_level': levels[word],
+                    'articles': {'$setUnion': [{'$ifNull': ['$articles', []]}, links]},
+                }},
+                {'$set': {'count': {'$size': '$articles'}}},
+            ], upsert=True)
+            for (word, day), links in links_by_key.items()
+        ]
+        try:
+            self.collection.bulk_write(operations, ordered=False)
+        except Exception as e:
+            logger.warning("Could not update word statistics: %r", e)
+
+    def top_words(self, start: date, end: date, level: Optional[str] = None, limit: int = 50) -> List[Dict]:
+        """Các từ có mặt trong nhiều bài nhất trong khoảng [start, end]."""
+        match = {'day': {'$gte': start.isoformat(), '$lte': end.isoformat()}}
+        if level:
+            match['cefr_level'] = level
+        cursor = self.collection.aggregate([
+            {'$match': match},
+            {'$group': {'_id': '$word', 'cefr_level': {'$first': '$cefr_level'},
+                        'articles': {'$sum': '$count'}, 'days': {'$sum': 1}}},
+            {'$sort': {'articles': -1, '_id': 1}},
+            {'$limit': limit},
+        ])
+        return [{'word': doc['_id'], 'cefr_level': doc['cefr_level'], 'articles': doc['articles'],
+                 'days': doc['days']} for doc in cursor]
+
+    def daily_counts(self, word: str, start: Optional[date] = None, end: Optional[date] = None) -> List[Dict]:
+        """Số bài chứa `word` theo từng ngày, mới nhất trước."""
+        cursor = self.collection.find(self._word_query(word, start, end),
+                                      {'_id': 0, 'day': 1, 'count': 1, 'cefr_level': 1}).sort('day', DESCENDING)
+        return list(cursor)
+
+    def articles_with(self, word: str, start: Optional[date] = None, end: Optional[date] = None,
+                      limit: int = 100) -> List[Dict]:
+        """
+        Link các bài chứa `word`: theo ngày crawl, ngày mới nhất trước; trong cùng một
+        ngày theo thứ tự chữ cái của link (thống kê không lưu giờ của từng bài).
+        """
+        references = []
+        cursor = self.collection.find(self._word_query(word, start, end),
+                                      {'_id': 0, 'day': 1, 'articles': 1}).sort('day', DESCENDING)
+        for doc in cursor:
+            for link in sorted(doc.get('articles', ())):
+                references.append({'link': link, 'day': doc['day']})
+                if len(references) >= limit:
+                    return references
+        return references
+
+    @staticmethod
+    def _word_query(word: str, start: Optional[date], end: Optional[date]) -> Dict:
+        query = {'word': word}
+        days = {}
+        if start:
+            days['$gte'] = start.isoformat()
+        if end:
+            days['$lte'] = end.isoformat()
+        if days:
+            query['day'] = days
+        return query
+
+    def rebuild(self, news_collection: Collection, words_collection: Optional[Collection] = None,
+                batch_size: int = 500) -> int:
+        """Dựng lại thống kê từ mọi bài đã lưu; trả về số bài đã đọc."""
+        self.collection.delete_many({})
+        self.ensure_indexes()
+        batch, total = [], 0
+        projection = {'_id': 0, 'link': 1, 'published_date': 1, 'crawled_date': 1, 'words': 1,
+                      'list_words.word': 1, 'list_words.cefr_level': 1}
+        for article in news_collection.find({}, projection).batch_size(batch_size):
+            batch.append(article)
+            if len(batch) >= batch_size:
+                self.record(attach_words(words_collection, batch) if words_collection is not None else batch)
+                total += len(batch)
+                batch = []
+        self.record(attach_words(words_collection, batch) if words_collection is not None else batch)
+        return total + len(batch)
+
+
+if __name__ == '__main__':
+    from crawler.observability import configure_logging
+    from config import settings
+    from database import news_collection, word_stats_collection, words_collection
+
+    configure_logging(settings.LOG_LEVEL)
+    count = WordStatistics(word_stats_collection).rebuild(news_collection, words_collection)
+    logger.info("Rebuilt word statistics from %d articles.", count)